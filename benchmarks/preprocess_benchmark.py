@@ -0,0 +1,105 @@
+# benchmarks/preprocess_benchmark.py
+"""
+مقارنة المعالجة المسبقة الجديدة (مخزن NumPy واحد) بالتنفيذ السابق
+(PIL MedianFilter ← ImageEnhance.Contrast ← NumPy ← Otsu ← PIL)
+على صفحات A4 بدقة 300 DPI مولَّدة اصطناعياً.
+
+    python benchmarks/preprocess_benchmark.py --pages 5 --repeat 3
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import tempfile
+
+import cv2
+import numpy as np
+from PIL import Image, ImageEnhance, ImageFilter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_preprocess import preprocess  # noqa: E402
+
+A4_300DPI = (2480, 3508)
+
+
+def synthetic_page(seed, size=A4_300DPI):
+    """صفحة رمادية بكتل تشبه الأسطر مع ضجيج مسح ضوئي."""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    page = np.full((h, w), 235, np.uint8)
+    for y in range(200, h - 200, 60):
+        x = 200
+        while x < w - 300:
+            word = int(rng.integers(40, 220))
+            page[y:y + 32, x:x + word] = int(rng.integers(10, 80))
+            x += word + int(rng.integers(15, 40))
+    noise = rng.normal(0, 12, page.shape).astype(np.int16)
+    return np.clip(page + noise, 0, 255).astype(np.uint8)
+
+
+def legacy_preprocess(image_path):
+    """التنفيذ السابق لـ preprocess_image_advanced كما كان."""
+    image = Image.open(image_path).convert("L")
+    image = image.filter(ImageFilter.MedianFilter())
+    image = ImageEnhance.Contrast(image).enhance(2)
+    img_np = np.array(image)
+    _, thresh = cv2.threshold(img_np, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return Image.fromarray(thresh)
+
+
+def _time(func, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="قياس سرعة المعالجة المسبقة.")
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    totals = {}
+    agreement = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in range(args.pages):
+            page = synthetic_page(n)
+            path = os.path.join(tmp, f"page{n}.png")
+            Image.fromarray(page).save(path)
+            with open(path, "rb") as f:
+                data = f.read()
+            pil = Image.fromarray(page)
+
+            cases = {
+                "legacy (path)": lambda: np.asarray(legacy_preprocess(path)),
+                "new (path)": lambda: preprocess(path, output="array"),
+                "new (bytes)": lambda: preprocess(data, output="array"),
+                "new (PIL)": lambda: preprocess(pil, output="array"),
+                "new (ndarray)": lambda: preprocess(page, output="array"),
+            }
+            results = {}
+            for name, func in cases.items():
+                seconds, results[name] = _time(func, args.repeat)
+                totals.setdefault(name, []).append(seconds)
+            agreement.append(
+                float((results["legacy (path)"] == results["new (path)"]).mean()))
+
+    w, h = A4_300DPI
+    print(f"{args.pages} synthetic A4 pages at 300 DPI ({w}x{h}), "
+          f"median of {args.repeat} runs per page:")
+    baseline = statistics.mean(totals["legacy (path)"])
+    for name, samples in totals.items():
+        mean = statistics.mean(samples)
+        print(f"  {name:<15} {mean * 1000:8.1f} ms/page  x{baseline / mean:5.1f}")
+    print(f"  pixel agreement with legacy: {min(agreement) * 100:.3f}% (worst page)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
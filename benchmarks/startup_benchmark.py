@@ -0,0 +1,117 @@
+# benchmarks/startup_benchmark.py
+"""
+قياس زمن بدء التطبيق.
+
+    python benchmarks/startup_benchmark.py --runs 5 --budget 1.0
+
+يشغّل كل قياس في عملية جديدة (بدء بارد للمفسّر) ويطبع:
+  - زمن ظهور النافذة مقسماً إلى: الاستيرادات، فحص المتطلبات، بناء النافذة؛
+  - أثقل الوحدات المستوردة عند ‎import main_window‎ حسب ‎-X importtime‎.
+يعيد رمز خروج 1 إذا تجاوز الوسيط ‎--budget‎ ثانية (مفيد في CI).
+بدون شاشة يُستخدم ‎QT_QPA_PLATFORM=offscreen‎ تلقائياً.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# نفس تسلسل main.py حتى أول إطار للنافذة (فحص المتطلبات دون نافذة التنبيه)؛
+# os._exit يتجاوز انتظار خيط التحقق من التحديث
+_CHILD = r"""
+import os, sys, json, time
+t0 = float(sys.argv[1])
+marks = {"interpreter": time.time() - t0}
+import main
+from PyQt5.QtWidgets import QApplication
+from main_window import OCRMainWindow
+marks["imports"] = time.time() - t0
+from utils import check_dependencies
+main.check_environment()
+check_dependencies()
+marks["dependencies"] = time.time() - t0
+app = QApplication(sys.argv[:1])
+win = OCRMainWindow()
+win.show()
+app.processEvents()
+marks["window"] = time.time() - t0
+print(json.dumps(marks))
+sys.stdout.flush()
+os._exit(0)
+"""
+
+
+def _env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [ROOT, env.get("PYTHONPATH")]))
+    if not env.get("DISPLAY") and sys.platform.startswith("linux"):
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return env
+
+
+def time_to_window(runs=5):
+    """قائمة بقاموس مراحل (ثوانٍ تراكمية منذ تشغيل العملية) لكل تشغيل."""
+    results = []
+    # مجلد عمل مؤقت حتى لا تترك النافذة settings.json والسجلات في المستودع
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(runs):
+            started = time.time()
+            out = subprocess.run(
+                [sys.executable, "-c", _CHILD, repr(started)],
+                cwd=workdir, env=_env(), capture_output=True, text=True,
+                check=True)
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return results
+
+
+def import_breakdown(module="main_window", top=15):
+    """أثقل الوحدات (تراكمياً) عند استيراد ‎module‎: [(ms, self_ms, name)]."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=_env(), capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us) / 1000, int(self_us) / 1000,
+                     name.rstrip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="قياس زمن بدء التطبيق.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15,
+                        help="عدد الوحدات في تفصيل الاستيراد")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="الحد الأقصى المقبول لوسيط زمن ظهور النافذة (ثانية)")
+    args = parser.parse_args(argv)
+
+    runs = time_to_window(args.runs)
+    print(f"Time to window over {args.runs} cold runs (median / min):")
+    for phase in ("interpreter", "imports", "dependencies", "window"):
+        values = [r[phase] for r in runs]
+        print(f"  {phase:<13} {statistics.median(values) * 1000:8.1f} ms"
+              f"  {min(values) * 1000:8.1f} ms")
+
+    print("\nHeaviest imports for `import main_window` (cumulative / self):")
+    for cumulative, self_ms, name in import_breakdown(top=args.top):
+        print(f"  {cumulative:8.1f} ms {self_ms:8.1f} ms  {name}")
+
+    median = statistics.median(r["window"] for r in runs)
+    if args.budget is not None and median > args.budget:
+        print(f"\nFAIL: median {median:.3f}s exceeds budget {args.budget:.3f}s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+# blank_pages.py
+"""
+كشف الصفحات الفارغة (أوراق الفصل، ظهور صفحات المسح المزدوج) قبل OCR.
+
+فحص إحصائي رخيص على نسخة مصغرة رمادية: نعدّ "الحبر" بعد التثنية
+(البكسلات الأغمق من لون الورق بفارق ‎ink_contrast‎). التصغير بمتوسط
+المساحة يمحو نقاط الغبار المعزولة، ونتجاهل هامشاً حول الحواف حيث ظلال الماسح وثقوب التخريم.
+
+نسبة الحبر وحدها لا تكفي: سطر قصير واحد على صفحة A4 بدقة 100 DPI
+حبره نحو 0.1% من مساحتها، لذا لا تُعدّ الصفحة فارغة إن وُجد فيها أي
+مكوّن متصل بحجم حرف، مهما قلّ حبرها.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+# أقصى نسبة حبر لتُعدّ الصفحة فارغة (0.0002 = 0.02% من مساحتها)
+BLANK_MAX_INK = 0.0002
+# فرق الرمادي بين الورق والحبر (0-255)
+BLANK_INK_CONTRAST = 60
+BLANK_PROXY_SIDE = 800
+BLANK_MARGIN = 0.05
+
+
+def _ink_mask(im, ink_contrast, proxy_side, margin):
+    """(الانحراف المعياري، قناع الحبر) على النسخة المصغرة بلا هوامش."""
+    import numpy as np
+
+    gray = im.convert("L")
+    factor = max(1, max(gray.size) // proxy_side)
+    if factor > 1:
+        gray = gray.reduce(factor)
+    arr = np.asarray(gray)
+    h, w = arr.shape
+    my, mx = int(h * margin), int(w * margin)
+    if h - 2 * my > 0 and w - 2 * mx > 0:
+        arr = arr[my:h - my, mx:w - mx]
+    if arr.size == 0:
+        return 0.0, np.zeros((0, 0), np.uint8)
+    paper = float(np.median(arr))
+    return float(arr.std()), (arr < paper - ink_contrast).astype(np.uint8)
+
+
+def page_ink_stats(im, ink_contrast=BLANK_INK_CONTRAST,
+                   proxy_side=BLANK_PROXY_SIDE, margin=BLANK_MARGIN):
+    """(الانحراف المعياري للرمادي، نسبة الحبر) لصفحة PIL."""
+    import numpy as np
+
+    std, mask = _ink_mask(im, ink_contrast, proxy_side, margin)
+    ink = np.count_nonzero(mask) / mask.size if mask.size else 0.0
+    return std, ink
+
+
+def text_sized_components(mask):
+    """
+    عدد المكونات المتصلة في قناع الحبر بحجم حرف: أطول من نقطة غبار
+    (4 بكسل على الأقل أو 0.4% من الارتفاع) وأقصر من 8% من الصفحة.
+    """
+    import cv2
+
+    if mask.size == 0:
+        return 0
+    h, w = mask.shape
+    min_h, max_h = max(4, int(h * 0.004)), max(5, int(h * 0.08))
+    n, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    count = 0
+    for x, y, cw, ch, area in stats[1:]:
+        if min_h <= ch <= max_h and cw <= w * 0.5 and area >= 8:
+            count += 1
+    return count
+
+
+def is_blank_page(im, max_ink=BLANK_MAX_INK, ink_contrast=BLANK_INK_CONTRAST,
+                  proxy_side=BLANK_PROXY_SIDE, margin=BLANK_MARGIN):
+    """
+    هل الصفحة فارغة فلا داعي لإرسالها إلى المحرك؟ فارغة إن كان حبرها
+    ≤ ‎max_ink‎ ولا يحوي أي مكوّن بحجم حرف.
+    """
+    import numpy as np
+
+    std, mask = _ink_mask(im, ink_contrast, proxy_side, margin)
+    ink = np.count_nonzero(mask) / mask.size if mask.size else 0.0
+    if ink > max_ink:
+        return False
+    components = text_sized_components(mask)
+    if components:
+        return False
+    logger.debug(f"Blank page: std={std:.1f} ink={ink:.4%}")
+    return True
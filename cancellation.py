@@ -0,0 +1,26 @@
+# cancellation.py
+"""
+رموز الإلغاء (cancellation tokens).
+
+رمز واحد لكل عملية معالجة يُمرَّر إلى خط المعالجة ومنه إلى مجمّع
+Tesseract مع كل مهمة: خيوط الإرسال في المجمّع تراقبه أثناء انتظار
+العامل وتقتل عمليته (مع عمليات tesseract الفرعية) فور الإلغاء، فلا
+ننتظر انتهاء الصفحة الجارية.
+"""
+import threading
+
+# أقصى مدة بين فحصين للرمز أثناء انتظار المحركات (ثوانٍ)
+CANCEL_POLL_SECONDS = 0.05
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        """إلغاء العملية؛ آمن من أي خيط ولأكثر من مرة."""
+        self._event.set()
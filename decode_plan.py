@@ -0,0 +1,97 @@
+# decode_plan.py
+"""
+خطة فك الصورة قبل OCR.
+
+المنطقة المختارة (‎roi_rel‎) تُحدَّد على الصورة كما تظهر بعد التدوير،
+فنحوّلها أولاً إلى إحداثيات الصورة الأصلية، ثم:
+  1. نطلب من مفكك JPEG دقة مخفّضة (draft) إن كانت المنطقة أكبر بكثير
+     مما يحتاجه OCR؛
+  2. نقص المنطقة قبل أي تدوير أو معالجة؛
+  3. ندوّر الجزء المقصوص فقط.
+هكذا لا تُفك ولا تُدوَّر بكسلات ستُرمى لاحقاً (صور الهاتف 40 ميغابكسل).
+"""
+import math
+import logging
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# أدنى أطول ضلع يُبقى للمنطقة بعد الفك (A4 بنحو 250 DPI على الأقل)؛
+# المقاييس المتاحة 1/2 و1/4 و1/8 فالناتج يبقى بين هذا الحد وضعفه
+MAX_DECODE_SIDE = 3000
+
+
+def roi_to_source(roi_rel, rotation):
+    """
+    تحويل ‎roi_rel=(x, y, w, h)‎ النسبي على الصورة المدوّرة باتجاه عقارب
+    الساعة بمقدار ‎rotation‎ إلى (x0, y0, x1, y1) نسبية على الصورة الأصلية.
+    """
+    if not roi_rel:
+        return (0.0, 0.0, 1.0, 1.0)
+    x, y, w, h = roi_rel
+    u0, v0, u1, v1 = x, y, x + w, y + h
+    rotation %= 360
+    if rotation == 90:
+        box = (v0, 1 - u1, v1, 1 - u0)
+    elif rotation == 180:
+        box = (1 - u1, 1 - v1, 1 - u0, 1 - v0)
+    elif rotation == 270:
+        box = (1 - v1, u0, 1 - v0, u1)
+    else:
+        box = (u0, v0, u1, v1)
+    return tuple(min(1.0, max(0.0, c)) for c in box)
+
+
+class DecodePlan:
+    """
+    خطة واحدة محسوبة من المنطقة والتدوير: ماذا نفك، بأي دقة، وماذا نقص.
+    ‎max_side‎: أطول ضلع مطلوب للمنطقة بعد الفك (None = الدقة الكاملة).
+    ‎mode‎: نمط الفك المطلوب ("L" يفك JPEG إلى الرمادي مباشرة).
+    """
+
+    def __init__(self, roi_rel=None, rotation=0, max_side=MAX_DECODE_SIDE,
+                 mode=None):
+        self.box = roi_to_source(roi_rel, rotation)
+        self.rotation = rotation % 360
+        self.max_side = max_side
+        self.mode = mode
+
+    def crop_box(self, size):
+        """صندوق القص بالبكسل لصورة بأبعاد ‎size‎."""
+        w, h = size
+        x0, y0, x1, y1 = self.box
+        return (int(x0 * w), int(y0 * h),
+                max(int(x0 * w) + 1, int(x1 * w)),
+                max(int(y0 * h) + 1, int(y1 * h)))
+
+    def draft_size(self, size):
+        """الأبعاد الدنيا للصورة كاملة كي تبقى المنطقة بـ ‎max_side‎ على الأقل."""
+        if not self.max_side:
+            return None
+        x0, y0, x1, y1 = self.box
+        w, h = size
+        region = max((x1 - x0) * w, (y1 - y0) * h)
+        if region <= self.max_side * 2:
+            # مقاييس draft هي 1/2 و1/4 و1/8 فقط، فلا فائدة دون الضعف
+            return None
+        scale = self.max_side / region
+        return (math.ceil(w * scale), math.ceil(h * scale))
+
+    def load(self, item):
+        """فتح مسار أو استخدام صورة PIL جاهزة وتطبيق الخطة عليها."""
+        if isinstance(item, Image.Image):
+            im = item
+        else:
+            im = Image.open(item)
+            if im.format == "JPEG":
+                size = self.draft_size(im.size)
+                if size is not None:
+                    full = im.size
+                    im.draft(self.mode or im.mode, size)
+                    logger.debug(f"JPEG draft decode {full} -> {im.size}")
+        if self.box != (0.0, 0.0, 1.0, 1.0):
+            im = im.crop(self.crop_box(im.size))
+        if self.rotation:
+            im = im.rotate(-self.rotation, expand=True)
+        return im
@@ -1,28 +1,281 @@
-from PIL import Image, ImageEnhance, ImageFilter
-import cv2
-import numpy as np
+import time
+import threading
 
-def preprocess_image_advanced(image_path):
+from PIL import Image
+
+# تعزيز التباين الافتراضي (يطابق ImageEnhance.Contrast(...).enhance(2))
+DEFAULT_CONTRAST = 2.0
+
+
+def load_gray(source, inplace=False):
     """
-    تحسين الصورة عبر مجموعة من الفلاتر لتحسين نتائج OCR.
+    تحميل المصدر كمصفوفة uint8 رمادية متصلة وقابلة للكتابة.
+    يقبل: ndarray (رمادي أو RGB/RGBA)، صورة PIL، مسار ملف، أو bytes.
+    الملفات تُفك مباشرة إلى الرمادي دون المرور بنسخة ملونة.
+    المصفوفة الرمادية تُنسخ إلا مع ‎inplace=True‎ (فيُكتب فوقها مباشرة).
     """
+    import cv2
+    import numpy as np
+
+    if isinstance(source, np.ndarray):
+        arr = source
+        if arr.ndim == 3:
+            code = cv2.COLOR_RGBA2GRAY if arr.shape[2] == 4 else cv2.COLOR_RGB2GRAY
+            return cv2.cvtColor(arr, code)
+        if arr.dtype != np.uint8:
+            return cv2.normalize(arr, None, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
+        if inplace and arr.flags.writeable and arr.flags.c_contiguous:
+            return arr
+        return arr.copy()
+
+    if isinstance(source, Image.Image):
+        im = source if source.mode == "L" else source.convert("L")
+        return np.array(im)
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        buf = np.frombuffer(source, dtype=np.uint8)
+    else:
+        # np.fromfile بدل cv2.imread لدعم المسارات العربية على ويندوز
+        buf = np.fromfile(source, dtype=np.uint8)
+    arr = cv2.imdecode(buf, cv2.IMREAD_GRAYSCALE)
+    if arr is None:
+        # صيغ لا يفكها OpenCV (GIF مثلاً) تمر عبر PIL
+        import io
+
+        with Image.open(io.BytesIO(buf.tobytes())) as im:
+            return np.array(im.convert("L"))
+    return arr
+
+
+# ------------------------------ سجل المراحل ------------------------------- #
+# كل مرحلة دالة (gray, **params) -> gray تعمل على مصفوفة uint8 رمادية،
+# وتكتب فوقها ما أمكن. التحويل إلى الرمادي هو دائماً الخطوة الأولى.
+STAGES: dict = {}
+
+
+def register_stage(name):
+    """تسجيل دالة مرحلة باسم يُستخدم في قوائم المراحل والإعدادات المسبقة."""
+    def decorator(func):
+        STAGES[name] = func
+        return func
+    return decorator
+
 
-    # فتح الصورة وتحويلها إلى تدرج الرمادي
-    image = Image.open(image_path).convert("L")
+@register_stage("denoise")
+def denoise(gray, ksize=3, method="median", h=10):
+    """إزالة الضجيج: فلتر وسيط (سريع) أو Non-Local Means (أبطأ وأنظف)."""
+    import cv2
 
-    # تطبيق فلتر تقليل الضوضاء
-    image = image.filter(ImageFilter.MedianFilter())
+    if method == "nlm":
+        return cv2.fastNlMeansDenoising(gray, None, h)
+    cv2.medianBlur(gray, ksize, dst=gray)
+    return gray
 
-    # تعزيز التباين
-    enhancer = ImageEnhance.Contrast(image)
-    image = enhancer.enhance(2)
 
-    # تحويل الصورة إلى مصفوفة NumPy لمزيد من المعالجة
-    img_np = np.array(image)
+@register_stage("contrast")
+def contrast(gray, factor=DEFAULT_CONTRAST):
+    """نفس معادلة ImageEnhance.Contrast: المتوسط + factor × (البكسل − المتوسط)."""
+    import cv2
+    import numpy as np
 
-    # تطبيق العتبة الثنائية باستخدام Otsu
-    _, thresh = cv2.threshold(img_np, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    mean = int(cv2.mean(gray)[0] + 0.5)
+    lut = np.clip(
+        mean + factor * (np.arange(256, dtype=np.float32) - mean) + 0.5,
+        0, 255).astype(np.uint8)
+    cv2.LUT(gray, lut, dst=gray)
+    return gray
 
-    # تحويل النتيجة إلى كائن صورة PIL
-    final_image = Image.fromarray(thresh)
-    return final_image
+
+@register_stage("clahe")
+def clahe(gray, clip=2.0, tile=8):
+    """تسوية تباين محلية، لصور الهاتف ذات الإضاءة غير المتساوية."""
+    import cv2
+
+    cv2.createCLAHE(clipLimit=clip, tileGridSize=(tile, tile)).apply(gray, gray)
+    return gray
+
+
+def _profile_score(mask, angle):
+    """تباين مجاميع الصفوف بعد تدوير القناع: الأسطر الأفقية تعطي أعلى قيمة."""
+    import cv2
+    import numpy as np
+
+    h, w = mask.shape
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), float(angle), 1.0)
+    rotated = cv2.warpAffine(mask, matrix, (w, h), flags=cv2.INTER_NEAREST)
+    return float(np.var(cv2.reduce(rotated, 1, cv2.REDUCE_SUM, dtype=cv2.CV_32F)))
+
+
+def estimate_skew(gray, max_angle=15.0, proxy_side=800, precision=0.1):
+    """
+    زاوية التصحيح (درجات، موجب = عكس عقارب الساعة) مقدّرة على نسخة مصغرة
+    ثنائية من الصفحة: بحث خشن بخطوة درجة ثم دقيق بخطوة ‎precision‎
+    عن الزاوية التي تعظّم تباين المسقط الأفقي. يعيد 0 إن لم يظهر ميل واضح.
+    """
+    import cv2
+    import numpy as np
+
+    h, w = gray.shape
+    scale = min(1.0, proxy_side / max(h, w))
+    proxy = gray if scale == 1.0 else cv2.resize(
+        gray, (max(1, int(w * scale)), max(1, int(h * scale))),
+        interpolation=cv2.INTER_AREA)
+    _, mask = cv2.threshold(
+        proxy, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    # نقيّم داخل قرص مركزي فقط: شكله ثابت مع التدوير، فلا تصنع الزوايا
+    # الفارغة بعد التدوير تبايناً زائفاً في المسقط
+    disk = np.zeros_like(mask)
+    ph, pw = mask.shape
+    cv2.circle(disk, (pw // 2, ph // 2), min(ph, pw) // 2, 1, -1)
+    np.bitwise_and(mask, disk, out=mask)
+    if not mask.any():
+        return 0.0
+
+    coarse = np.arange(-max_angle, max_angle + 0.5, 1.0)
+    scores = [_profile_score(mask, a) for a in coarse]
+    best = float(coarse[int(np.argmax(scores))])
+    fine = np.arange(max(-max_angle, best - 1.0),
+                     min(max_angle, best + 1.0) + precision / 2, precision)
+    scores = [_profile_score(mask, a) for a in fine]
+    best = float(fine[int(np.argmax(scores))])
+    # صفحة بلا أسطر واضحة (صورة، ضجيج، فراغ): لا نخاطر بتدوير لا يفيد
+    if max(scores) <= _profile_score(mask, 0.0) * 1.05:
+        return 0.0
+    return round(best, 2)
+
+
+@register_stage("deskew")
+def deskew(gray, max_angle=15.0, proxy_side=800):
+    """
+    تصحيح ميل الصفحة: الزاوية تُقدَّر على نسخة مصغرة (‎proxy_side‎ بكسل
+    للضلع الأطول)، ثم تحويل affine واحد على الصفحة بدقتها الكاملة.
+    """
+    import cv2
+
+    angle = estimate_skew(gray, max_angle=max_angle, proxy_side=proxy_side)
+    if abs(angle) < 0.1:
+        return gray
+    h, w = gray.shape
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(gray, matrix, (w, h), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+
+
+@register_stage("binarize")
+def binarize(gray, method="otsu", block=31, c=15):
+    """عتبة Otsu عامة، أو تكيّفية (Gaussian) للإضاءة غير المتساوية."""
+    import cv2
+
+    if method == "adaptive":
+        cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                              cv2.THRESH_BINARY, block, c, dst=gray)
+    else:
+        cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU,
+                      dst=gray)
+    return gray
+
+
+# الإعدادات المسبقة: قائمة (اسم المرحلة، معاملاتها) بعد التحويل إلى الرمادي
+PRESETS = {
+    "fast": [
+        ("binarize", {}),
+    ],
+    # ‎preprocess()‎ (ومنها ‎preprocess_image_advanced‎) تأخذ مراحلها من هنا
+    # بلا تصحيح الميل لتطابق المعالجة القديمة، فالناتجان واحد على الصفحات
+    # غير المائلة فقط
+    "balanced": [
+        ("denoise", {"ksize": 3}),
+        ("contrast", {"factor": DEFAULT_CONTRAST}),
+        ("deskew", {}),
+        ("binarize", {}),
+    ],
+    "noisy_phone_photo": [
+        ("denoise", {"ksize": 5}),
+        ("clahe", {"clip": 2.0}),
+        ("deskew", {}),
+        ("binarize", {"method": "adaptive"}),
+    ],
+}
+
+PRESET_LABELS = {
+    "fast": "سريع",
+    "balanced": "متوازن",
+    "noisy_phone_photo": "صورة هاتف مشوشة",
+}
+
+DEFAULT_PRESET = "balanced"
+
+
+class PreprocessPipeline:
+    """
+    سلسلة مراحل مُعرَّفة تصريحياً، مثل:
+        PreprocessPipeline([("denoise", {}), ("deskew", {}), ("binarize", {})])
+    تعمل كلها على مخزن NumPy واحد، وتجمع زمن كل مرحلة عبر الصفحات.
+    """
+
+    def __init__(self, stages, name=None):
+        self.stages = []
+        for stage in stages:
+            stage_name, params = (stage, {}) if isinstance(stage, str) else stage
+            if stage_name not in STAGES:
+                raise ValueError(f"Unknown preprocessing stage: {stage_name}")
+            self.stages.append((stage_name, dict(params)))
+        self.name = name
+        self.pages = 0
+        self.stage_seconds = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_preset(cls, name):
+        if name not in PRESETS:
+            raise ValueError(f"Unknown preprocessing preset: {name}")
+        return cls(PRESETS[name], name=name)
+
+    def __call__(self, source, output="pil", inplace=False):
+        """
+        تشغيل المراحل على المصدر (مصفوفة، PIL، مسار أو bytes).
+        ‎output‎: ‏"pil" (صورة L تشارك المخزن دون نسخ) أو "array".
+        """
+        if output not in ("pil", "array"):
+            raise ValueError(f"Unknown output type: {output}")
+        timings = {}
+        started = time.perf_counter()
+        gray = load_gray(source, inplace=inplace)
+        timings["grayscale"] = time.perf_counter() - started
+        for stage_name, params in self.stages:
+            started = time.perf_counter()
+            gray = STAGES[stage_name](gray, **params)
+            timings[stage_name] = (timings.get(stage_name, 0.0)
+                                   + time.perf_counter() - started)
+        with self._lock:
+            self.pages += 1
+            for stage_name, seconds in timings.items():
+                self.stage_seconds[stage_name] = (
+                    self.stage_seconds.get(stage_name, 0.0) + seconds)
+        return gray if output == "array" else Image.fromarray(gray)
+
+    def timing_summary(self):
+        """{المرحلة: متوسط الزمن بالملي ثانية لكل صفحة} بترتيب التنفيذ."""
+        with self._lock:
+            pages = max(1, self.pages)
+            return {name: round(seconds * 1000 / pages, 2)
+                    for name, seconds in self.stage_seconds.items()}
+
+
+def preprocess(source, output="pil", contrast=DEFAULT_CONTRAST, inplace=False):
+    """
+    تحسين الصورة لـ OCR في مخزن NumPy واحد: فلتر وسيط 3×3، ثم تعزيز
+    التباين، ثم عتبة Otsu. هي الإعداد المسبق "balanced" بلا تصحيح الميل.
+    ‎inplace=True‎ يسمح باستخدام مصفوفة رمادية مُمرَّرة مخزناً (تُعدَّل).
+    """
+    stages = [(name, dict(params, factor=contrast) if name == "contrast" else params)
+              for name, params in PRESETS["balanced"] if name != "deskew"]
+    return PreprocessPipeline(stages)(source, output=output, inplace=inplace)
+
+
+def preprocess_image_advanced(image_path):
+    """
+    تحسين الصورة عبر مجموعة من الفلاتر لتحسين نتائج OCR.
+    يقبل مساراً أو صورة PIL أو مصفوفة أو bytes ويعيد صورة PIL ثنائية.
+    """
+    return preprocess(image_path, output="pil")
@@ -133,6 +133,25 @@ def setup_qt_logging():
 
 
 if __name__ == "__main__":
+    # ضروري لعمال Tesseract المقيمين عند التجميد (PyInstaller على ويندوز)
+    import multiprocessing
+    multiprocessing.freeze_support()
+
+    # وضع الدفعات بدون واجهة: python main.py batch <ملفات|مجلدات|glob> ...
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        from ocr_cli import main as batch_main
+        sys.exit(batch_main(sys.argv[2:]))
+    # خدمة HTTP محلية: python main.py serve --port 8765
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        from ocr_server import main as serve_main
+        sys.exit(serve_main(sys.argv[2:]))
+    if is_headless():
+        show_critical_message(
+            "لا توجد واجهة رسومية",
+            "استخدم وضع الدفعات بدلاً من الواجهة:\n"
+            "python main.py batch <ملفات أو مجلدات> --jobs 4 -o results.jsonl")
+        sys.exit(1)
+
     # سجل بدء التطبيق في سجل المستخدم
     try:
         from event_log import log_user_event
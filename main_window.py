@@ -4,9 +4,7 @@
 import os
 import sys
 import logging
-import smtplib
 import time
-from email.mime.text import MIMEText
 from dotenv import load_dotenv
 
 from PyQt5.QtWidgets import (
@@ -20,16 +18,20 @@ from PyQt5.QtGui import QPixmap, QImage, QIcon, QFont
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer
 
 from PIL import Image, ImageEnhance, UnidentifiedImageError
-from pdf2image import convert_from_path
-import numpy as np
-import cv2
 
 from backup_manager import BackupManager
 from settings_manager import SettingsManager
 from updater import UpdateChecker, UpdateApplier
 from ocr_modern_ui import button_style, report_btn_style, update_btn_style
-from ocr_logic import EasyOCRSingleton, open_multi_page_image
-from image_preprocess import preprocess_image_advanced
+from ocr_logic import EasyOCRSingleton
+from page_sources import open_page_source
+from cancellation import CancelToken
+from ocr_cache import get_ocr_cache
+from result_view import ResultView
+from preview_service import get_preview_cache, rotate_preview
+from ocr_pipeline import (
+    OCRPipeline, OCRCancelledError, OCRPageError, easyocr_langs
+)
 
 
 # —— تحميل متغيرات البيئة للبريد —— #
@@ -46,6 +48,9 @@ def send_email(subject, body, to_email=TO_EMAIL):
     if not SMTP_USER or not SMTP_PASSWORD:
         logging.warning("SMTP credentials missing—email skipped.")
         return
+    import smtplib
+    from email.mime.text import MIMEText
+
     msg = MIMEText(body, "plain", "utf-8")
     msg["Subject"] = subject
     msg["From"] = SMTP_USER
@@ -291,7 +296,11 @@ class OCRApp(QWidget):
 
 class OCRWorker(QThread):
     progress = pyqtSignal(int, int)
-    result = pyqtSignal(str)
+    # (رقم الصفحة، نصها، زمنها بالثواني) فور اكتمال كل صفحة
+    page_ready = pyqtSignal(int, str, float)
+    page_skipped = pyqtSignal(int)
+    # عدد الصفحات عند انتهاء المعالجة كلها
+    finished_pages = pyqtSignal(int)
     error = pyqtSignal(str)
 
     def __init__(
@@ -301,7 +310,20 @@ class OCRWorker(QThread):
             lang,
             roi_rel=None,
             rotation=0,
-            enhance=False):
+            enhance=False,
+            preset="balanced",
+            workers=1,
+            lookahead=4,
+            cache=None,
+            easyocr_batch=1,
+            early_stop_conf=None,
+            text_layer=True,
+            text_regions=False,
+            tiling=True,
+            auto_rotate=False,
+            skip_blank=False,
+            blank_thresholds=None,
+            duplicates=None):
         super().__init__()
         self.file_path = file_path
         self.engine = engine
@@ -309,85 +331,129 @@ class OCRWorker(QThread):
         self.roi_rel = roi_rel
         self.rotation = rotation
         self.enhance = enhance
-        self._cancelled = False
+        self.preset = preset
+        self.workers = workers
+        self.lookahead = lookahead
+        self.cache = cache
+        self.easyocr_batch = easyocr_batch
+        self.early_stop_conf = early_stop_conf
+        self.text_layer = text_layer
+        self.text_regions = text_regions
+        self.tiling = tiling
+        self.auto_rotate = auto_rotate
+        self.skip_blank = skip_blank
+        self.blank_thresholds = blank_thresholds
+        self.duplicates = duplicates
+        self.token = CancelToken()
 
     def run(self):
         try:
-            # إعداد اللغات
-            langs = []
-            if "ara" in self.lang:
-                langs.append("ar")
-            if "eng" in self.lang:
-                langs.append("en")
-            if not langs:
-                langs = ["en"]
-
             reader = None
             if self.engine in ["EasyOCR", "كلاهما"] and is_easyocr_enabled():
-                reader = EasyOCRSingleton.get_reader(langs)
+                reader = EasyOCRSingleton.get_reader(easyocr_langs(self.lang))
                 self.progress.emit(0, 1)
 
-            # جلب الصور من PDF (DPI=100 سريع)، TIFF أو ملف وحيد
-            if self.file_path.lower().endswith('.pdf'):
-                pages = convert_from_path(
-                    self.file_path,
-                    dpi=100,
-                    thread_count=4
-                )
-            elif self.file_path.lower().endswith(('.tiff', '.tif')):
-                pages = open_multi_page_image(self.file_path)
-            else:
-                pages = [self.file_path]
+            # جلب الصور من PDF (DPI=100 سريع، نوافذ متدفقة)، TIFF أو ملف وحيد
+            pages = open_page_source(
+                self.file_path, dpi=100, lookahead=self.lookahead,
+                text_layer=self.text_layer, roi_rel=self.roi_rel)
 
             total = len(pages)
             if total > 20:
                 self.error.emit("تنبيه: الملف يحوي >20 صفحة وقد يبطئ العملية.")
 
-            all_text = []
-            for idx, item in enumerate(pages, start=1):
-                if self._cancelled:
-                    self.error.emit("تم إلغاء المعالجة.")
-                    return
-
-                im = Image.open(item) if isinstance(item, str) else item
-                if self.rotation:
-                    im = im.rotate(-self.rotation, expand=True)
-                if self.roi_rel:
-                    w, h = im.size
-                    x, y, wr, hr = self.roi_rel
-                    im = im.crop((int(x * w), int(y * h),
-                                  int((x + wr) * w), int((y + hr) * h)))
-
-                proc = preprocess_image_advanced(im) if self.enhance else im
-
-                text_block = ""
-                try:
-                    if self.engine in ["Tesseract", "كلاهما"]:
-                        import pytesseract
-
-                        cfg = "--oem 3 --psm 6"
-                        text_block += pytesseract.image_to_string(
-                            proc, lang=self.lang, config=cfg).strip()
-                    if reader:
-                        arr = np.array(proc)
-                        txt = reader.readtext(arr, detail=0, paragraph=True)
-                        text_block += "\n".join(txt).strip()
-                except MemoryError:
+            pipeline = OCRPipeline(
+                engine=self.engine,
+                lang=self.lang,
+                roi_rel=self.roi_rel,
+                rotation=self.rotation,
+                enhance=self.enhance,
+                preset=self.preset,
+                reader=reader,
+                workers=self.workers,
+                cache=self.cache,
+                easyocr_batch=self.easyocr_batch,
+                early_stop_conf=self.early_stop_conf,
+                text_regions=self.text_regions,
+                tiling=self.tiling,
+                auto_rotate=self.auto_rotate,
+                skip_blank=self.skip_blank,
+                blank_thresholds=self.blank_thresholds,
+                duplicates=self.duplicates
+            )
+            done = 0
+            try:
+                for idx, text_block in pipeline.run(
+                        pages, total,
+                        progress=self.progress.emit,
+                        token=self.token):
+                    done = idx
+                    if idx in pipeline.blank_pages:
+                        self.page_skipped.emit(idx)
+                    else:
+                        self.page_ready.emit(
+                            idx, text_block, pipeline.last_page_seconds)
+            except OCRCancelledError:
+                self.error.emit("تم إلغاء المعالجة.")
+                return
+            except OCRPageError as ex:
+                if isinstance(ex.error, MemoryError):
                     self.error.emit("نفدت الذاكرة خلال المعالجة.")
-                    return
-                except Exception as ex:
-                    self.error.emit(f"خطأ في الصفحة {idx}: {ex}")
-                    return
-
-                all_text.append(f"--- صفحة {idx} ---\n{text_block}")
-                self.progress.emit(idx, total)
-
-            self.result.emit("\n\n".join(all_text).strip())
+                else:
+                    self.error.emit(str(ex))
+                return
+
+            if getattr(pages, "text_layer_pages", 0):
+                logging.info(
+                    f"{pages.text_layer_pages} PDF pages used the embedded "
+                    f"text layer instead of OCR")
+            regions = pipeline.region_stats
+            if regions["split_pages"]:
+                logging.info(
+                    f"Text regions: {regions['split_pages']}/{regions['pages']} "
+                    f"pages split, engine saw "
+                    f"{regions['ocr_pixels'] / regions['page_pixels']:.0%} "
+                    f"of page pixels")
+            if pipeline.blank_pages:
+                logging.info(
+                    f"Skipped {len(pipeline.blank_pages)}/{total} blank pages")
+            if pipeline.orientation is not None:
+                logging.info(
+                    f"Auto orientation rotated "
+                    f"{pipeline.orientation.rotated_pages} pages")
+            if pipeline.preprocessor is not None:
+                logging.info(
+                    f"Preprocessing '{self.preset}' ms/page by stage: "
+                    f"{pipeline.preprocessor.timing_summary()}")
+            if self.cache is not None:
+                logging.info(f"OCR cache stats: {self.cache.stats()}")
+            if self.duplicates is not None:
+                logging.info(
+                    f"Duplicate pages reused: {pipeline.duplicate_pages}, "
+                    f"index stats: {self.duplicates.stats()}")
+            self.finished_pages.emit(done)
         except Exception as ex:
             self.error.emit(str(ex))
 
     def cancel(self):
-        self._cancelled = True
+        """إلغاء فوري: يقتل عمال Tesseract المشغولين بالصفحات الجارية."""
+        self.token.cancel()
+
+
+class PreviewWorker(QThread):
+    """رسم معاينة الملف في الخلفية وحفظها في ذاكرة المعاينات."""
+    ready = pyqtSignal(str, object)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def run(self):
+        try:
+            self.ready.emit(self.path, get_preview_cache().render(self.path))
+        except Exception as ex:
+            self.failed.emit(self.path, str(ex))
 
 
 class OCRMainWindow(QMainWindow):
@@ -402,6 +468,7 @@ class OCRMainWindow(QMainWindow):
 
         self.file_path = ""
         self.roi_rel = None
+        self._preview_workers = set()
         self.current_rotation = 0
         self.ocr_start_time = None
         self.ocr_thread = None
@@ -414,6 +481,11 @@ class OCRMainWindow(QMainWindow):
         self._build_menu()
         self.check_for_updates()
 
+        if (self.settings.get("engine") in ["EasyOCR", "كلاهما"]
+                and is_easyocr_enabled()):
+            EasyOCRSingleton.warm_up(
+                easyocr_langs(self.settings.get("language") or "ara+eng"))
+
         timer = QTimer(self)
         timer.timeout.connect(self.send_periodic_status)
         timer.start(3600_000)
@@ -599,13 +671,12 @@ class OCRMainWindow(QMainWindow):
         right_vbox.setContentsMargins(0, 0, 0, 0)
         right_vbox.setSpacing(0)
 
-        self.result_edit = QTextEdit()
+        # النتائج تُضاف صفحة بصفحة أثناء المعالجة
+        self.result_edit = ResultView()
         self.result_edit.setPlaceholderText(
-            "سيظهر النص المستخرج هنا بعد المعالجة...")
-        self.result_edit.setReadOnly(True)
-        self.result_edit.setAlignment(Qt.AlignRight)
+            "سيظهر النص المستخرج هنا أثناء المعالجة...")
         self.result_edit.setStyleSheet("""
-            QTextEdit {
+            QPlainTextEdit {
                 font-size: 15px;
                 border-radius: 13px;
                 background: #fffbe9;
@@ -690,20 +761,37 @@ class OCRMainWindow(QMainWindow):
         self.show_preview(self.file_path)
 
     def show_preview(self, path):
+        """
+        عرض المعاينة من الذاكرة فوراً، أو رسمها في خيط خلفي أول مرة؛
+        التدوير يُطبَّق على المعاينة المحفوظة فقط.
+        """
+        img = get_preview_cache().get(path)
+        if img is not None:
+            self._display_preview(img)
+            return
+        if any(w.path == path for w in self._preview_workers):
+            return  # الرسم جارٍ وسيُعرض بالتدوير الحالي عند انتهائه
+        self.preview_label.setText("جارٍ تحميل المعاينة...")
+        worker = PreviewWorker(path)
+        worker.ready.connect(self._preview_ready)
+        worker.failed.connect(self._preview_failed)
+        worker.finished.connect(lambda: self._preview_workers.discard(worker))
+        self._preview_workers.add(worker)
+        worker.start()
+
+    def _preview_ready(self, path, img):
+        # نتيجة ملف سابق وصلت بعد استيراد ملف آخر
+        if path == self.file_path:
+            self._display_preview(img)
+
+    def _preview_failed(self, path, message):
+        if path == self.file_path:
+            self.preview_label.setText("خطأ في المعاينة!")
+            logging.error(f"Preview error: {message}")
+
+    def _display_preview(self, img):
         try:
-            if path.lower().endswith('.pdf'):
-                img = convert_from_path(
-                    path,
-                    first_page=1, last_page=1,
-                    dpi=100,
-                    thread_count=1
-                )[0]
-            else:
-                img = Image.open(path)
-            if self.current_rotation:
-                img = img.rotate(-self.current_rotation, expand=True)
-            img.thumbnail((200, 200))
-            rgb = img.convert('RGB')
+            rgb = rotate_preview(img, self.current_rotation)
             w, h = rgb.size
             bpl = 3 * w
             data = rgb.tobytes('raw', 'RGB')
@@ -719,7 +807,7 @@ class OCRMainWindow(QMainWindow):
             logging.error(f"Preview error: {e}")
 
     def start_ocr(self):
-        self.result_edit.clear()
+        self.result_edit.reset()
         self.progress_bar.setRange(0, 1)
         self.progress_bar.setValue(0)
         self.process_btn.setEnabled(False)
@@ -733,13 +821,52 @@ class OCRMainWindow(QMainWindow):
             lang=self.lang_combo.currentText(),
             roi_rel=self.roi_rel,
             rotation=self.current_rotation,
-            enhance=self.enhance_chk.isChecked()
+            enhance=self.enhance_chk.isChecked(),
+            preset=self.settings.get("preprocess_preset") or "balanced",
+            workers=self._ocr_workers(),
+            lookahead=self.settings.get("pdf_lookahead") or 0,
+            cache=self._ocr_cache(),
+            easyocr_batch=self.settings.get("easyocr_batch_pages") or 1,
+            early_stop_conf=self.settings.get("early_stop_confidence") or None,
+            text_layer=bool(self.settings.get("pdf_text_layer")),
+            text_regions=bool(self.settings.get("text_regions")),
+            tiling=self.settings.get("tile_large_pages") is not False,
+            auto_rotate=self.settings.get("auto_orientation") is not False,
+            skip_blank=bool(self.settings.get("skip_blank_pages")),
+            blank_thresholds={
+                "max_ink": self.settings.get("blank_max_ink") or 0.0002,
+                "ink_contrast": self.settings.get("blank_ink_contrast") or 60,
+            },
+            duplicates=self._duplicate_index()
         )
         self.ocr_thread.progress.connect(self.update_progress)
-        self.ocr_thread.result.connect(self.ocr_finished)
+        self.ocr_thread.page_ready.connect(self.page_finished)
+        self.ocr_thread.page_skipped.connect(self.result_edit.skip_page)
+        self.ocr_thread.finished_pages.connect(self.ocr_finished)
         self.ocr_thread.error.connect(self.handle_error)
         self.ocr_thread.start()
 
+    def _ocr_workers(self):
+        """عدد الصفحات المتزامنة: 1 ما لم يُفعَّل الوضع المتوازي."""
+        if not self.settings.get("parallel_pages"):
+            return 1
+        return self.settings.get("ocr_workers") or os.cpu_count() or 1
+
+    def _ocr_cache(self):
+        if not self.settings.get("ocr_cache"):
+            return None
+        return get_ocr_cache(max_mb=self.settings.get("ocr_cache_mb"))
+
+    def _duplicate_index(self):
+        if not self.settings.get("duplicate_pages"):
+            return None
+        from page_hash import get_duplicate_index
+
+        distance = self.settings.get("duplicate_max_distance")
+        return get_duplicate_index(
+            max_distance=8 if distance is None else distance,
+            verify=self.settings.get("duplicate_verify_exact") is not False)
+
     def update_progress(self, current, total):
         if total <= 1:
             self.progress_bar.setRange(0, 0)
@@ -747,10 +874,13 @@ class OCRMainWindow(QMainWindow):
             self.progress_bar.setRange(0, total)
             self.progress_bar.setValue(current)
 
-    def ocr_finished(self, text):
+    def page_finished(self, idx, text, seconds):
+        logging.debug(f"Page {idx} finished in {seconds:.2f}s")
+        self.result_edit.add_page(idx, text)
+
+    def ocr_finished(self, pages):
         elapsed = time.time() - self.ocr_start_time
-        text += f"\n\n--- المدة: {elapsed:.2f} ثانية ---"
-        self.result_edit.setPlainText(text)
+        self.result_edit.append_note(f"--- المدة: {elapsed:.2f} ثانية ---")
         self.process_btn.setEnabled(True)
         self.save_btn.setEnabled(True)
         self.cancel_btn.setVisible(False)
@@ -761,7 +891,8 @@ class OCRMainWindow(QMainWindow):
 
     def handle_error(self, msg):
         QMessageBox.critical(self, "خطأ في OCR", msg)
-        self.result_edit.setPlainText("خطأ:\n" + msg)
+        # الصفحات المعروضة قبل الخطأ تبقى، والرسالة تُضاف بعدها
+        self.result_edit.append_note("خطأ:\n" + msg)
         self.process_btn.setEnabled(True)
         self.save_btn.setEnabled(False)
         self.cancel_btn.setVisible(False)
@@ -830,11 +961,15 @@ class OCRMainWindow(QMainWindow):
         dlg.setWindowModality(Qt.WindowModal)
         dlg.canceled.connect(self.update_applier.requestInterruption)
         self.update_applier.progress.connect(dlg.setValue)
-        self.update_applier.finished.connect(self.finish_update)
+        self.update_applier.update_finished.connect(
+            lambda success, message: self.finish_update(success, dlg.wasCanceled()))
+        self.update_applier.update_finished.connect(lambda *_: dlg.reset())
         self.update_applier.start()
         dlg.exec_()
 
-    def finish_update(self, success):
+    def finish_update(self, success, cancelled=False):
+        if cancelled:
+            return
         if success:
             QMessageBox.information(
                 self,
@@ -0,0 +1,143 @@
+# ocr_cache.py
+"""
+ذاكرة تخزين مؤقت على القرص لنتائج OCR، معنونة بالمحتوى.
+
+المفتاح بصمة لبكسلات الصفحة مع كل ما يؤثر في النص الناتج
+(المحرك، اللغة، إعدادات psm/oem، التدوير، المنطقة، التحسين)،
+لذا يُعاد استخدام النتيجة مهما تغيّر اسم الملف أو مساره.
+يُحدَّث زمن تعديل الملف عند كل قراءة، ويُحذف الأقدم عند تجاوز الحجم الأقصى.
+"""
+import os
+import json
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "ocr_cache"
+DEFAULT_MAX_MB = 256
+
+
+def page_fingerprint(image, **params):
+    """بصمة صفحة (PIL) مع معاملات المعالجة؛ تُستخدم مفتاحاً للذاكرة."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{image.mode}|{image.size}|".encode())
+    h.update(image.tobytes())
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+class OCRCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_mb=DEFAULT_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._bytes = None
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".txt")
+
+    def _entries(self):
+        """(mtime, size, path) لكل مدخل محفوظ."""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".txt"):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def _total_bytes(self):
+        if self._bytes is None:
+            self._bytes = sum(size for _, size, _ in self._entries())
+        return self._bytes
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            os.utime(path)  # آخر استخدام، لترتيب LRU
+        except (FileNotFoundError, OSError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return text
+
+    def put(self, key, text):
+        path = self._path(key)
+        data = text.encode("utf-8")
+        with self._lock:
+            self._total_bytes()  # يُحسب قبل الكتابة كي لا يُعدّ المدخل مرتين
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"OCR cache write failed: {e}")
+            return
+        with self._lock:
+            self._bytes += len(data)
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """حذف الأقدم استخداماً حتى ينزل الحجم إلى 90% من الحد الأقصى."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._bytes = total
+
+    def clear(self):
+        with self._lock:
+            for _, _, path in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "bytes": self._total_bytes(),
+                "max_bytes": self.max_bytes,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_ocr_cache(max_mb=None):
+    """الذاكرة المشتركة للتطبيق؛ ‎max_mb‎ يعدّل الحد الأقصى إن مُرِّر."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = OCRCache()
+        if max_mb is not None:
+            _cache.max_bytes = int(max_mb * 1024 * 1024)
+        return _cache
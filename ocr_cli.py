@@ -0,0 +1,258 @@
+# ocr_cli.py
+"""
+وضع الدفعات بدون واجهة رسومية.
+
+يعالج ملفات أو مجلدات أو أنماط glob بنفس خط معالجة التطبيق دون استيراد
+PyQt، ويكتب سطر JSON لكل صفحة (أو لكل مستند) إلى stdout أو ملف:
+
+    python main.py batch scans/ "inbox/**/*.pdf" --jobs 8 -o results.jsonl
+"""
+import os
+import sys
+import glob
+import json
+import time
+import logging
+import argparse
+
+from blank_pages import BLANK_MAX_INK
+from image_preprocess import DEFAULT_PRESET, PRESETS
+from page_hash import DUPLICATE_MAX_DISTANCE
+
+SUPPORTED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.pdf')
+
+ENGINES = {
+    "tesseract": "Tesseract",
+    "easyocr": "EasyOCR",
+    "both": "كلاهما",
+}
+
+logger = logging.getLogger(__name__)
+
+
+def iter_input_files(inputs, recursive=False):
+    """توسيع المدخلات (ملفات، مجلدات، glob) إلى قائمة ملفات مدعومة مرتبة."""
+    seen = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            if recursive:
+                candidates = sorted(
+                    os.path.join(root, name)
+                    for root, _, names in os.walk(item) for name in names)
+            else:
+                candidates = sorted(
+                    os.path.join(item, name) for name in os.listdir(item))
+        elif os.path.isfile(item):
+            candidates = [item]
+        else:
+            candidates = sorted(glob.glob(item, recursive=True))
+        for path in candidates:
+            if (path.lower().endswith(SUPPORTED_EXTENSIONS)
+                    and os.path.isfile(path) and path not in seen):
+                seen.add(path)
+                yield path
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="main.py batch",
+        description="OCR دفعي للصور وملفات PDF بدون واجهة رسومية.")
+    parser.add_argument("inputs", nargs="+",
+                        help="ملفات أو مجلدات أو أنماط glob")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="عدد الصفحات المعالجة بالتوازي")
+    parser.add_argument("-o", "--output",
+                        help="ملف JSON Lines للنتائج (افتراضياً stdout)")
+    parser.add_argument("--per-document", action="store_true",
+                        help="سطر واحد لكل مستند بدلاً من سطر لكل صفحة")
+    parser.add_argument("-r", "--recursive", action="store_true",
+                        help="البحث داخل المجلدات الفرعية")
+    parser.add_argument("--lang", default="ara+eng")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="tesseract")
+    parser.add_argument("--enhance", action="store_true",
+                        help="تحسين الصورة قبل التعرف")
+    parser.add_argument("--preset", choices=PRESETS,
+                        help="مراحل التحسين (تفعّل --enhance)؛ الافتراضي balanced")
+    parser.add_argument("--regions", action="store_true",
+                        help="كشف كتل النص وإرسالها وحدها إلى Tesseract")
+    parser.add_argument("--no-tiling", action="store_true",
+                        help="عدم تقطيع الصفحات الضخمة إلى بلاطات")
+    parser.add_argument("--auto-rotate", action="store_true",
+                        help="كشف اتجاه كل صفحة (Tesseract OSD) وتصحيحه قبل التعرف")
+    parser.add_argument("--skip-blank", action="store_true",
+                        help="تخطي الصفحات الفارغة دون إرسالها إلى المحرك")
+    parser.add_argument("--blank-max-ink", type=float, default=BLANK_MAX_INK,
+                        help="أقصى نسبة حبر لتُعدّ الصفحة فارغة")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="إعادة استخدام نص الصفحات المكررة (تطابق تام للبكسلات؛ "
+                             "تكفيه ذاكرة OCR إن لم تُعطَّل بـ --no-cache)")
+    parser.add_argument("--dedupe-near", action="store_true",
+                        help="قبول النسخ المعاد مسحها (بصمة إدراكية وشبكة حبر)؛ "
+                             "قد يخلط صفحات تختلف بحقل معبأ فقط")
+    parser.add_argument("--dedupe-distance", type=int,
+                        default=DUPLICATE_MAX_DISTANCE,
+                        help="أقصى مسافة Hamming بين بصمتي صفحتين مكررتين")
+    parser.add_argument("--rotation", type=int, default=0,
+                        choices=[0, 90, 180, 270])
+    parser.add_argument("--dpi", type=int, default=100,
+                        help="دقة رسم صفحات PDF")
+    parser.add_argument("--force-ocr", action="store_true",
+                        help="تجاهل طبقة النص المضمنة في PDF وإجراء OCR دائماً")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="تعطيل ذاكرة نتائج OCR على القرص")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    return parser
+
+
+class _RecordWriter:
+    """كاتب JSON Lines يفرّغ كل سطر فوراً ليُقرأ أثناء المعالجة."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, record):
+        self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+
+def run_batch(args, out):
+    from ocr_pipeline import OCRPipeline, OCRPageError, easyocr_langs
+    from page_sources import open_page_source
+    from tesseract_pool import get_tesseract_pool
+
+    engine = ENGINES[args.engine]
+    get_tesseract_pool(size=args.jobs)
+    reader = None
+    if engine != "Tesseract":
+        from ocr_logic import EasyOCRSingleton
+
+        reader = EasyOCRSingleton.get_reader(easyocr_langs(args.lang))
+    cache = None
+    if not args.no_cache:
+        from ocr_cache import get_ocr_cache
+
+        cache = get_ocr_cache()
+
+    duplicates = None
+    if args.dedupe or args.dedupe_near:
+        from page_hash import get_duplicate_index
+
+        duplicates = get_duplicate_index(
+            max_distance=args.dedupe_distance, verify=not args.dedupe_near)
+
+    pipeline = OCRPipeline(
+        engine=engine,
+        lang=args.lang,
+        rotation=args.rotation,
+        enhance=args.enhance or args.preset is not None,
+        preset=args.preset or DEFAULT_PRESET,
+        reader=reader,
+        workers=args.jobs,
+        cache=cache,
+        text_regions=args.regions,
+        tiling=not args.no_tiling,
+        auto_rotate=args.auto_rotate,
+        skip_blank=args.skip_blank,
+        blank_thresholds={"max_ink": args.blank_max_ink},
+        duplicates=duplicates)
+
+    writer = _RecordWriter(out)
+    slots = []      # (path, page_no, total) لكل صفحة بترتيب الإرسال
+    documents = {}  # path -> نصوص الصفحات في وضع --per-document
+    failures = 0
+
+    def pages():
+        nonlocal failures
+        for path in iter_input_files(args.inputs, args.recursive):
+            try:
+                source = open_page_source(
+                    path, dpi=args.dpi, text_layer=not args.force_ocr)
+                total = len(source)
+                if args.per_document:
+                    documents[path] = {}
+                for page_no, page in enumerate(source, start=1):
+                    slots.append((path, page_no, total))
+                    yield page
+            except Exception as ex:
+                failures += 1
+                documents.pop(path, None)
+                writer.write({"file": path, "error": str(ex)})
+
+    started = time.perf_counter()
+    for idx, text in pipeline.run(pages(), errors="return"):
+        path, page_no, total = slots[idx - 1]
+        record = {"file": path, "page": page_no, "pages": total}
+        if isinstance(text, OCRPageError):
+            failures += 1
+            record["error"] = str(text.error)
+        else:
+            record["text"] = text
+            if idx in pipeline.blank_pages:
+                record["blank"] = True
+        if not args.per_document:
+            writer.write(record)
+            continue
+        doc = documents.get(path)
+        if doc is None:
+            continue
+        doc[page_no] = record
+        if len(doc) == total:
+            del documents[path]
+            ordered = [doc[n] for n in sorted(doc)]
+            result = {
+                "file": path,
+                "pages": total,
+                "text": "\n\n".join(r.get("text", "") for r in ordered),
+            }
+            errors = {r["page"]: r["error"] for r in ordered if "error" in r}
+            if errors:
+                result["errors"] = errors
+            writer.write(result)
+
+    logger.info(
+        f"Batch finished: {len(slots)} pages in "
+        f"{time.perf_counter() - started:.1f}s, {failures} failures")
+    regions = pipeline.region_stats
+    if regions["split_pages"]:
+        logger.info(
+            f"Text regions: {regions['split_pages']}/{regions['pages']} pages "
+            f"split, engine saw "
+            f"{regions['ocr_pixels'] / regions['page_pixels']:.0%} of page pixels")
+    if pipeline.blank_pages:
+        logger.info(f"Skipped {len(pipeline.blank_pages)} blank pages")
+    if pipeline.orientation is not None:
+        logger.info(f"Auto orientation rotated "
+                    f"{pipeline.orientation.rotated_pages} pages")
+    if pipeline.preprocessor is not None:
+        logger.info(f"Preprocessing ms/page by stage: "
+                    f"{pipeline.preprocessor.timing_summary()}")
+    if cache is not None:
+        logger.info(f"OCR cache stats: {cache.stats()}")
+    if duplicates is not None:
+        logger.info(f"Duplicate pages reused: {pipeline.duplicate_pages}, "
+                    f"index stats: {duplicates.stats()}")
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # main.py يوجّه السجل إلى ملف؛ نضيف stderr حتى يرى المشغّل التقدم والأخطاء
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(
+        logging.Formatter("%(asctime)s [%(levelname)s]: %(message)s"))
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(logging.INFO if args.verbose else logging.WARNING)
+    if args.jobs < 1:
+        print("--jobs يجب أن يكون 1 أو أكثر", file=sys.stderr)
+        return 2
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            return run_batch(args, out)
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+    return run_batch(args, sys.stdout)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,12 @@
 # ocr_logic.py
-from PIL import Image, UnidentifiedImageError
+from PIL import Image
 import os
+import json
+import time
 import logging
+import threading
 import subprocess
+from collections import OrderedDict
 
 logger = logging.getLogger(__name__)
 
@@ -54,41 +58,222 @@ def configure_tesseract():
         "- Windows: Download from https://github.com/UB-Mannheim/tesseract/wiki"
     )
 
-try:
-    tesseract_path = configure_tesseract()
+# نتيجة الاكتشاف تُحفظ هنا وتُعاد صلاحيتها بزمن تعديل الملف التنفيذي فقط
+TESSERACT_INFO_FILE = "tesseract_info.json"
+
+_tesseract_info = None
+_tesseract_lock = threading.Lock()
+
+
+def _load_tesseract_info():
+    """المعلومات المحفوظة إن كانت ما تزال صالحة، وإلا None."""
+    try:
+        with open(TESSERACT_INFO_FILE, "r", encoding="utf-8") as f:
+            info = json.load(f)
+        if os.stat(info["path"]).st_mtime != info["mtime"]:
+            return None
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    override = os.environ.get('TESSERACT_CMD')
+    if override and override != info["path"]:
+        return None
+    return info
+
+
+def _probe_tesseract(pytesseract):
+    path = configure_tesseract()
+    info = {
+        "path": path,
+        "mtime": os.stat(path).st_mtime,
+        "version": str(pytesseract.get_tesseract_version()),
+        "languages": sorted(pytesseract.get_languages(config='')),
+    }
+    try:
+        with open(TESSERACT_INFO_FILE, "w", encoding="utf-8") as f:
+            json.dump(info, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        logger.warning(f"Could not save Tesseract info: {e}")
+    return info
+
+
+def tesseract_info():
+    """
+    (المسار، الإصدار، اللغات المتاحة) لـ Tesseract؛ يُكتشف عند أول استدعاء
+    لا عند الاستيراد، ويُقرأ من ‎TESSERACT_INFO_FILE‎ دون أي عملية فرعية
+    ما دام الملف التنفيذي لم يتغير.
+    """
+    global _tesseract_info
+    with _tesseract_lock:
+        if _tesseract_info is not None:
+            return _tesseract_info
+        try:
+            import pytesseract
+        except ImportError:
+            raise TesseractNotConfiguredError("pytesseract package not installed")
+        info = _load_tesseract_info()
+        if info is None:
+            try:
+                info = _probe_tesseract(pytesseract)
+            except TesseractNotConfiguredError:
+                raise
+            except Exception as e:
+                raise TesseractNotConfiguredError(f"Tesseract probe failed: {e}")
+        pytesseract.pytesseract.tesseract_cmd = info["path"]
+        logger.info(
+            f"Using Tesseract {info['version']} at: {info['path']} "
+            f"(languages: {', '.join(info['languages'])})")
+        _tesseract_info = info
+        return info
+
+
+def get_pytesseract():
+    """وحدة pytesseract مهيأة بالمسار المكتشف، أو TesseractNotConfiguredError."""
+    tesseract_info()
     import pytesseract
-    logger.info(f"Tesseract version: {pytesseract.get_tesseract_version()}")
-except Exception as e:
-    logger.error(f"Tesseract configuration failed: {str(e)}")
-    pytesseract = None
+
+    return pytesseract
+
+
+def __getattr__(name):
+    # توافق مع الشيفرة القديمة: ocr_logic.pytesseract و ocr_logic.tesseract_path
+    # صارا كسولين؛ None يعني أن Tesseract غير مهيأ كما كان سابقاً
+    if name not in ("pytesseract", "tesseract_path"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        info = tesseract_info()
+    except Exception as e:
+        logger.error(f"Tesseract configuration failed: {str(e)}")
+        return None
+    return get_pytesseract() if name == "pytesseract" else info["path"]
+
+# قارئ EasyOCR غير آمن للخيوط، ويتشاركه كل من يطلبه: مهام الخادم المتوازية،
+# وتشغيل جديد في الواجهة بينما استدعاء التشغيل الملغى ما زال جارياً.
+# قفل واحد يسلسل كل الاستدعاءات (المعالج/GPU مشغول بأحدها أصلاً)
+_easyocr_lock = threading.Lock()
+
+
+class SerializedReader:
+    """غلاف لقارئ EasyOCR يمرر كل استدعاء تعرّف عبر ‎_easyocr_lock‎."""
+
+    def __init__(self, reader, lock=_easyocr_lock):
+        self._reader = reader
+        self._lock = lock
+
+    def readtext(self, *args, **kwargs):
+        with self._lock:
+            return self._reader.readtext(*args, **kwargs)
+
+    def readtext_batched(self, *args, **kwargs):
+        with self._lock:
+            return self._reader.readtext_batched(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._reader, name)
+
 
 class EasyOCRSingleton:
+    """
+    سجل قرّاء EasyOCR مفهرس بمجموعة اللغات.
+    يُحمَّل القارئ عند أول طلب (أو مسبقاً عبر ‎warm_up‎) ويُحتفظ بآخر
+    ‎max_readers‎ قرّاء فقط؛ الأقدم استخداماً يُحذف أولاً.
+    القارئ المُعاد ‎SerializedReader‎: استدعاءاته متسلسلة أياً كان الخيط.
+    """
     _instance = None
+    max_readers = 2
+    _readers: OrderedDict = OrderedDict()
+    _key_locks: dict = {}
+    _lock = threading.Lock()
 
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
             cls._instance = super(EasyOCRSingleton, cls).__new__(cls)
         return cls._instance
 
+    @classmethod
+    def _cached(cls, key):
+        with cls._lock:
+            reader = cls._readers.get(key)
+            if reader is not None:
+                cls._readers.move_to_end(key)
+            return reader
+
+    @classmethod
+    def get_reader(cls, langs):
+        key = tuple(langs)
+        reader = cls._cached(key)
+        if reader is not None:
+            return reader
+        with cls._lock:
+            key_lock = cls._key_locks.setdefault(key, threading.Lock())
+        # قفل لكل مجموعة لغات: طلب يصل أثناء التحميل المسبق ينتظره ولا يكرره
+        with key_lock:
+            reader = cls._cached(key)
+            if reader is not None:
+                return reader
+            import easyocr
+
+            started = time.perf_counter()
+            reader = SerializedReader(easyocr.Reader(list(key), verbose=False))
+            logger.info(
+                f"EasyOCR reader {key} loaded in "
+                f"{time.perf_counter() - started:.1f}s")
+            with cls._lock:
+                cls._readers[key] = reader
+                while len(cls._readers) > cls.max_readers:
+                    evicted, _ = cls._readers.popitem(last=False)
+                    logger.info(f"EasyOCR reader {evicted} evicted")
+        return reader
+
+    @classmethod
+    def warm_up(cls, langs):
+        """تحميل القارئ في خيط خلفي حتى لا يقع زمن التحميل على أول ضغطة OCR."""
+        def load():
+            try:
+                cls.get_reader(langs)
+            except Exception as e:
+                logger.warning(f"EasyOCR warm-up failed: {e}")
+
+        thread = threading.Thread(target=load, name="easyocr-warmup", daemon=True)
+        thread.start()
+        return thread
+
 def open_multi_page_image(path):
-    try:
-        return Image.open(path)
-    except UnidentifiedImageError:
-        raise ValueError("Cannot open file as multi-page image")
+    """مصدر إطارات كسول: ‎len()‎ لعدد الإطارات، والتكرار يفك إطاراً واحداً كل مرة."""
+    from page_sources import TiffFrameSource
+
+    return TiffFrameSource(path)
 
 def extract_text_from_image(image_path):
-    if pytesseract is None:
-        raise TesseractNotConfiguredError("Tesseract OCR is not properly configured")
+    from ocr_cache import get_ocr_cache, page_fingerprint
+
+    # المفتاح يسجّل المعالجة التي جرت فعلاً؛ الذاكرة تُسأل قبل أي عمل
+    with Image.open(image_path) as src:
+        src.load()
+    cache = get_ocr_cache()
+    key = page_fingerprint(
+        src, engine="Tesseract", lang="eng+ara", preprocess="advanced")
+    text = cache.get(key)
+    if text is not None:
+        return text
 
     try:
         from image_preprocess import preprocess_image_advanced
         img = preprocess_image_advanced(image_path)
     except Exception as e:
         logger.warning(f"Image preprocessing failed: {e}")
-        img = Image.open(image_path)
+        img = src
+        key = page_fingerprint(
+            src, engine="Tesseract", lang="eng+ara", preprocess="none")
+        text = cache.get(key)
+        if text is not None:
+            return text
 
+    tesseract_info()
     try:
-        return pytesseract.image_to_string(img, lang='eng+ara')
+        from tesseract_pool import get_tesseract_pool
+        text = get_tesseract_pool().image_to_string(img, lang='eng+ara')
     except Exception as e:
         logger.error(f"OCR processing failed: {e}")
-        raise TesseractNotConfiguredError(f"OCR processing error: {str(e)}")
\ No newline at end of file
+        raise TesseractNotConfiguredError(f"OCR processing error: {str(e)}")
+    cache.put(key, text)
+    return text
@@ -0,0 +1,560 @@
+# ocr_pipeline.py
+"""
+خط معالجة صفحات OCR مستقل عن PyQt.
+
+يجهّز كل صفحة (فتح، تدوير، قص المنطقة، تحسين) ثم يرسلها للمحرك.
+في الوضع المتوازي تبقى حتى ‎workers‎ صفحات قيد التعرف في مجمّع
+عمليات Tesseract في آن واحد، وتُعاد النتائج دائماً بترتيب الصفحات.
+"""
+import time
+import logging
+import threading
+from functools import partial
+from collections import deque
+from concurrent.futures import (
+    ALL_COMPLETED, FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+)
+
+from blank_pages import is_blank_page
+from cancellation import CANCEL_POLL_SECONDS
+from decode_plan import MAX_DECODE_SIDE, DecodePlan
+from image_preprocess import DEFAULT_PRESET, PreprocessPipeline
+from ocr_cache import page_fingerprint
+from orientation import OrientationDetector, osd_cache
+from page_hash import params_scope
+from page_sources import TextLayerPage
+from tesseract_pool import get_tesseract_pool
+from tiling import choose_tiles, merge_tiles, needs_tiling
+from text_regions import (
+    FULL_PAGE_COVERAGE, detect_text_regions, is_rtl, reading_order,
+    region_coverage
+)
+
+logger = logging.getLogger(__name__)
+
+TESSERACT_CONFIG = "--oem 3 --psm 6"
+EASYOCR_CROP_BATCH = 16
+
+_END = object()
+
+
+class OCRCancelledError(Exception):
+    pass
+
+
+class OCRPageError(Exception):
+    """خطأ في صفحة محددة؛ يحمل رقم الصفحة والاستثناء الأصلي."""
+
+    def __init__(self, page, error):
+        super().__init__(f"خطأ في الصفحة {page}: {error}")
+        self.page = page
+        self.error = error
+
+
+def easyocr_langs(lang):
+    """تحويل لغة Tesseract (مثل ara+eng) إلى قائمة لغات EasyOCR."""
+    langs = []
+    if "ara" in lang:
+        langs.append("ar")
+    if "eng" in lang:
+        langs.append("en")
+    return langs or ["en"]
+
+
+def _done(text):
+    """Future مكتمل لنص جاهز (ذاكرة أو طبقة نص PDF) دون المرور بالمحركات."""
+    future = Future()
+    future.set_result(text)
+    return future
+
+
+def _text_and_confidence(value):
+    """نتيجة المحرك إما نص أو (نص، ثقة 0-100)."""
+    return value if isinstance(value, tuple) else (value, None)
+
+
+def merge_engine_texts(values):
+    """دمج حتمي: نص كل محرك بترتيب المحركات الثابت، والفارغ يُهمل."""
+    parts = (_text_and_confidence(v)[0].strip() for v in values)
+    return "\n".join(p for p in parts if p)
+
+
+def pad_to_common_size(arrays, fill=255):
+    """
+    توسيع صفحات رمادية مختلفة الأبعاد إلى أبعاد موحّدة بحشو أبيض،
+    لأن ‎readtext_batched‎ يتطلب دفعة متساوية الأبعاد. الحشو لا يغيّر
+    مقياس النص بخلاف إعادة التحجيم. تعيد قائمة مصفوفات ثنائية الأبعاد:
+    EasyOCR يقرأ المصفوفة ثلاثية الأبعاد صورةً ملونة واحدة لا دفعة.
+    """
+    import numpy as np
+
+    height = max(a.shape[0] for a in arrays)
+    width = max(a.shape[1] for a in arrays)
+    padded = []
+    for a in arrays:
+        if a.shape[:2] != (height, width):
+            page = np.full((height, width), fill, dtype=np.uint8)
+            page[:a.shape[0], :a.shape[1]] = a
+            a = page
+        padded.append(a)
+    return padded
+
+
+def gather_futures(futures, combine):
+    """
+    Future واحد يكتمل عند اكتمال كل ‎futures‎ بقيمة ‎combine(النتائج)‎،
+    أو باستثناء أول واحد فشل. إلغاؤه يلغي الـ Futures الداخلية.
+    """
+    result = Future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def part_done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        try:
+            value = combine([f.result() for f in futures])
+        except Exception as ex:
+            if not result.done():
+                result.set_exception(ex)
+            return
+        if not result.done():
+            result.set_result(value)
+
+    def whole_done(f):
+        if f.cancelled():
+            for part in futures:
+                part.cancel()
+
+    result.add_done_callback(whole_done)
+    for f in futures:
+        f.add_done_callback(part_done)
+    return result
+
+
+def join_region_texts(values):
+    """
+    جمع نصوص الكتل بترتيب القراءة. إن حملت النتائج ثقة تُعاد
+    (النص، متوسط الثقة الموزون بطول نص كل كتلة).
+    """
+    pairs = [_text_and_confidence(v) for v in values]
+    text = "\n".join(t.strip() for t, _ in pairs if t.strip())
+    if all(conf is None for _, conf in pairs):
+        return text
+    weights = [(len(t.strip()), c) for t, c in pairs
+               if t.strip() and c is not None]
+    total = sum(n for n, _ in weights)
+    return text, (sum(n * c for n, c in weights) / total if total else 0.0)
+
+
+class EasyOCRBatcher:
+    """
+    يجمع صفحات متتالية في دفعة واحدة لـ ‎reader.readtext_batched‎ بدلاً
+    من استدعاء ‎readtext‎ لكل صفحة؛ كل صفحة تحصل على Future خاص بها.
+    """
+
+    def __init__(self, reader, executor, pages=4, crop_batch=EASYOCR_CROP_BATCH):
+        self.reader = reader
+        self.executor = executor
+        self.pages = max(1, pages)
+        self.crop_batch = crop_batch
+        self._pending = []
+
+    def submit(self, proc):
+        import numpy as np
+
+        future = Future()
+        self._pending.append((np.asarray(proc.convert("L")), future))
+        if len(self._pending) >= self.pages:
+            self.flush()
+        return future
+
+    def holds(self, futures):
+        """هل ما زالت إحدى هذه الـ Futures في الدفعة غير المرسلة؟"""
+        return any(f is p for _, p in self._pending for f in futures)
+
+    def flush(self):
+        if self._pending:
+            batch, self._pending = self._pending, []
+            self.executor.submit(self._run, batch)
+
+    def _run(self, batch):
+        batch = [(a, f) for a, f in batch if f.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            results = self.reader.readtext_batched(
+                pad_to_common_size([a for a, _ in batch]),
+                batch_size=self.crop_batch,
+                detail=0,
+                paragraph=True)
+        except Exception as ex:
+            for _, f in batch:
+                f.set_exception(ex)
+            return
+        for (_, f), txt in zip(batch, results):
+            f.set_result("\n".join(txt))
+
+
+class OCRPipeline:
+    def __init__(
+            self,
+            engine="Tesseract",
+            lang="ara+eng",
+            roi_rel=None,
+            rotation=0,
+            enhance=False,
+            preset=DEFAULT_PRESET,
+            reader=None,
+            workers=1,
+            cache=None,
+            easyocr_batch=1,
+            early_stop_conf=None,
+            max_side=MAX_DECODE_SIDE,
+            text_regions=False,
+            tiling=True,
+            auto_rotate=False,
+            skip_blank=False,
+            blank_thresholds=None,
+            duplicates=None):
+        self.engine = engine
+        self.lang = lang
+        self.roi_rel = roi_rel
+        self.rotation = rotation
+        self.enhance = enhance
+        self.preset = preset
+        # مراحل التحسين من الإعداد المسبق، مع زمن كل مرحلة
+        self.preprocessor = (
+            PreprocessPipeline.from_preset(preset) if enhance else None)
+        # القص قبل التدوير، وفك JPEG بدقة مخفّضة إن كانت المنطقة ضخمة؛
+        # التحسين يحوّل إلى الرمادي على أي حال فنفك مباشرة إلى "L"
+        self.plan = DecodePlan(roi_rel, rotation, max_side=max_side,
+                               mode="L" if enhance else None)
+        # إرسال كتل النص وحدها إلى Tesseract بدل الصفحة كاملة
+        self.text_regions = text_regions
+        self.region_stats = {"pages": 0, "split_pages": 0,
+                             "page_pixels": 0, "ocr_pixels": 0}
+        # الصفحات الضخمة تُقطَّع إلى بلاطات متداخلة تُعالج بالتوازي
+        self.tiling = tiling
+        self.tiled_pages = 0
+        # كشف اتجاه كل صفحة (OSD على نسخة مصغرة) وتصحيحه قبل OCR
+        self.auto_rotate = auto_rotate
+        self.orientation = OrientationDetector(
+            lambda thumb: self._pool_submit(thumb, method="osd"),
+            cache=osd_cache(cache)) if auto_rotate else None
+        # الصفحات الفارغة لا تُرسل إلى المحرك؛ ‎blank_thresholds‎ معاملات
+        # ‎is_blank_page‎ (max_ink، ink_contrast، proxy_side...)
+        self.skip_blank = skip_blank
+        self.blank_thresholds = dict(blank_thresholds or {})
+        self.blank_pages = set()
+        # فهرس البصمات الإدراكية (DuplicateIndex): الصفحات المكررة تأخذ
+        # النص المحفوظ دون استدعاء المحرك
+        self.duplicates = duplicates
+        self.duplicate_pages = 0
+        # زمن آخر صفحة أُعيدت من ‎run‎ منذ سحبها من المصدر، بما فيه رسمها
+        # وفكها (ثوانٍ)
+        self.last_page_seconds = 0.0
+        # رمز الإلغاء للتشغيل الجاري (انظر ‎run‎)
+        self._token = None
+        self.reader = reader
+        self.workers = max(1, workers or 1)
+        self.cache = cache
+        self.easyocr_batch = max(1, easyocr_batch or 1)
+        # في وضع "كلاهما": لا ننتظر المحرك الأبطأ إن أعاد الأسرع نصاً بثقة كافية
+        self.early_stop_conf = early_stop_conf
+        # قارئ EasyOCR غير آمن للخيوط؛ خيط واحد يكفي ويُبقي الترتيب
+        self._easyocr_executor = None
+        self._batcher = None
+
+    def cache_params(self):
+        """كل ما يؤثر في النص الناتج غير بكسلات الصفحة نفسها."""
+        return {
+            "engine": self.engine,
+            "easyocr": self.reader is not None,
+            "lang": self.lang,
+            "config": TESSERACT_CONFIG,
+            "rotation": self.rotation,
+            "roi": self.roi_rel,
+            "enhance": self.preset if self.enhance else False,
+            "early_stop": self.early_stop_conf if self._early_stop() else None,
+            "regions": self.text_regions,
+            "tiling": self.tiling,
+            "auto_rotate": self.auto_rotate,
+        }
+
+    def _early_stop(self):
+        return (self.early_stop_conf is not None
+                and self.engine == "كلاهما" and self.reader is not None)
+
+    def load_page(self, item):
+        """فتح الصفحة (مسار أو PIL) مقصوصة ومدوّرة حسب خطة الفك."""
+        return self.plan.load(item)
+
+    def prepare_page(self, im):
+        """تصحيح الاتجاه ثم المعالجة المسبقة لصفحة محمّلة عبر ‎load_page‎."""
+        render_dpi = im.info.get("render_dpi")
+        if self.orientation is not None:
+            im = self.orientation.apply(im)
+        proc = self.preprocessor(im) if self.preprocessor else im
+        if render_dpi and hasattr(proc, "info"):
+            # المعالجة المسبقة تنشئ صورة جديدة؛ الدقة تلزم قرار التقطيع
+            proc.info["render_dpi"] = render_dpi
+        return proc
+
+    def _readtext(self, proc):
+        import numpy as np
+
+        txt = self.reader.readtext(
+            np.array(proc), detail=0, paragraph=True,
+            batch_size=EASYOCR_CROP_BATCH)
+        return "\n".join(txt)
+
+    def _readtext_confidence(self, proc):
+        import numpy as np
+        from easyocr.utils import get_paragraph
+
+        raw = self.reader.readtext(
+            np.array(proc), detail=1, paragraph=False,
+            batch_size=EASYOCR_CROP_BATCH)
+        if not raw:
+            return "", 0.0
+        conf = 100.0 * sum(r[2] for r in raw) / len(raw)
+        mode = "rtl" if is_rtl(self.lang) else "ltr"
+        return "\n".join(t for _, t in get_paragraph(raw, mode=mode)), conf
+
+    def submit_page(self, proc):
+        """إرسال صفحة جاهزة للمحركات؛ يعيد قائمة Futures بترتيب الدمج."""
+        futures = []
+        early_stop = self._early_stop()
+        if self.engine in ["Tesseract", "كلاهما"]:
+            futures.append(self._submit_tesseract(
+                proc, "recognize_confidence" if early_stop else "recognize"))
+        if self.reader:
+            if self._easyocr_executor is None:
+                self._easyocr_executor = ThreadPoolExecutor(max_workers=1)
+            # الدفعات لا تعيد الثقة، فالتوقف المبكر يرسل كل صفحة وحدها
+            if self.easyocr_batch > 1 and not early_stop:
+                if self._batcher is None:
+                    self._batcher = EasyOCRBatcher(
+                        self.reader, self._easyocr_executor,
+                        pages=self.easyocr_batch)
+                futures.append(self._batcher.submit(proc))
+            else:
+                readtext = (self._readtext_confidence if early_stop
+                            else self._readtext)
+                futures.append(self._easyocr_executor.submit(readtext, proc))
+        return futures
+
+    def _regions(self, proc):
+        """كتل النص بترتيب القراءة، أو None إن كانت الصفحة كاملة أجدى."""
+        if not hasattr(proc, "crop"):
+            return None
+        w, h = proc.size
+        stats = self.region_stats
+        stats["pages"] += 1
+        stats["page_pixels"] += w * h
+        boxes = detect_text_regions(proc)
+        # لا كتل (كشف فاشل) أو كتل تغطي الصفحة: الصفحة كاملة كما كانت
+        if not boxes or region_coverage(boxes, proc.size) >= FULL_PAGE_COVERAGE:
+            stats["ocr_pixels"] += w * h
+            return None
+        stats["split_pages"] += 1
+        stats["ocr_pixels"] += sum(
+            (x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in boxes)
+        return reading_order(boxes, rtl=is_rtl(self.lang))
+
+    def _pool_submit(self, image, method):
+        """مهمة في مجمّع Tesseract مربوطة برمز الإلغاء الجاري إن وُجد."""
+        extra = {"token": self._token} if self._token is not None else {}
+        return get_tesseract_pool().submit(
+            image, lang=self.lang, config=TESSERACT_CONFIG, method=method,
+            **extra)
+
+    def _submit_tesseract(self, proc, method):
+        """
+        الصفحة كاملة، أو (مع ‎text_regions‎) كل كتلة نص كمهمة مستقلة في
+        المجمّع تتوزع على العمال، تُجمع نتائجها في Future واحد بترتيب القراءة.
+        """
+        if self.tiling and hasattr(proc, "crop") and needs_tiling(
+                proc.size, dpi=proc.info.get("render_dpi")):
+            return self._submit_tiles(proc, method)
+        boxes = self._regions(proc) if self.text_regions else None
+        if not boxes:
+            return self._pool_submit(proc, method)
+        parts = [self._pool_submit(proc.crop(box), method) for box in boxes]
+        return gather_futures(parts, join_region_texts)
+
+    def _submit_tiles(self, proc, method):
+        """
+        صفحة ضخمة: بلاطات متداخلة بحجم مختار من أبعادها، كل بلاطة مهمة
+        كلمات مستقلة، ثم دمج يُسقط تكرار الكلمات عند حدود التداخل.
+        """
+        tiles = choose_tiles(proc.size)
+        parts = [self._pool_submit(proc.crop(box), "words")
+                 for _, box in tiles]
+        rtl = is_rtl(self.lang)
+        self.tiled_pages += 1
+        logger.info(f"Tiling {proc.size} page into {len(tiles)} tiles")
+
+        def combine(results):
+            text, conf = merge_tiles(tiles, results, rtl=rtl)
+            return (text, conf) if method == "recognize_confidence" else text
+
+        return gather_futures(parts, combine)
+
+    def _merge(self, futures):
+        """
+        انتظار نتائج المحركات ودمجها. مع التوقف المبكر: إن أعاد أول محرك
+        ينتهي نصاً بثقة ≥ الحد نكتفي به ونلغي الباقي.
+        """
+        if self._early_stop() and len(futures) > 1:
+            done, _ = self._wait(futures, FIRST_COMPLETED)
+            for f in futures:
+                if f not in done or f.exception() is not None:
+                    continue
+                text, conf = _text_and_confidence(f.result())
+                if text.strip() and conf is not None and conf >= self.early_stop_conf:
+                    for other in futures:
+                        other.cancel()
+                    return text.strip()
+        self._wait(futures)
+        return merge_engine_texts(f.result() for f in futures)
+
+    def _wait(self, futures, return_when=ALL_COMPLETED):
+        """
+        مثل ‎wait‎ لكنه يرفع OCRCancelledError خلال ‎CANCEL_POLL_SECONDS‎
+        من إلغاء الرمز، حتى لو بقي المحرك (EasyOCR في خيطه) يعمل.
+        """
+        if self._token is None:
+            return wait(futures, return_when=return_when)
+        while True:
+            done, pending = wait(futures, timeout=CANCEL_POLL_SECONDS,
+                                 return_when=return_when)
+            if self._token.cancelled:
+                raise OCRCancelledError()
+            if not pending or (done and return_when == FIRST_COMPLETED):
+                return done, pending
+
+    def _save(self, key, dup_key, text):
+        if key is not None:
+            self.cache.put(key, text)
+        if dup_key is not None:
+            self.duplicates.add(dup_key, text)
+
+    def _start_page(self, im):
+        """
+        يعيد (futures, save). تُقرأ الذاكرة أولاً ثم فهرس الصفحات المكررة؛
+        ‎save(text)‎ يحفظ النتيجة فيما لم تأتِ منه، أو None إن لم يبقَ ما يُحفظ.
+        """
+        params = self.cache_params()
+        key = dup_key = None
+        if self.cache is not None:
+            key = page_fingerprint(im, **params)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return [_done(cached)], None
+        if self.duplicates is not None and not (
+                self.duplicates.verify and self.cache is not None):
+            # الوضع التام يطابق ما تطابقه الذاكرة نفسها؛ لا حاجة للفهرس معها
+            dup_key = self.duplicates.key(im, params_scope(params))
+            text = self.duplicates.lookup(dup_key)
+            if text is not None:
+                self.duplicate_pages += 1
+                save = partial(self._save, key, None) if key else None
+                return [_done(text)], save
+        if key is None and dup_key is None:
+            return self.submit_page(self.prepare_page(im)), None
+        return (self.submit_page(self.prepare_page(im)),
+                partial(self._save, key, dup_key))
+
+    def _window(self):
+        """عدد الصفحات المسموح بها قيد المعالجة؛ يتسع لدفعة EasyOCR كاملة."""
+        if self.reader and self.easyocr_batch > 1 and not self._early_stop():
+            return max(self.workers, self.easyocr_batch)
+        return self.workers
+
+    def _finish(self, in_flight, total, progress, errors="raise"):
+        idx, futures, save, started = in_flight.popleft()
+        if self._batcher is not None and self._batcher.holds(futures):
+            # سننتظر صفحة في دفعة ناقصة؛ نرسلها كما هي
+            self._batcher.flush()
+        try:
+            text = self._merge(futures)
+        except OCRCancelledError:
+            raise
+        except Exception as ex:
+            if errors != "return":
+                raise OCRPageError(idx, ex)
+            if progress:
+                progress(idx, total)
+            return idx, OCRPageError(idx, ex)
+        if save is not None:
+            save(text)
+        self.last_page_seconds = time.perf_counter() - started
+        if progress:
+            progress(idx, total)
+        return idx, text
+
+    def run(self, pages, total=None, progress=None, is_cancelled=None,
+            errors="raise", token=None):
+        """
+        معالجة الصفحات وإرجاع (رقم الصفحة، النص) بالترتيب.
+        ‎progress(idx, total)‎ يُستدعى عند اكتمال كل صفحة بالترتيب،
+        و‎is_cancelled()‎ يُفحص قبل إرسال كل صفحة.
+        مع ‎errors="return"‎ تُعاد الصفحة الفاشلة كـ (رقمها، OCRPageError)
+        وتستمر المعالجة بدلاً من رفع الاستثناء.
+        ‎token‎ (CancelToken) إلغاء فوري: يرفع OCRCancelledError أثناء انتظار
+        الصفحة الجارية ويقتل عمال Tesseract المشغولين بصفحات هذا التشغيل.
+        """
+        in_flight = deque()
+        self._token = token
+
+        def cancelled():
+            return ((token is not None and token.cancelled)
+                    or bool(is_cancelled and is_cancelled()))
+
+        items = iter(pages)
+        idx = 0
+        try:
+            while True:
+                if cancelled():
+                    raise OCRCancelledError()
+                # قبل سحب العنصر: المصادر الكسولة ترسم/تفك الصفحة عند سحبها
+                started = time.perf_counter()
+                item = next(items, _END)
+                if item is _END:
+                    break
+                idx += 1
+                try:
+                    if isinstance(item, TextLayerPage):
+                        futures, save = [_done(item.text)], None
+                    else:
+                        im = self.load_page(item)
+                        if self.skip_blank and is_blank_page(
+                                im, **self.blank_thresholds):
+                            self.blank_pages.add(idx)
+                            futures, save = [_done("")], None
+                        else:
+                            futures, save = self._start_page(im)
+                except Exception as ex:
+                    failed = Future()
+                    failed.set_exception(ex)
+                    futures, save = [failed], None
+                in_flight.append((idx, futures, save, started))
+                while len(in_flight) >= self._window():
+                    yield self._finish(in_flight, total, progress, errors)
+            while in_flight:
+                if cancelled():
+                    raise OCRCancelledError()
+                yield self._finish(in_flight, total, progress, errors)
+        finally:
+            for _, futures, _, _ in in_flight:
+                for f in futures:
+                    f.cancel()
+            self._token = None
+            if self._easyocr_executor is not None:
+                self._easyocr_executor.shutdown(wait=False)
+                self._easyocr_executor = None
+                self._batcher = None
@@ -0,0 +1,337 @@
+# ocr_server.py
+"""
+خدمة OCR محلية عبر HTTP (asyncio، بدون مكتبات خارجية).
+
+    python main.py serve --port 8765 --workers 2 --queue-size 16
+
+نقاط النهاية (جسم الطلب هو محتوى الملف نفسه، صورة أو PDF):
+    POST /ocr?lang=ara+eng&engine=tesseract&enhance=1   نتيجة فورية
+    POST /jobs?...                                      ‎202‎ مع job_id
+    GET  /jobs/<job_id>                                 حالة المهمة ونتيجتها
+    GET  /stats                                         عمق الطابور والمهام الجارية
+
+عند امتلاء الطابور يُرفض الطلب بـ ‎429‎ مع ‎Retry-After‎ بدلاً من تكديسه،
+حتى تتشارك عدة أدوات داخلية مضيفاً واحداً دافئاً دون أن يغرق.
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import asyncio
+import logging
+import argparse
+import tempfile
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+
+logger = logging.getLogger(__name__)
+
+MAX_UPLOAD_BYTES = 64 * 1024 * 1024
+MAX_FINISHED_JOBS = 1000
+_LANG_RE = re.compile(r'^[a-z_]+(\+[a-z_]+)*$')
+
+_REASONS = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 411: "Length Required",
+    413: "Payload Too Large", 429: "Too Many Requests",
+    500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _upload_suffix(data):
+    if data.startswith(b"%PDF"):
+        return ".pdf"
+    if data[:4] in (b"II*\x00", b"MM\x00*"):
+        return ".tif"
+    return ".img"
+
+
+def ocr_upload(data, options):
+    """التنفيذ الفعلي لمهمة: حفظ الملف مؤقتاً ثم تمريره في خط المعالجة."""
+    from ocr_cache import get_ocr_cache
+    from ocr_cli import ENGINES
+    from ocr_pipeline import OCRPipeline, easyocr_langs
+    from page_sources import open_page_source
+
+    engine = ENGINES[options["engine"]]
+    reader = None
+    if engine != "Tesseract":
+        from ocr_logic import EasyOCRSingleton
+
+        reader = EasyOCRSingleton.get_reader(easyocr_langs(options["lang"]))
+
+    fd, path = tempfile.mkstemp(suffix=_upload_suffix(data), prefix="ocr_upload_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        pipeline = OCRPipeline(
+            engine=engine,
+            lang=options["lang"],
+            enhance=options["enhance"],
+            reader=reader,
+            workers=options["page_workers"],
+            cache=get_ocr_cache())
+        source = open_page_source(path)
+        pages = [{"page": idx, "text": text}
+                 for idx, text in pipeline.run(source, len(source))]
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return {
+        "pages": pages,
+        "text": "\n\n".join(p["text"] for p in pages),
+    }
+
+
+class _Job:
+    def __init__(self, data, options):
+        self.id = uuid.uuid4().hex
+        self.data = data
+        self.options = options
+        self.status = "queued"
+        self.created = time.time()
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.done = asyncio.Event()
+
+    def to_dict(self):
+        info = {"job_id": self.id, "status": self.status}
+        if self.status == "done":
+            info.update(self.result)
+        elif self.status == "failed":
+            info["error"] = self.error
+        if self.finished:
+            info["seconds"] = round(self.finished - self.created, 3)
+        return info
+
+
+class OCRServer:
+    """
+    ‎workers‎ مهمة asyncio تسحب من طابور محدود بـ ‎queue_size‎؛
+    كل مهمة OCR تُنفَّذ في خيط حتى لا تحجب حلقة الأحداث.
+    ‎ocr_func(data, options)‎ قابلة للاستبدال (للاختبار).
+    """
+
+    def __init__(self, workers=2, queue_size=16, ocr_func=ocr_upload,
+                 page_workers=None):
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.ocr_func = ocr_func
+        self.page_workers = page_workers or max(
+            1, (os.cpu_count() or 1) // self.workers)
+        self.jobs = OrderedDict()
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._queue = None
+        self._server = None
+        self._tasks = []
+
+    # ------------------------------ دورة الحياة ------------------------------ #
+    async def start(self, host="127.0.0.1", port=8765):
+        """تشغيل الخادم؛ يعيد المنفذ الفعلي (مفيد مع port=0)."""
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker())
+                       for _ in range(self.workers)]
+        self._server = await asyncio.start_server(self._handle, host, port)
+        port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"OCR server listening on http://{host}:{port}")
+        return port
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def serve_forever(self, host="127.0.0.1", port=8765):
+        await self.start(host, port)
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    # ------------------------------- المهام ---------------------------------- #
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            self.in_flight += 1
+            try:
+                job.result = await loop.run_in_executor(
+                    None, self.ocr_func, job.data, job.options)
+                job.status = "done"
+                self.completed += 1
+            except Exception as ex:
+                logger.error(f"OCR job {job.id} failed: {ex}")
+                job.status = "failed"
+                job.error = str(ex)
+                self.failed += 1
+            finally:
+                self.in_flight -= 1
+                job.data = None
+                job.finished = time.time()
+                job.done.set()
+                self._queue.task_done()
+
+    def _enqueue(self, data, options):
+        job = _Job(data, options)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise HTTPError(429, "OCR queue is full, retry later")
+        self.jobs[job.id] = job
+        self._prune_jobs()
+        return job
+
+    def _prune_jobs(self):
+        finished = [jid for jid, j in self.jobs.items() if j.finished]
+        for jid in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[jid]
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_capacity": self.queue_size,
+            "in_flight": self.in_flight,
+            "workers": self.workers,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    # -------------------------------- HTTP ----------------------------------- #
+    def _options(self, query):
+        # "+" في lang=ara+eng حرفي وليس مسافة كما في ترميز النماذج
+        params = {k: v[-1]
+                  for k, v in parse_qs(query.replace("+", "%2B")).items()}
+        lang = params.get("lang", "ara+eng")
+        engine = params.get("engine", "tesseract")
+        from ocr_cli import ENGINES
+
+        if not _LANG_RE.match(lang):
+            raise HTTPError(400, f"invalid lang: {lang}")
+        if engine not in ENGINES:
+            raise HTTPError(400, f"invalid engine: {engine}")
+        return {
+            "lang": lang,
+            "engine": engine,
+            "enhance": params.get("enhance", "0") in ("1", "true", "yes"),
+            "page_workers": self.page_workers,
+        }
+
+    async def _read_request(self, reader):
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, _ = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        body = b""
+        if method == "POST":
+            if "content-length" not in headers:
+                raise HTTPError(411, "Content-Length required")
+            length = int(headers["content-length"])
+            if length > MAX_UPLOAD_BYTES:
+                raise HTTPError(413, "upload too large")
+            body = await reader.readexactly(length)
+        return method, urlsplit(target), body
+
+    async def _route(self, method, url, body):
+        path = url.path.rstrip("/") or "/"
+        if path == "/stats" and method == "GET":
+            return 200, self.stats()
+        if path in ("/ocr", "/jobs") and method == "POST":
+            if not body:
+                raise HTTPError(400, "empty upload")
+            job = self._enqueue(body, self._options(url.query))
+            if path == "/jobs":
+                return 202, job.to_dict()
+            await job.done.wait()
+            return (200 if job.status == "done" else 500), job.to_dict()
+        if path.startswith("/jobs/") and method == "GET":
+            job = self.jobs.get(path[len("/jobs/"):])
+            if job is None:
+                raise HTTPError(404, "unknown job")
+            return 200, job.to_dict()
+        if path in ("/ocr", "/jobs", "/stats") or path.startswith("/jobs/"):
+            raise HTTPError(405, "method not allowed")
+        raise HTTPError(404, "not found")
+
+    async def _handle(self, reader, writer):
+        headers = {}
+        try:
+            try:
+                method, url, body = await self._read_request(reader)
+                status, payload = await self._route(method, url, body)
+            except HTTPError as ex:
+                status, payload = ex.status, {"error": str(ex)}
+                if ex.status == 429:
+                    headers["Retry-After"] = "1"
+            except (ValueError, asyncio.IncompleteReadError,
+                    asyncio.LimitOverrunError):
+                status, payload = 400, {"error": "malformed request"}
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            head = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+                    "Content-Type: application/json; charset=utf-8",
+                    f"Content-Length: {len(data)}",
+                    "Connection: close"]
+            head += [f"{k}: {v}" for k, v in headers.items()]
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + data)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="main.py serve", description="خدمة OCR محلية عبر HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2,
+                        help="عدد المستندات المعالجة في آن واحد")
+    parser.add_argument("--queue-size", type=int, default=16,
+                        help="أقصى عدد مهام منتظرة قبل الرد بـ 429")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(
+        logging.Formatter("%(asctime)s [%(levelname)s]: %(message)s"))
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    server = OCRServer(workers=args.workers, queue_size=args.queue_size)
+    try:
+        asyncio.run(server.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
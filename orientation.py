@@ -0,0 +1,130 @@
+# orientation.py
+"""
+كشف اتجاه الصفحة تلقائياً (0/90/180/270) قبل OCR.
+
+يعمل Tesseract OSD على نسخة مصغرة رمادية من الصفحة عبر مجمّع العمال
+المقيمين، وتُحفظ النتيجة ببصمة النسخة المصغرة (في الذاكرة وفي مجلد
+مستقل بجوار ذاكرة OCR على القرص إن وُجدت، كي لا تختلط بإحصاءاتها)،
+فلا يُعاد الكشف للصفحة نفسها. هكذا تُصحَّح
+الحزم الممسوحة مختلطة الاتجاه دون تدوير يدوي لكل صفحة.
+"""
+import os
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import CancelledError
+
+from PIL import Image
+
+from ocr_cache import OCRCache, page_fingerprint
+
+logger = logging.getLogger(__name__)
+
+OSD_THUMBNAIL_SIDE = 1200
+# أقل ثقة OSD يُعتمد بها التدوير؛ ما دونها يُترك الاتجاه كما هو
+OSD_MIN_CONFIDENCE = 2.0
+# مدخلات OSD رقم واحد لكل صفحة؛ مجلدها بجوار مجلد ذاكرة OCR
+OSD_CACHE_SUFFIX = "_osd"
+OSD_CACHE_MB = 8
+# أخطاء تعني أن OSD غير مهيأ أصلاً (لا ملف osd.traineddata أو لا Tesseract)،
+# بخلاف أخطاء الصفحة الواحدة مثل "Too few characters" في الصفحات شبه الفارغة
+_CONFIG_ERROR_MARKERS = ("traineddata", "failed loading language",
+                         "failed to init api", "tesseract is not installed")
+
+
+def osd_thumbnail(im, side=OSD_THUMBNAIL_SIDE):
+    """نسخة رمادية أطول ضلع فيها ‎side‎ (يكفي OSD ويجعل الكشف رخيصاً)."""
+    thumb = im.convert("L")
+    if max(thumb.size) > side:
+        thumb.thumbnail((side, side), Image.BILINEAR)
+    return thumb
+
+
+def osd_cache(cache):
+    """ذاكرة OSD على القرص بجوار ذاكرة OCR ‎cache‎ (أو None إن لم تُمرَّر)."""
+    if cache is None:
+        return None
+    return OCRCache(os.path.normpath(cache.cache_dir) + OSD_CACHE_SUFFIX,
+                    max_mb=OSD_CACHE_MB)
+
+
+def is_osd_config_error(error):
+    """هل الخطأ من تهيئة Tesseract/OSD لا من محتوى الصفحة؟"""
+    from ocr_logic import TesseractNotConfiguredError
+
+    if isinstance(error, TesseractNotConfiguredError) or \
+            type(error).__name__ == "TesseractNotFoundError":
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in _CONFIG_ERROR_MARKERS)
+
+
+class OrientationDetector:
+    """
+    ‎submit(image)‎ يرسل مهمة OSD ويعيد Future بـ (التدوير، الثقة)، حيث
+    التدوير بالدرجات باتجاه عقارب الساعة لتصبح الصفحة قائمة.
+    ‎cache‎ ذاكرة OSD مستقلة (انظر ‎osd_cache‎) لا ذاكرة نتائج OCR.
+    """
+
+    def __init__(self, submit, cache=None, min_conf=OSD_MIN_CONFIDENCE,
+                 memory_size=512):
+        self.submit = submit
+        self.cache = cache
+        self.min_conf = min_conf
+        self.memory_size = memory_size
+        self.enabled = True
+        self.rotated_pages = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key, rotation):
+        with self._lock:
+            self._memory[key] = rotation
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _recall(self, key):
+        with self._lock:
+            rotation = self._memory.get(key)
+        if rotation is None and self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None and cached.isdigit():
+                rotation = int(cached)
+        return rotation
+
+    def detect(self, im):
+        """التدوير اللازم (0 إن تعذّر الكشف أو كانت الثقة منخفضة)."""
+        if not self.enabled:
+            return 0
+        thumb = osd_thumbnail(im)
+        key = page_fingerprint(thumb, kind="osd", min_conf=self.min_conf)
+        rotation = self._recall(key)
+        if rotation is not None:
+            return rotation
+        try:
+            angle, conf = self.submit(thumb).result()
+        except CancelledError:
+            return 0  # أُلغيت المعالجة؛ خط المعالجة سيتوقف بعد قليل
+        except Exception as e:
+            if is_osd_config_error(e):
+                # OSD غير مهيأ؛ لا نكرر المحاولة لكل صفحة
+                logger.warning(f"Orientation detection disabled: {e}")
+                self.enabled = False
+            else:
+                # صفحة بنص قليل وما شابه: تبقى كما هي دون حفظ النتيجة
+                logger.debug(f"Orientation detection skipped a page: {e}")
+            return 0
+        rotation = int(angle) % 360 if conf >= self.min_conf else 0
+        self._remember(key, rotation)
+        if self.cache is not None:
+            self.cache.put(key, str(rotation))
+        return rotation
+
+    def apply(self, im):
+        """الصفحة بعد تصحيح اتجاهها."""
+        rotation = self.detect(im)
+        if not rotation:
+            return im
+        self.rotated_pages += 1
+        return im.rotate(-rotation, expand=True)
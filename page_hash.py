@@ -0,0 +1,321 @@
+# page_hash.py
+"""
+بصمة إدراكية (pHash) للصفحات وفهرس للصفحات المكررة.
+
+الصفحات المتكررة (نصوص العقود الثابتة، ترويسة المؤسسة في مئات
+المستندات) تعطي البصمة نفسها أو قريبة منها حتى بعد إعادة المسح،
+فنعيد استخدام نصها المحفوظ بدل استدعاء المحرك. الفهرس في الذاكرة
+ويُلحق كل مدخل جديد بملف JSON Lines ليبقى بين الجلسات.
+
+pHash يلتقط التخطيط العام فقط: صفحتان تختلفان بسطر أو بحقل معبأ
+تتقاربان بصمتاهما كما تتقارب نسختا مسح للصفحة نفسها. لذلك:
+  - الافتراضي (‎verify=True‎) يشترط تطابق بكسلات الصفحة تماماً، فلا
+    تُحسب البصمة الإدراكية ولا توزيع الحبر، وهو ما تؤديه ذاكرة OCR
+    أصلاً؛ لذلك يتجاوز خط المعالجة الفهرس في هذا الوضع إن وُجدت الذاكرة؛
+  - المطابقة التقريبية (‎verify=False‎) تؤكَّد بمقارنة توزيع الحبر في
+    كل سطر (‎layout_signature‎)، فيُرفض سطر مختلف أو كلمات مبدلة، لكن
+    تعديل بضعة أحرف في حقل قد يبقى دون عتبة ضجيج المسح.
+"""
+import os
+import json
+import base64
+import hashlib
+import logging
+import threading
+from collections import namedtuple
+
+from ocr_cache import page_fingerprint
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_INDEX_FILE = "page_hashes.jsonl"
+# أقصى مسافة Hamming (من 256 بت) للمرشحين في المطابقة التقريبية
+DUPLICATE_MAX_DISTANCE = 8
+DUPLICATE_MAX_ENTRIES = 10000
+HASH_SIZE = 16
+# أعمدة توزيع الحبر لكل سطر، وأقصى فرق مسموح في عمود منها (بوحدة
+# متوسط الصفحة)؛ ‎LAYOUT_SCALE‎ يحوّل القيم إلى بايت عند الحفظ
+LAYOUT_BINS = 64
+LAYOUT_MAX_DIFF = 0.55
+LAYOUT_SCALE = 50
+# تقسيم البصمة إلى مقاطع للبحث: صفحتان على مسافة < عدد المقاطع
+# تتطابقان حتماً في مقطع واحد على الأقل (مبدأ برج الحمام)
+HASH_SEGMENTS = 16
+
+DuplicateEntry = namedtuple(
+    "DuplicateEntry", "scope phash fingerprint layout text")
+
+_dct_matrices: dict = {}
+
+
+def _dct_matrix(n):
+    """مصفوفة DCT-II المتعامدة ‎n×n‎."""
+    import numpy as np
+
+    m = _dct_matrices.get(n)
+    if m is None:
+        k = np.arange(n)[:, None]
+        x = np.arange(n)[None, :]
+        m = np.sqrt(2.0 / n) * np.cos(np.pi * (2 * x + 1) * k / (2 * n))
+        m[0] /= np.sqrt(2.0)
+        _dct_matrices[n] = m
+    return m
+
+
+def phash(im, hash_size=HASH_SIZE):
+    """
+    بصمة إدراكية بـ ‎hash_size²‎ بت: تصغير إلى ‎4×hash_size‎ مربع ←
+    DCT ← أدنى الترددات مقارنة بوسيطها. تعيد عدداً صحيحاً.
+    """
+    import numpy as np
+    from PIL import Image
+
+    side = 4 * hash_size
+    gray = im.convert("L")
+    factor = max(1, min(gray.size) // (4 * side))
+    if factor > 1:
+        gray = gray.reduce(factor)
+    pixels = np.asarray(gray.resize((side, side), Image.BILINEAR), np.float64)
+    m = _dct_matrix(side)
+    low = (m @ pixels @ m.T)[:hash_size, :hash_size].ravel()
+    bits = low > np.median(low[1:])
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def layout_signature(im, bins=LAYOUT_BINS, proxy_side=1000, ink_contrast=60):
+    """
+    توزيع الحبر أفقياً في كل سطر نص: تُقسَّم الصفحة إلى أسطر بمسقط
+    الحبر الأفقي، ويُجمع رمادي كل سطر في ‎bins‎ عموداً داخل صندوق
+    المحتوى (يلغي إزاحة المسح وفرق الدقة). الرمادي بدل التثنية يجعل
+    الإزاحة دون البكسل تغيراً صغيراً لا قفزة. تعيد ‎bins‎ بايت لكل سطر.
+    """
+    import numpy as np
+
+    gray = im.convert("L")
+    factor = max(1, max(gray.size) // proxy_side)
+    if factor > 1:
+        gray = gray.reduce(factor)
+    arr = np.asarray(gray, np.float32)
+    paper = float(np.median(arr))
+    mask = arr < paper - ink_contrast
+    xs = np.nonzero(mask.any(axis=0))[0]
+    if xs.size == 0:
+        return b""
+    dark = np.clip((paper - arr[:, xs[0]:xs[-1] + 1]) / max(paper, 1.0), 0, 1)
+    columns = np.arange(dark.shape[1]) * bins // dark.shape[1]
+    rows = np.concatenate([[0], (mask.sum(axis=1) >= 2).astype(np.int8), [0]])
+    edges = np.diff(rows)
+    lines = list(zip(np.nonzero(edges == 1)[0], np.nonzero(edges == -1)[0]))
+    if not lines:
+        return b""
+    profiles = np.array([
+        np.bincount(columns, dark[top:bottom].sum(axis=0), minlength=bins)
+        for top, bottom in lines])
+    profiles *= LAYOUT_SCALE / max(float(profiles.mean()), 1e-6)
+    return np.clip(np.rint(profiles), 0, 255).astype(np.uint8).tobytes()
+
+
+def layout_distance(a, b):
+    """
+    أكبر فرق بين عمودين متقابلين (بوحدة متوسط الصفحة)؛ ‎inf‎ إن اختلف
+    عدد الأسطر.
+    """
+    import numpy as np
+
+    if len(a) != len(b):
+        return float("inf")
+    if not a:
+        return 0.0
+    diff = np.abs(np.frombuffer(a, np.uint8).astype(np.int16)
+                  - np.frombuffer(b, np.uint8))
+    return float(diff.max()) / LAYOUT_SCALE
+
+
+def params_scope(params):
+    """معرّف قصير لمعاملات المعالجة؛ لا تُطابق إلا صفحات بالمعاملات نفسها."""
+    data = json.dumps(params, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def _segments(ph, bits=HASH_SIZE * HASH_SIZE, count=HASH_SEGMENTS):
+    width = bits // count
+    mask = (1 << width) - 1
+    return [(i, (ph >> (i * width)) & mask) for i in range(count)]
+
+
+class DuplicateIndex:
+    """
+    ‎verify‎ يشترط تطابق البكسلات تماماً (الافتراضي)، وبدونه تكفي مسافة
+    ≤ ‎max_distance‎ بين البصمتين مع توزيع حبر متقارب (انظر أعلى الملف).
+    ‎path=None‎ يُبقي الفهرس في الذاكرة فقط.
+    """
+
+    def __init__(self, path=DUPLICATE_INDEX_FILE,
+                 max_distance=DUPLICATE_MAX_DISTANCE, verify=True,
+                 max_entries=DUPLICATE_MAX_ENTRIES):
+        self.path = path
+        self.max_distance = max_distance
+        self.verify = verify
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._rows = None  # كل المدخلات بترتيب الإضافة
+        self._by_fingerprint = {}  # (scope, fingerprint) -> entry
+        self._buckets = {}  # (scope, segment, value) -> [entry]
+        self._lock = threading.Lock()
+
+    def _load(self):
+        self._reset([])
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        e = json.loads(line)
+                        layout = e.get("layout")
+                        ph = e.get("phash")
+                        self._append(DuplicateEntry(
+                            e["scope"], int(ph, 16) if ph is not None else None, e["fp"],
+                            base64.b64decode(layout) if layout is not None else None,
+                            e["text"]))
+                    except (ValueError, KeyError):
+                        continue  # سطر مبتور من جلسة انقطعت
+        except OSError as e:
+            logger.warning(f"Duplicate page index not loaded: {e}")
+
+    def _reset(self, rows):
+        self._rows = []
+        self._by_fingerprint = {}
+        self._buckets = {}
+        for entry in rows:
+            self._append(entry)
+
+    def _append(self, entry):
+        self._rows.append(entry)
+        self._by_fingerprint[(entry.scope, entry.fingerprint)] = entry
+        if entry.phash is None:
+            return  # مدخل من الوضع التام: لا يُطابَق تقريبياً
+        for segment in _segments(entry.phash):
+            self._buckets.setdefault((entry.scope,) + segment, []).append(entry)
+
+    def _ensure_loaded(self):
+        if self._rows is None:
+            self._load()
+            if len(self._rows) > self.max_entries:
+                self._compact()
+
+    def _compact(self):
+        """إبقاء أحدث نصف ‎max_entries‎ مدخلاً وإعادة كتابة الملف."""
+        self._reset(self._rows[-self.max_entries // 2:])
+        if not self.path:
+            return
+        try:
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for entry in self._rows:
+                    f.write(self._line(entry))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Duplicate page index compaction failed: {e}")
+
+    @staticmethod
+    def _line(entry):
+        layout = (base64.b64encode(entry.layout).decode()
+                  if entry.layout is not None else None)
+        ph = f"{entry.phash:x}" if entry.phash is not None else None
+        return json.dumps({"scope": entry.scope, "phash": ph,
+                           "fp": entry.fingerprint, "layout": layout,
+                           "text": entry.text}, ensure_ascii=False) + "\n"
+
+    def key(self, im, scope):
+        """
+        مدخل (بلا نص) لصفحة PIL: بصمة البكسلات، ومعها البصمة الإدراكية
+        وتوزيع الحبر في المطابقة التقريبية فقط.
+        """
+        if self.verify:
+            return DuplicateEntry(scope, None, page_fingerprint(im), None, None)
+        return DuplicateEntry(scope, phash(im), page_fingerprint(im),
+                              layout_signature(im), None)
+
+    def _candidates(self, key):
+        if self.max_distance >= HASH_SEGMENTS:
+            # المقاطع لا تضمن المطابقة لهذه المسافة؛ بحث خطي
+            return [e for e in self._rows
+                    if e.scope == key.scope and e.phash is not None]
+        seen = {}
+        for segment in _segments(key.phash):
+            for entry in self._buckets.get((key.scope,) + segment, ()):
+                seen[id(entry)] = entry
+        return seen.values()
+
+    def _match(self, key):
+        exact = self._by_fingerprint.get((key.scope, key.fingerprint))
+        if exact is not None or self.verify or key.phash is None:
+            return exact
+        best = None
+        for entry in self._candidates(key):
+            d = hamming(key.phash, entry.phash)
+            if d > self.max_distance or (best is not None and d >= best[0]):
+                continue
+            if entry.layout is None or layout_distance(
+                    key.layout, entry.layout) > LAYOUT_MAX_DIFF:
+                continue
+            best = (d, entry)
+        return best[1] if best else None
+
+    def lookup(self, key):
+        """نص الصفحة المكررة المحفوظة، أو None."""
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._match(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry.text
+
+    def add(self, key, text):
+        entry = key._replace(text=text)
+        with self._lock:
+            self._ensure_loaded()
+            self._append(entry)
+            if self.path:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(self._line(entry))
+                except OSError as e:
+                    logger.warning(f"Duplicate page index write failed: {e}")
+            if len(self._rows) > self.max_entries:
+                self._compact()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._rows or ()),
+            }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_duplicate_index(max_distance=None, verify=None):
+    """الفهرس المشترك للتطبيق؛ تُعدَّل معاملاته إن مُرِّرت."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = DuplicateIndex()
+        if max_distance is not None:
+            _index.max_distance = max_distance
+        if verify is not None:
+            _index.verify = verify
+        return _index
@@ -0,0 +1,295 @@
+# page_sources.py
+"""
+مصادر الصفحات لخط المعالجة.
+
+بدلاً من تحويل ملف PDF كاملاً إلى صور قبل بدء OCR، ترسم
+‎PDFPageSource‎ نوافذ صغيرة من الصفحات عبر first_page/last_page
+وتسلّمها واحدة تلو الأخرى، فيبقى زمن ظهور أول نص والذاكرة
+ثابتين مهما كان عدد الصفحات.
+"""
+import re
+import logging
+import queue
+import threading
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+# أقل عدد من الحروف/الأرقام كي تُعتبر طبقة النص المضمنة صالحة بدل OCR
+MIN_TEXT_LAYER_CHARS = 20
+# صورة تغطي هذه النسبة من الصفحة تعني صفحة ممسوحة؛ طبقة نصها (ختم Bates،
+# تذييل، رقم صفحة) لا تُعتمد إلا إن بلغت كثافة نص صفحة كاملة (حرف/بوصة²)
+RASTER_PAGE_COVERAGE = 0.5
+MIN_SCANNED_TEXT_DENSITY = 4.0
+
+_PAGE_SIZE_RE = re.compile(r"^Page\s+(\d+)\s+size:\s+([\d.]+)\s+x\s+([\d.]+)",
+                           re.MULTILINE)
+
+
+class TextLayerPage:
+    """صفحة PDF لها طبقة نص مضمنة صالحة؛ لا تحتاج رسماً ولا OCR."""
+
+    def __init__(self, text):
+        self.text = text
+
+
+def is_usable_text(text, min_chars=MIN_TEXT_LAYER_CHARS):
+    """
+    هل النص المستخرج من طبقة PDF صالح؟ نشترط عدداً أدنى من الحروف
+    وندرة رموز الاستبدال (خطوط بلا جدول ترميز تُخرج ‎\ufffd‎ أو رموزاً تحكمية).
+    """
+    letters = sum(1 for ch in text if ch.isalnum())
+    if letters < min_chars:
+        return False
+    garbage = sum(1 for ch in text
+                  if ch == "\ufffd" or (ord(ch) < 32 and ch not in "\n\r\t\f"))
+    return garbage <= 0.05 * letters
+
+
+def is_text_layer_page(text, coverage=0.0, area=None,
+                       min_chars=MIN_TEXT_LAYER_CHARS):
+    """
+    هل تُستخدم طبقة نص الصفحة بدل OCR؟ ‎coverage‎ نسبة أكبر صورة فيها
+    من مساحة الصفحة و‎area‎ مساحتها بالبوصة المربعة (انظر ‎probe_rasters‎).
+    الصفحة الممسوحة ذات الطبقة الصالحة هي ما تعرّف عليه الماسح نفسه،
+    فلا تُقبل إلا إن غطت الطبقة الصفحة كلها لا ختماً أضيف فوقها.
+    """
+    if not is_usable_text(text, min_chars):
+        return False
+    if coverage < RASTER_PAGE_COVERAGE or not area:
+        return True
+    letters = sum(1 for ch in text if ch.isalnum())
+    return letters / area >= MIN_SCANNED_TEXT_DENSITY
+
+
+def _runs(numbers):
+    """تجميع أرقام صفحات مرتبة في مقاطع متصلة [(أول، آخر)...]."""
+    runs = []
+    for n in numbers:
+        if runs and runs[-1][1] == n - 1:
+            runs[-1][1] = n
+        else:
+            runs.append([n, n])
+    return [tuple(r) for r in runs]
+
+
+class PDFPageSource:
+    """
+    مصدر صفحات PDF متدفق.
+
+    ‎window‎: عدد الصفحات التي تُرسم في كل استدعاء لـ pdftoppm.
+    ‎lookahead‎: أقصى عدد صفحات جاهزة تنتظر OCR (0 = بلا خيط خلفي).
+    ‎text_layer‎: فحص طبقة النص لكل نافذة عبر pdftotext؛ الصفحات ذات النص
+    الصالح تُعاد كـ ‎TextLayerPage‎ ولا تُرسم، ما لم تكن ممسوحة (صورة بحجم
+    الصفحة عبر pdfimages) بطبقة نص قليلة.
+    ‎roi_rel‎: منطقة مختارة من الصفحة؛ طبقة النص تغطي الصفحة كلها، فلا
+    تُفحص وتُرسم كل الصفحات ليقصّها خط المعالجة.
+    """
+
+    def __init__(self, path, dpi=100, window=2, lookahead=4, thread_count=1,
+                 text_layer=True, roi_rel=None):
+        self.path = path
+        self.dpi = dpi
+        self.window = max(1, window)
+        self.lookahead = max(0, lookahead)
+        self.thread_count = thread_count
+        self.text_layer = text_layer and not roi_rel
+        self.raster_probe = True
+        self.text_layer_pages = 0
+        self._count = None
+
+    def __len__(self):
+        if self._count is None:
+            from pdf2image import pdfinfo_from_path
+
+            self._count = int(pdfinfo_from_path(self.path)["Pages"])
+        return self._count
+
+    def probe_text(self, first, last):
+        """
+        نصوص طبقة PDF للصفحات first..last عبر pdftotext ({رقم الصفحة: نص}).
+        يعيد {} إن لم تتوفر الأداة، فتُعامل كل الصفحات كممسوحة ضوئياً.
+        """
+        try:
+            out = subprocess.run(
+                ["pdftotext", "-f", str(first), "-l", str(last),
+                 "-layout", "-enc", "UTF-8", self.path, "-"],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                check=True, timeout=60).stdout
+        except FileNotFoundError:
+            logger.warning("pdftotext not found; PDF text layer probe disabled")
+            self.text_layer = False
+            return {}
+        except (subprocess.SubprocessError, OSError) as e:
+            logger.warning(f"pdftotext failed on {self.path}: {e}")
+            return {}
+        # pdftotext يفصل الصفحات بـ form feed
+        texts = out.decode("utf-8", errors="replace").split("\f")
+        return {first + i: t for i, t in enumerate(texts[:last - first + 1])}
+
+    def _run_tool(self, args):
+        """مخرجات أداة من poppler-utils نصاً، أو None إن فشلت."""
+        try:
+            out = subprocess.run(
+                args + [self.path], stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL, check=True, timeout=60).stdout
+        except FileNotFoundError:
+            logger.warning(f"{args[0]} not found; scanned-page check disabled")
+            self.raster_probe = False
+            return None
+        except (subprocess.SubprocessError, OSError) as e:
+            logger.warning(f"{args[0]} failed on {self.path}: {e}")
+            return None
+        return out.decode("utf-8", errors="replace")
+
+    def probe_rasters(self, first, last):
+        """
+        ({رقم الصفحة: (نسبة أكبر صورة من الصفحة، مساحة الصفحة بالبوصة²)})
+        للصفحات first..last، من مقاسات pdfinfo وقائمة pdfimages (أبعاد
+        كل صورة ودقتها في موضعها). الصفحات بلا صور لا تظهر في الناتج.
+        """
+        span = ["-f", str(first), "-l", str(last)]
+        info = self._run_tool(["pdfinfo"] + span)
+        listing = self._run_tool(["pdfimages", "-list"] + span) if info else None
+        if not listing:
+            return {}
+        areas = {int(n): float(w) * float(h) / 72 ** 2
+                 for n, w, h in _PAGE_SIZE_RE.findall(info)}
+        rasters = {}
+        # page num type width height color comp bpc enc interp object ID x-ppi y-ppi ...
+        for line in listing.splitlines()[2:]:
+            cols = line.split()
+            try:
+                page, width, height = int(cols[0]), int(cols[3]), int(cols[4])
+                x_ppi, y_ppi = float(cols[12]), float(cols[13])
+            except (IndexError, ValueError):
+                continue
+            area = areas.get(page)
+            if cols[2] != "image" or not area or not x_ppi or not y_ppi:
+                continue
+            coverage = min(1.0, width / x_ppi * height / y_ppi / area)
+            rasters[page] = (max(coverage, rasters.get(page, (0.0,))[0]), area)
+        return rasters
+
+    def _render(self, first, last):
+        from pdf2image import convert_from_path
+
+        pages = convert_from_path(
+            self.path,
+            dpi=self.dpi,
+            first_page=first,
+            last_page=last,
+            thread_count=self.thread_count
+        )
+        for page in pages:
+            # دقة الرسم لخط المعالجة (حد تقطيع الصفحات الضخمة)
+            page.info["render_dpi"] = self.dpi
+        return pages
+
+    def _render_windows(self):
+        total = len(self)
+        for first in range(1, total + 1, self.window):
+            last = min(first + self.window - 1, total)
+            texts = self.probe_text(first, last) if self.text_layer else {}
+            texts = {n: t for n, t in texts.items() if is_usable_text(t)}
+            rasters = (self.probe_rasters(first, last)
+                       if texts and self.raster_probe else {})
+            ready = {n: TextLayerPage(t.strip()) for n, t in texts.items()
+                     if is_text_layer_page(t, *rasters.get(n, (0.0, None)))}
+            self.text_layer_pages += len(ready)
+            # الصفحات الممسوحة فقط تُرسم، كل مقطع متصل في استدعاء واحد
+            scanned = [n for n in range(first, last + 1) if n not in ready]
+            for run_first, run_last in _runs(scanned):
+                for n, page in enumerate(
+                        self._render(run_first, run_last), start=run_first):
+                    ready[n] = page
+            for n in range(first, last + 1):
+                yield ready.pop(n)
+
+    def __iter__(self):
+        if not self.lookahead:
+            yield from self._render_windows()
+            return
+
+        buffer = queue.Queue(maxsize=self.lookahead)
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for page in self._render_windows():
+                    if not put(page):
+                        return
+                put(_DONE)
+            except Exception as exc:
+                put(exc)
+
+        producer = threading.Thread(
+            target=produce, name="pdf-page-source", daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = buffer.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+
+class TiffFrameSource:
+    """
+    مصدر كسول لإطارات TIFF متعددة الصفحات (أرشيف الفاكس مثلاً).
+    عدد الإطارات يُقرأ من ترويسات IFD دون فك بكسلاتها، وعند التكرار
+    يُفك إطار واحد فقط في كل مرة عبر ‎seek‎.
+    """
+
+    def __init__(self, path):
+        from PIL import Image, UnidentifiedImageError
+
+        self.path = path
+        try:
+            with Image.open(path) as img:
+                self._count = getattr(img, "n_frames", 1)
+        except UnidentifiedImageError:
+            raise ValueError("Cannot open file as multi-page image")
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        from PIL import Image
+
+        with Image.open(self.path) as img:
+            for index in range(self._count):
+                img.seek(index)
+                # copy() يفك هذا الإطار وحده ويفصله عن مقبض الملف
+                yield img.copy()
+
+
+def open_page_source(path, dpi=100, lookahead=4, text_layer=True,
+                     roi_rel=None):
+    """
+    اختيار مصدر الصفحات المناسب للملف: PDF متدفق، TIFF متعدد الصفحات،
+    أو صورة واحدة. الناتج قابل لـ ‎len()‎ والتكرار.
+    """
+    lower = path.lower()
+    if lower.endswith('.pdf'):
+        return PDFPageSource(
+            path, dpi=dpi, lookahead=lookahead, text_layer=text_layer,
+            roi_rel=roi_rel)
+    if lower.endswith(('.tiff', '.tif')):
+        return TiffFrameSource(path)
+    return [path]
@@ -0,0 +1,88 @@
+# preview_service.py
+"""
+معاينات مصغرة للملفات المستوردة.
+
+تُرسم المعاينة مرة واحدة بدقة المعاينة فقط (pdftoppm ‎-scale-to‎ لملفات
+PDF، و‎draft‎/‎thumbnail‎ من PIL للصور) وتُحفظ بالمسار وزمن التعديل،
+فيصبح التدوير مجرد تدوير للنسخة المصغرة المحفوظة. الرسم نفسه يتم في
+خيط خلفي (‎PreviewWorker‎ في ‎main_window‎) كي لا تتجمد النافذة.
+"""
+import os
+import logging
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# أطول ضلع للمعاينة بالبكسل (تكفي للوحة المعاينة الجانبية)
+PREVIEW_SIZE = 600
+
+
+def render_preview(path, size=PREVIEW_SIZE):
+    """الصفحة الأولى من الملف كصورة RGB أطول ضلع فيها ‎size‎ على الأكثر."""
+    if path.lower().endswith(".pdf"):
+        from pdf2image import convert_from_path
+
+        img = convert_from_path(
+            path, first_page=1, last_page=1, size=size, thread_count=1)[0]
+    else:
+        img = Image.open(path)
+        if img.format == "JPEG":
+            # فك JPEG بمقياس 1/2 أو 1/4 أو 1/8 مباشرة
+            img.draft("RGB", (size, size))
+    img.thumbnail((size, size))
+    return img.convert("RGB")
+
+
+def rotate_preview(img, rotation):
+    """تدوير المعاينة باتجاه عقارب الساعة كما في ‎DecodePlan‎."""
+    rotation %= 360
+    return img.rotate(-rotation, expand=True) if rotation else img
+
+
+class PreviewCache:
+    """معاينات محفوظة بالمسار وزمن التعديل والحجم (الأقدم استخداماً يُحذف)."""
+
+    def __init__(self, max_entries=16):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(path, size=PREVIEW_SIZE):
+        st = os.stat(path)
+        return (os.path.abspath(path), st.st_mtime_ns, st.st_size, size)
+
+    def get(self, path, size=PREVIEW_SIZE):
+        try:
+            key = self.key(path, size)
+        except OSError:
+            return None
+        with self._lock:
+            img = self._items.get(key)
+            if img is not None:
+                self._items.move_to_end(key)
+            return img
+
+    def render(self, path, size=PREVIEW_SIZE):
+        """المعاينة من الذاكرة أو برسمها وحفظها؛ آمنة من أي خيط."""
+        img = self.get(path, size)
+        if img is not None:
+            return img
+        key = self.key(path, size)
+        img = render_preview(path, size)
+        with self._lock:
+            self._items[key] = img
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+        logger.debug(f"Preview rendered for {path}: {img.size}")
+        return img
+
+
+_cache = PreviewCache()
+
+
+def get_preview_cache():
+    return _cache
@@ -0,0 +1,51 @@
+# result_view.py
+"""
+عرض نتائج OCR صفحة بصفحة أثناء المعالجة.
+
+‎QPlainTextEdit‎ يخطط النص سطراً بسطر فلا يُعاد تخطيط المستند كله عند
+كل إضافة، ويتحمل مئات آلاف الأسطر. الصفحات قد تصل بغير ترتيبها، فتُحفظ
+حتى تكتمل الصفحات التي قبلها ثم تُضاف بالترتيب.
+"""
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QPlainTextEdit
+
+
+class ResultView(QPlainTextEdit):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        # لا حاجة لسجل تراجع لنص للقراءة فقط؛ يوفّر الذاكرة مع النصوص الطويلة
+        self.setUndoRedoEnabled(False)
+        option = self.document().defaultTextOption()
+        option.setAlignment(Qt.AlignRight)
+        self.document().setDefaultTextOption(option)
+        self.reset()
+
+    def reset(self):
+        """تفريغ العرض قبل معالجة جديدة."""
+        self.clear()
+        self._next = 1
+        self._pending = {}  # رقم الصفحة -> نصها (None للصفحات المتخطاة)
+        self._pages_shown = 0
+
+    def add_page(self, idx, text):
+        self._pending[idx] = text
+        self._flush()
+
+    def skip_page(self, idx):
+        """صفحة بلا كتلة في العرض (فارغة)؛ تُحجز مكانها في الترتيب فقط."""
+        self.add_page(idx, None)
+
+    def _flush(self):
+        while self._next in self._pending:
+            text = self._pending.pop(self._next)
+            if text is not None:
+                block = f"--- صفحة {self._next} ---\n{text.strip()}"
+                # سطر فارغ بين الصفحات كما في النص المحفوظ
+                self.appendPlainText(block if not self._pages_shown else "\n" + block)
+                self._pages_shown += 1
+            self._next += 1
+
+    def append_note(self, text):
+        """سطر ختامي (المدة، رسالة خطأ) بعد ما عُرض من صفحات."""
+        self.appendPlainText(text if self.document().isEmpty() else "\n" + text)
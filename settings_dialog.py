@@ -1,4 +1,6 @@
-from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QCheckBox
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QCheckBox, QSpinBox
+
+from image_preprocess import DEFAULT_PRESET, PRESET_LABELS
 
 
 class SettingsDialog(QDialog):
@@ -31,11 +33,70 @@ class SettingsDialog(QDialog):
         engine_layout.addWidget(self.engine_combo)
         layout.addLayout(engine_layout)
 
+        # مراحل تحسين الصورة عند تفعيل خيار التحسين
+        preset_layout = QHBoxLayout()
+        preset_label = QLabel("تحسين الصورة:")
+        self.preset_combo = QComboBox()
+        for name, label in PRESET_LABELS.items():
+            self.preset_combo.addItem(label, name)
+        index = self.preset_combo.findData(
+            self.settings.get("preprocess_preset") or DEFAULT_PRESET)
+        self.preset_combo.setCurrentIndex(max(0, index))
+        preset_layout.addWidget(preset_label)
+        preset_layout.addWidget(self.preset_combo)
+        layout.addLayout(preset_layout)
+
         # خيار التحديث التلقائي
         self.auto_update_check = QCheckBox("تفعيل التحديث التلقائي")
         self.auto_update_check.setChecked(self.settings.get("auto_update"))
         layout.addWidget(self.auto_update_check)
 
+        # معالجة الصفحات بالتوازي
+        self.parallel_check = QCheckBox("معالجة الصفحات بالتوازي على كل الأنوية")
+        self.parallel_check.setChecked(bool(self.settings.get("parallel_pages")))
+        layout.addWidget(self.parallel_check)
+
+        # كشف كتل النص وإرسالها وحدها إلى المحرك
+        self.regions_check = QCheckBox("إرسال مناطق النص فقط إلى المحرك (للنماذج والصفحات المختلطة)")
+        self.regions_check.setChecked(bool(self.settings.get("text_regions")))
+        layout.addWidget(self.regions_check)
+
+        # كشف اتجاه الصفحات تلقائياً بدل التدوير اليدوي
+        self.orientation_check = QCheckBox("تصحيح اتجاه الصفحات تلقائياً (0/90/180/270)")
+        self.orientation_check.setChecked(self.settings.get("auto_orientation") is not False)
+        layout.addWidget(self.orientation_check)
+
+        # تخطي الصفحات الفارغة (أوراق الفصل وظهور المسح المزدوج)
+        self.blank_check = QCheckBox("تخطي الصفحات الفارغة دون التعرف عليها")
+        self.blank_check.setChecked(bool(self.settings.get("skip_blank_pages")))
+        layout.addWidget(self.blank_check)
+
+        # إعادة استخدام نص الصفحات المكررة (ترويسات ونصوص عقود ثابتة)
+        self.duplicates_check = QCheckBox("إعادة استخدام نص الصفحات المكررة")
+        self.duplicates_check.setChecked(bool(self.settings.get("duplicate_pages")))
+        layout.addWidget(self.duplicates_check)
+
+        # المطابقة التقريبية تقبل النسخ المعاد مسحها؛ التامة تكفلها ذاكرة OCR
+        self.near_duplicates_check = QCheckBox(
+            "قبول النسخ المعاد مسحها (قد يخلط صفحات تختلف بحقل معبأ فقط)")
+        self.near_duplicates_check.setChecked(
+            self.settings.get("duplicate_verify_exact") is False)
+        layout.addWidget(self.near_duplicates_check)
+
+        distance_layout = QHBoxLayout()
+        distance_label = QLabel("أقصى مسافة بين بصمتي الصفحتين:")
+        self.distance_spin = QSpinBox()
+        self.distance_spin.setRange(0, 64)
+        distance = self.settings.get("duplicate_max_distance")
+        self.distance_spin.setValue(8 if distance is None else distance)
+        distance_layout.addWidget(distance_label)
+        distance_layout.addWidget(self.distance_spin)
+        layout.addLayout(distance_layout)
+
+        self.duplicates_check.toggled.connect(self._update_duplicate_controls)
+        self.near_duplicates_check.toggled.connect(self._update_duplicate_controls)
+        self._update_duplicate_controls()
+
         # أزرار الحفظ والإلغاء
         button_layout = QHBoxLayout()
         save_btn = QPushButton("حفظ")
@@ -48,8 +109,21 @@ class SettingsDialog(QDialog):
 
         self.setLayout(layout)
 
+    def _update_duplicate_controls(self):
+        enabled = self.duplicates_check.isChecked()
+        self.near_duplicates_check.setEnabled(enabled)
+        self.distance_spin.setEnabled(enabled and self.near_duplicates_check.isChecked())
+
     def save_settings(self):
         self.settings.set("language", self.lang_combo.currentText())
         self.settings.set("engine", self.engine_combo.currentText())
         self.settings.set("auto_update", self.auto_update_check.isChecked())
+        self.settings.set("parallel_pages", self.parallel_check.isChecked())
+        self.settings.set("preprocess_preset", self.preset_combo.currentData())
+        self.settings.set("text_regions", self.regions_check.isChecked())
+        self.settings.set("auto_orientation", self.orientation_check.isChecked())
+        self.settings.set("skip_blank_pages", self.blank_check.isChecked())
+        self.settings.set("duplicate_pages", self.duplicates_check.isChecked())
+        self.settings.set("duplicate_verify_exact", not self.near_duplicates_check.isChecked())
+        self.settings.set("duplicate_max_distance", self.distance_spin.value())
         self.accept()
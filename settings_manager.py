@@ -7,7 +7,25 @@ class SettingsManager:
         self.settings = {
             "language": "ara+eng",
             "engine": "Tesseract",
-            "auto_update": True
+            "auto_update": True,
+            "parallel_pages": True,
+            "ocr_workers": 0,  # 0 = عدد أنوية المعالج
+            "pdf_lookahead": 4,  # صفحات PDF المرسومة مسبقاً بانتظار OCR
+            "ocr_cache": True,
+            "ocr_cache_mb": 256,
+            "easyocr_batch_pages": 4,  # صفحات في كل دفعة EasyOCR
+            "early_stop_confidence": 0,  # 0 = انتظار المحركين دائماً في وضع "كلاهما"
+            "pdf_text_layer": True,  # استخدام نص PDF المضمن بدل OCR إن وُجد
+            "preprocess_preset": "balanced",  # fast / balanced / noisy_phone_photo
+            "text_regions": False,  # إرسال كتل النص فقط إلى Tesseract
+            "tile_large_pages": True,  # تقطيع الصفحات الضخمة إلى بلاطات متوازية
+            "auto_orientation": True,  # كشف اتجاه كل صفحة وتصحيحه قبل OCR
+            "skip_blank_pages": False,  # عدم إرسال الصفحات الفارغة إلى المحرك
+            "blank_max_ink": 0.0002,  # أقصى نسبة حبر لتُعدّ الصفحة فارغة
+            "blank_ink_contrast": 60,  # فرق الرمادي بين الورق والحبر
+            "duplicate_pages": False,  # إعادة استخدام نص الصفحات المكررة
+            "duplicate_max_distance": 8,  # أقصى مسافة بين البصمتين (من 256 بت)
+            "duplicate_verify_exact": True  # اشتراط تطابق البكسلات (التقريبي قد يخلط حقولاً معبأة)
         }
         self.load()
 
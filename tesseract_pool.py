@@ -0,0 +1,381 @@
+# tesseract_pool.py
+"""
+مجمّع عمليات Tesseract مقيمة.
+
+كل عامل عملية مستقلة تبقى حيّة طوال عمر التطبيق وتحتفظ بنماذج اللغة
+(ara/eng) محمّلة في الذاكرة، وتستقبل الصفحات عبر Pipe بدلاً من تشغيل
+عملية tesseract جديدة وإعادة تحميل traineddata لكل صفحة.
+
+داخل العامل تُستخدم مقابض ‎tesserocr.PyTessBaseAPI‎ إن كانت المكتبة مثبتة،
+وإلا نرجع إلى ‎pytesseract‎ (أبطأ لكنه يعمل بنفس الواجهة).
+"""
+import os
+import re
+import atexit
+import importlib.util
+import logging
+import queue
+import signal
+import itertools
+import threading
+import subprocess
+import multiprocessing
+from concurrent.futures import CancelledError, Future
+
+from cancellation import CANCEL_POLL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_PSM_RE = re.compile(r'--psm\s+(\d+)')
+_OEM_RE = re.compile(r'--oem\s+(\d+)')
+_VAR_RE = re.compile(r'-c\s+(\w+)=(\S+)')
+
+# مهام قصيرة يتوقف عليها إرسال الصفحات (OSD يسبق التعرف على الصفحة)،
+# فتتقدم على مهام التعرف المنتظرة بدل انتظار الطابور كله
+_URGENT_METHODS = frozenset({"osd"})
+_URGENT, _NORMAL, _STOP = range(3)
+
+
+def parse_tesseract_config(config):
+    """
+    تفكيك سلسلة إعدادات Tesseract (مثل ‎"--oem 3 --psm 6"‎) إلى
+    (psm, oem, variables) حتى تُستخدم مفتاحاً لمقبض API مقيم.
+    """
+    config = config or ""
+    psm = _PSM_RE.search(config)
+    oem = _OEM_RE.search(config)
+    variables = tuple(sorted(_VAR_RE.findall(config)))
+    return (
+        int(psm.group(1)) if psm else 3,
+        int(oem.group(1)) if oem else 3,
+        variables,
+    )
+
+
+def words_to_text(data):
+    """
+    إعادة بناء النص ومتوسط الثقة من مخرجات ‎image_to_data‎ (قاموس):
+    الكلمات تُجمع في أسطر حسب (block, par, line).
+    """
+    lines = {}
+    confs = []
+    for i, word in enumerate(data["text"]):
+        word = (word or "").strip()
+        conf = float(data["conf"][i])
+        if not word or conf < 0:
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append(word)
+        confs.append(conf)
+    text = "\n".join(" ".join(words) for _, words in sorted(lines.items()))
+    return text, (sum(confs) / len(confs) if confs else 0.0)
+
+
+def parse_tsv(tsv):
+    """
+    كلمات مخرجات TSV لـ Tesseract (‎image_to_data‎ أو ‎GetTSVText‎):
+    [(left, top, width, height, conf, text, (block, par, line))].
+    """
+    words = []
+    for row in tsv.splitlines():
+        cols = row.split("\t")
+        if len(cols) < 12 or cols[0] != "5":  # المستوى 5 = كلمة؛ يتخطى الترويسة
+            continue
+        text = cols[11].strip()
+        conf = float(cols[10])
+        if not text or conf < 0:
+            continue
+        left, top, width, height = (int(c) for c in cols[6:10])
+        words.append((left, top, width, height, conf, text,
+                      (int(cols[2]), int(cols[3]), int(cols[4]))))
+    return words
+
+
+class ResidentTesseractEngine:
+    """
+    محرّك يعيش داخل عملية العامل: مقبض API واحد لكل
+    (lang, psm, oem, variables) يُنشأ عند أول طلب ثم يُعاد استخدامه.
+    """
+
+    def __init__(self):
+        try:
+            import tesserocr
+        except ImportError:
+            tesserocr = None
+        self._tesserocr = tesserocr
+        self._apis = {}
+        self._pytesseract = None
+
+    def recognize(self, image, lang, config):
+        if self._tesserocr is None:
+            return self._cli().image_to_string(image, lang=lang, config=config)
+        api = self._set_image(image, lang, config)
+        try:
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+
+    def recognize_confidence(self, image, lang, config):
+        """(النص، متوسط الثقة 0-100)."""
+        if self._tesserocr is None:
+            pytesseract = self._cli()
+            data = pytesseract.image_to_data(
+                image, lang=lang, config=config,
+                output_type=pytesseract.Output.DICT)
+            return words_to_text(data)
+        api = self._set_image(image, lang, config)
+        try:
+            return api.GetUTF8Text(), float(api.MeanTextConf())
+        finally:
+            api.Clear()
+
+    def words(self, image, lang, config):
+        """الكلمات مع صناديقها وثقتها (انظر ‎parse_tsv‎)؛ للتقطيع إلى بلاطات."""
+        if self._tesserocr is None:
+            return parse_tsv(self._cli().image_to_data(
+                image, lang=lang, config=config))
+        api = self._set_image(image, lang, config)
+        try:
+            api.Recognize()
+            return parse_tsv(api.GetTSVText(0))
+        finally:
+            api.Clear()
+
+    def osd(self, image, lang, config):
+        """
+        كشف الاتجاه (OSD): (التدوير بالدرجات مع عقارب الساعة، الثقة).
+        ‎lang‎ و‎config‎ مُهمَلان؛ يُستخدم نموذج osd دائماً.
+        """
+        if self._tesserocr is None:
+            pytesseract = self._cli()
+            info = pytesseract.image_to_osd(
+                image, config="--psm 0",
+                output_type=pytesseract.Output.DICT)
+            return int(info["rotate"]), float(info["orientation_conf"])
+        api = self._set_image(image, "osd", "--psm 0")
+        try:
+            info = api.DetectOrientationScript()
+        finally:
+            api.Clear()
+        if not info:
+            return 0, 0.0
+        # orient_deg عكس عقارب الساعة؛ نعيد التدوير المصحح كما في pytesseract
+        return (360 - info["orient_deg"]) % 360, float(info["orient_conf"])
+
+    def _api(self, lang, config):
+        key = (lang,) + parse_tesseract_config(config)
+        api = self._apis.get(key)
+        if api is None:
+            psm, oem, variables = key[1:]
+            api = self._tesserocr.PyTessBaseAPI(lang=lang, psm=psm, oem=oem)
+            for name, value in variables:
+                api.SetVariable(name, value)
+            self._apis[key] = api
+            logger.info(f"Loaded resident Tesseract model: {key}")
+        return api
+
+    def _set_image(self, image, lang, config):
+        from PIL import Image
+
+        if not isinstance(image, Image.Image):
+            image = Image.fromarray(image)
+        api = self._api(lang, config)
+        api.SetImage(image)
+        return api
+
+    def _cli(self):
+        if self._pytesseract is None:
+            from ocr_logic import get_pytesseract
+
+            self._pytesseract = get_pytesseract()
+        return self._pytesseract
+
+
+def _worker_main(conn, engine_factory):
+    """حلقة العامل: يستقبل (method, image, lang, config) ويعيد (ok, payload)."""
+    # كل عامل يشغّل صفحة واحدة؛ التوازي يأتي من عدد العمال لا من OpenMP
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    if hasattr(os, "setpgid"):
+        # مجموعة عمليات خاصة كي يقتل الإلغاء عمليات tesseract الفرعية معه
+        os.setpgid(0, 0)
+    engine = engine_factory() if engine_factory else ResidentTesseractEngine()
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        method, image, lang, config = job
+        try:
+            reply = (True, getattr(engine, method)(image, lang, config))
+        except Exception as exc:
+            reply = (False, exc)
+        try:
+            conn.send(reply)
+        except Exception:
+            # استثناء غير قابل للتسلسل؛ نرسل وصفه فقط
+            conn.send((False, RuntimeError(repr(reply[1]))))
+
+
+def _kill_worker(proc):
+    """قتل عامل مع عملياته الفرعية (tesseract في مسار pytesseract)."""
+    try:
+        if os.name == "nt":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+                           capture_output=True, timeout=5)
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except (OSError, subprocess.SubprocessError):
+        # المجموعة غير موجودة بعد (العامل لم يصل إلى setpgid)
+        proc.kill()
+    proc.join(timeout=1)
+
+
+class TesseractPool:
+    """
+    مجمّع من ‎size‎ عمليات Tesseract مقيمة.
+    يقابل كل عامل خيط إرسال في العملية الأم يسحب المهام من طابور مشترك،
+    فتتوزع الصفحات تلقائياً على العمال المتفرغين. مهام OSD تتقدم الطابور:
+    خط المعالجة ينتظرها قبل إرسال الصفحة، فلا تنتظر هي كل الصفحات السابقة.
+    تبدأ العمليات عند أول مهمة لكل عامل، لذا إنشاء المجمّع رخيص.
+    """
+
+    def __init__(self, size=None, engine_factory=None):
+        self.size = max(1, size or os.cpu_count() or 1)
+        self._engine_factory = engine_factory
+        self._ctx = multiprocessing.get_context("spawn")
+        self._jobs = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._closed = False
+        self._threads = []
+        if engine_factory is None and importlib.util.find_spec("tesserocr") is None:
+            logger.warning(
+                "tesserocr is not installed: Tesseract workers fall back to "
+                "pytesseract, which starts a tesseract process and reloads the "
+                "language models for every page (pip install tesserocr)")
+        for i in range(self.size):
+            t = threading.Thread(
+                target=self._dispatch,
+                name=f"tesseract-pool-{i}",
+                daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _spawn(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self._engine_factory),
+            daemon=True)
+        proc.start()
+        child_conn.close()
+        return proc, parent_conn
+
+    def _dispatch(self):
+        proc = conn = None
+        while True:
+            _, _, job = self._jobs.get()
+            if job is None:
+                break
+            future, method, image, lang, config, token = job
+            if token is not None and token.cancelled:
+                future.cancel()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if proc is None or not proc.is_alive():
+                    proc, conn = self._spawn()
+                conn.send((method, image, lang, config))
+                if not self._await_reply(conn, token):
+                    # أُلغيت العملية: نقتل العامل بدل انتظار الصفحة،
+                    # ويُنشأ عامل جديد مع المهمة التالية
+                    _kill_worker(proc)
+                    conn.close()
+                    proc = conn = None
+                    future.set_exception(CancelledError("OCR cancelled"))
+                    continue
+                ok, payload = conn.recv()
+            except (EOFError, OSError) as exc:
+                logger.error(f"Tesseract worker died: {exc}")
+                proc = conn = None
+                future.set_exception(
+                    RuntimeError(f"Tesseract worker died: {exc}"))
+                continue
+            except Exception as exc:
+                # رد تالف (استثناء لا يُفك تسلسله مثلاً)؛ العامل نفسه سليم
+                # ويجب ألا يموت خيط الإرسال فتعلق المهام التالية للأبد
+                logger.error(f"Tesseract worker reply failed: {exc!r}")
+                future.set_exception(exc)
+                continue
+            if ok:
+                future.set_result(payload)
+            else:
+                future.set_exception(payload)
+        if proc is not None:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+            proc.join(timeout=2)
+            if proc.is_alive():
+                proc.terminate()
+
+    @staticmethod
+    def _await_reply(conn, token):
+        """انتظار رد العامل؛ يعيد False إن أُلغي ‎token‎ قبل وصوله."""
+        if token is None:
+            return True
+        while not conn.poll(CANCEL_POLL_SECONDS):
+            if token.cancelled:
+                return False
+        return True
+
+    def submit(self, image, lang="eng", config="", method="recognize",
+               token=None):
+        """
+        إرسال صفحة (PIL أو ndarray) للتعرف؛ يعيد Future بالنص.
+        ‎method="recognize_confidence"‎ يعيد (النص، متوسط الثقة)،
+        و‎method="words"‎ يعيد الكلمات بصناديقها، و‎method="osd"‎ (التدوير، الثقة).
+        ‎token‎ (CancelToken): إلغاؤه يقتل العامل إن كانت المهمة جارية
+        ويفشل الـ Future بـ CancelledError؛ المجمّع يبقى صالحاً للاستخدام.
+        """
+        if self._closed:
+            raise RuntimeError("TesseractPool is shut down")
+        future = Future()
+        priority = _URGENT if method in _URGENT_METHODS else _NORMAL
+        self._jobs.put((priority, next(self._order),
+                        (future, method, image, lang, config, token)))
+        return future
+
+    def image_to_string(self, image, lang="eng", config="", timeout=None):
+        """بديل متزامن لـ ‎pytesseract.image_to_string‎."""
+        return self.submit(image, lang, config).result(timeout)
+
+    def shutdown(self, wait=True):
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            # بعد كل المهام المنتظرة
+            self._jobs.put((_STOP, next(self._order), None))
+        if wait:
+            for t in self._threads:
+                t.join()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_tesseract_pool(size=None):
+    """
+    المجمّع المشترك للتطبيق (يُنشأ عند أول استخدام ويُغلق عند الخروج).
+    ‎size‎ يُعتدّ به عند الإنشاء فقط.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = TesseractPool(size)
+            atexit.register(_pool.shutdown)
+        return _pool
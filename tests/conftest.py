@@ -1,6 +1,9 @@
 # tests/conftest.py
 import sys
 import os
+from concurrent.futures import Future
+
+import pytest
 
 # Add project root to sys.path
 sys.path.insert(
@@ -11,4 +14,45 @@ sys.path.insert(
             '..'
         )
     )
-)
\ No newline at end of file
+)
+
+
+class RecordingPool:
+    """
+    مجمّع Tesseract وهمي: يسجّل (المقاس، الطريقة) لكل مهمة ويعيد Future
+    منتهياً. ‎result‎ قيمة ثابتة أو دالة ‎(image, lang)‎، و‎replies‎ يحدد
+    نتيجة طريقة بعينها (مثلاً ‎{"osd": (270, 9.0)}‎).
+    """
+
+    def __init__(self, result="text"):
+        self.result = result
+        self.replies = {}
+        self.calls = []
+
+    def submit(self, image, lang="eng", config="", method="recognize",
+               token=None):
+        self.calls.append((image.size, method))
+        reply = self.replies.get(method, self.result)
+        future = Future()
+        future.set_result(reply(image, lang) if callable(reply) else reply)
+        return future
+
+    def image_to_string(self, image, lang="eng", config="", timeout=None):
+        return self.submit(image, lang, config).result(timeout)
+
+    def sizes(self, method="recognize"):
+        """مقاسات الصفحات المرسلة بطريقة ‎method‎ بترتيب الإرسال."""
+        return [size for size, m in self.calls if m == method]
+
+
+@pytest.fixture
+def recording_pool(monkeypatch):
+    """‎RecordingPool‎ مكان المجمّع المشترك في خط المعالجة وفي ‎tesseract_pool‎."""
+    import ocr_pipeline
+    import tesseract_pool
+
+    pool = RecordingPool()
+    monkeypatch.setattr(ocr_pipeline, "get_tesseract_pool", lambda: pool)
+    monkeypatch.setattr(tesseract_pool, "get_tesseract_pool",
+                        lambda size=None: pool)
+    return pool
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from blank_pages import BLANK_MAX_INK, is_blank_page, page_ink_stats
+
+
+def _scan(seed=0, size=(1240, 1754)):
+    rng = np.random.default_rng(seed)
+    w, h = size
+    page = 235 + rng.normal(0, 6, (h, w))
+    return page
+
+
+def test_noisy_blank_scan_with_dust_and_edge_shadow_is_blank():
+    page = _scan()
+    for x, y in np.random.default_rng(1).integers(100, 1100, (40, 2)):
+        page[y:y + 2, x:x + 2] = 0  # غبار
+    page[:, :30] = 40  # ظل حافة الماسح
+    im = Image.fromarray(np.clip(page, 0, 255).astype(np.uint8))
+    assert is_blank_page(im)
+
+
+def _text_page(text, noisy=False):
+    """صفحة A4 بدقة 100 DPI (دقة رسم PDF في الواجهة) بسطر 12pt واحد."""
+    try:
+        font = ImageFont.load_default(size=17)
+    except TypeError:
+        pytest.skip("Pillow without scalable default font")
+    page = _scan(size=(827, 1169)) if noisy else np.full((1169, 827), 255.0)
+    im = Image.fromarray(np.clip(page, 0, 255).astype(np.uint8))
+    ImageDraw.Draw(im).text((100, 300), text, fill=0, font=font)
+    return im
+
+
+@pytest.mark.parametrize("text", [
+    "The quick brown fox jumps ov",
+    "The quick brown fox jumps over the lazy dog, twice.",
+    "Yes",
+])
+@pytest.mark.parametrize("noisy", [False, True])
+def test_page_with_one_short_text_line_is_not_blank(text, noisy):
+    im = _text_page(text, noisy)
+    assert not is_blank_page(im)
+    # حتى مع حد حبر متساهل: مكونات بحجم الحروف تمنع التخطي
+    assert not is_blank_page(im, max_ink=0.05)
+
+
+def test_ink_ratio_of_a_short_line_is_above_the_threshold():
+    _, ink = page_ink_stats(_text_page("The quick brown fox jumps ov"))
+    assert ink > 5 * BLANK_MAX_INK > 0
+
+
+def test_pipeline_skips_engine_for_blank_pages(recording_pool):
+    import ocr_pipeline
+
+    text_page = Image.new("L", (400, 300), 255)
+    ImageDraw.Draw(text_page).rectangle((50, 50, 350, 80), fill=0)
+    pages = [text_page, Image.new("L", (401, 300), 255), text_page]
+    pipeline = ocr_pipeline.OCRPipeline(lang="eng", skip_blank=True)
+    assert list(pipeline.run(pages)) == [(1, "text"), (2, ""), (3, "text")]
+    assert pipeline.blank_pages == {2}
+    assert recording_pool.sizes() == [(400, 300), (400, 300)]
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from decode_plan import DecodePlan, roi_to_source
+
+
+def _rotate_then_crop(im, roi_rel, rotation):
+    """المسار السابق: تدوير الصورة كاملة ثم القص."""
+    if rotation:
+        im = im.rotate(-rotation, expand=True)
+    w, h = im.size
+    x, y, wr, hr = roi_rel
+    return im.crop((int(x * w), int(y * h),
+                    int((x + wr) * w), int((y + hr) * h)))
+
+
+@pytest.mark.parametrize("rotation", [0, 90, 180, 270])
+def test_crop_before_rotate_matches_rotate_then_crop(rotation):
+    rng = np.random.default_rng(rotation)
+    im = Image.fromarray(rng.integers(0, 255, (80, 120, 3), dtype=np.uint8))
+    roi = (0.25, 0.5, 0.5, 0.25)
+
+    planned = DecodePlan(roi, rotation, max_side=None).load(im)
+    expected = _rotate_then_crop(im, roi, rotation)
+    assert planned.size == expected.size
+    assert np.array_equal(np.asarray(planned), np.asarray(expected))
+
+
+def test_full_frame_roi_is_identity():
+    assert roi_to_source(None, 90) == (0.0, 0.0, 1.0, 1.0)
+    assert roi_to_source((0, 0, 1, 1), 270) == (0.0, 0.0, 1.0, 1.0)
+
+
+def test_large_jpeg_is_draft_decoded(tmp_path):
+    path = str(tmp_path / "photo.jpg")
+    Image.new("RGB", (4000, 3000), "white").save(path, quality=80)
+
+    # الصورة كاملة والحد 500: المقياس 1/8 يعطي 500 بالضبط
+    full = DecodePlan(max_side=500, mode="L").load(path)
+    assert full.size == (500, 375)
+    # الحد 900: المقياس 1/4 هو الأصغر الذي يُبقي الضلع ≥ 900
+    assert DecodePlan(max_side=900).load(path).size == (1000, 750)
+    assert full.mode == "L"
+
+    # منطقة صغيرة تبقى بدقتها الكاملة
+    roi = DecodePlan((0.0, 0.0, 0.1, 0.1), max_side=500).load(path)
+    assert roi.size == (400, 300)
@@ -0,0 +1,77 @@
+# tests/test_easyocr_registry.py
+import sys
+import time
+import types
+from collections import OrderedDict
+
+import pytest
+
+from ocr_logic import EasyOCRSingleton
+
+
+class _Loads(list):
+    Reader = None
+
+
+@pytest.fixture
+def fake_easyocr(monkeypatch):
+    """وحدة easyocr وهمية تسجّل عدد مرات تحميل كل قارئ."""
+    loads = _Loads()
+
+    class Reader:
+        active = peak = 0
+
+        def __init__(self, langs, **kwargs):
+            time.sleep(0.05)
+            loads.append(tuple(langs))
+            self.langs = langs
+
+        def readtext(self, image, **kwargs):
+            Reader.active += 1
+            Reader.peak = max(Reader.peak, Reader.active)
+            time.sleep(0.02)
+            Reader.active -= 1
+            return [image]
+
+        readtext_batched = readtext
+
+    loads.Reader = Reader
+
+    monkeypatch.setitem(sys.modules, "easyocr",
+                        types.SimpleNamespace(Reader=Reader))
+    monkeypatch.setattr(EasyOCRSingleton, "_readers", OrderedDict())
+    monkeypatch.setattr(EasyOCRSingleton, "_key_locks", {})
+    monkeypatch.setattr(EasyOCRSingleton, "max_readers", 2)
+    return loads
+
+
+def test_warm_up_shares_the_loaded_reader(fake_easyocr):
+    thread = EasyOCRSingleton.warm_up(["ar", "en"])
+    reader = EasyOCRSingleton.get_reader(["ar", "en"])
+    thread.join()
+    assert reader is EasyOCRSingleton.get_reader(("ar", "en"))
+    assert fake_easyocr == [("ar", "en")]
+
+
+def test_least_recently_used_reader_is_evicted(fake_easyocr):
+    EasyOCRSingleton.get_reader(["ar"])
+    EasyOCRSingleton.get_reader(["en"])
+    EasyOCRSingleton.get_reader(["ar"])
+    EasyOCRSingleton.get_reader(["ar", "en"])
+    assert list(EasyOCRSingleton._readers) == [("ar",), ("ar", "en")]
+    EasyOCRSingleton.get_reader(["en"])
+    assert fake_easyocr.count(("en",)) == 2
+
+
+def test_shared_reader_serializes_calls_from_every_thread(fake_easyocr):
+    from concurrent.futures import ThreadPoolExecutor
+
+    # تشغيلان (مثلاً ملغى وجديد في الواجهة، أو مهمتا خادم) يطلبان القارئ نفسه
+    reader = EasyOCRSingleton.get_reader(["ar"])
+    assert reader.langs == ["ar"]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        calls = [pool.submit(EasyOCRSingleton.get_reader(["ar"]).readtext, i)
+                 for i in range(4)]
+        calls += [pool.submit(reader.readtext_batched, i) for i in range(4)]
+        assert sorted(c.result()[0] for c in calls) == [0, 0, 1, 1, 2, 2, 3, 3]
+    assert fake_easyocr.Reader.peak == 1
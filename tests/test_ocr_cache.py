@@ -0,0 +1,69 @@
+# tests/test_ocr_cache.py
+import os
+from PIL import Image
+
+from ocr_cache import OCRCache, page_fingerprint
+
+
+def test_fingerprint_depends_on_pixels_and_params():
+    white = Image.new("L", (20, 20), 255)
+    black = Image.new("L", (20, 20), 0)
+    key = page_fingerprint(white, lang="ara", rotation=0)
+    assert key == page_fingerprint(white.copy(), rotation=0, lang="ara")
+    assert key != page_fingerprint(black, lang="ara", rotation=0)
+    assert key != page_fingerprint(white, lang="ara", rotation=90)
+
+
+def test_cache_counts_hits_and_misses(tmp_path):
+    cache = OCRCache(str(tmp_path))
+    assert cache.get("ab" * 20) is None
+    cache.put("ab" * 20, "نص عربي")
+    assert cache.get("ab" * 20) == "نص عربي"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["bytes"] == len("نص عربي".encode("utf-8"))
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = OCRCache(str(tmp_path), max_mb=250 / (1024 * 1024))
+    for i, key in enumerate(["aa" * 20, "bb" * 20]):
+        cache.put(key, "x" * 100)
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+    cache.get("aa" * 20)  # الأحدث استخداماً الآن
+    cache.put("cc" * 20, "x" * 100)
+    assert cache.get("bb" * 20) is None
+    assert cache.get("aa" * 20) is not None
+    assert cache.get("cc" * 20) is not None
+    assert cache.stats()["bytes"] <= 250
+
+
+def test_extract_text_from_image_keys_the_preprocessing_that_ran(
+        recording_pool, monkeypatch, tmp_path):
+    import image_preprocess
+    import ocr_cache
+    import ocr_logic
+
+    path = str(tmp_path / "page.png")
+    Image.new("L", (30, 20), 255).save(path)
+    cache = OCRCache(str(tmp_path / "cache"))
+    recording_pool.result = "نص"
+
+    def no_cv2(image_path):
+        raise ImportError("cv2 missing")
+
+    monkeypatch.setattr(ocr_cache, "get_ocr_cache", lambda: cache)
+    monkeypatch.setattr(image_preprocess, "preprocess_image_advanced", no_cv2)
+    monkeypatch.setattr(ocr_logic, "tesseract_info", lambda: None)
+    assert ocr_logic.extract_text_from_image(path) == "نص"
+    # الصورة الخام هي ما عولج؛ مفتاح "advanced" يبقى فارغاً
+    with Image.open(path) as img:
+        raw = page_fingerprint(img, engine="Tesseract", lang="eng+ara", preprocess="none")
+        advanced = page_fingerprint(img, engine="Tesseract", lang="eng+ara", preprocess="advanced")
+    assert cache.get(raw) == "نص" and cache.get(advanced) is None
+
+    def unreachable():
+        raise AssertionError("Tesseract discovery before the cache lookup")
+
+    monkeypatch.setattr(ocr_logic, "tesseract_info", unreachable)
+    assert ocr_logic.extract_text_from_image(path) == "نص"
+    assert recording_pool.sizes() == [(30, 20)]
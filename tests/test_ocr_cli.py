@@ -0,0 +1,55 @@
+# tests/test_ocr_cli.py
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+from PIL import Image
+
+import ocr_cli
+
+
+@pytest.fixture
+def scans(tmp_path, recording_pool):
+    recording_pool.result = lambda image, lang: f"{lang}:{image.size[0]}"
+    folder = tmp_path / "scans"
+    (folder / "sub").mkdir(parents=True)
+    Image.new("L", (30, 10), 255).save(folder / "a.png")
+    Image.new("L", (40, 10), 255).save(folder / "sub" / "b.jpg")
+    (folder / "notes.txt").write_text("not an image")
+    (folder / "broken.png").write_bytes(b"not a png")
+    return folder
+
+
+def _records(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_batch_writes_one_line_per_page(scans, tmp_path):
+    out = tmp_path / "out.jsonl"
+    code = ocr_cli.main([str(scans), "-r", "--no-cache", "--jobs", "2",
+                         "--lang", "ara", "-o", str(out)])
+    records = {os.path.basename(r["file"]): r for r in _records(out)}
+    assert code == 1  # broken.png
+    assert "error" in records["broken.png"]
+    assert records["a.png"]["text"] == "ara:30"
+    assert records["b.jpg"] == {"file": str(scans / "sub" / "b.jpg"),
+                                "page": 1, "pages": 1, "text": "ara:40"}
+    assert "notes.txt" not in records
+
+
+def test_batch_accepts_globs(scans, tmp_path):
+    out = tmp_path / "out.jsonl"
+    code = ocr_cli.main([str(scans / "**" / "*.jpg"), "--no-cache",
+                         "--per-document", "-o", str(out)])
+    assert code == 0
+    assert [r["text"] for r in _records(out)] == ["ara+eng:40"]
+
+
+def test_batch_mode_does_not_import_pyqt():
+    code = ("import sys, ocr_cli, ocr_pipeline, page_sources, ocr_cache; "
+            "sys.exit('PyQt5' in sys.modules)")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert subprocess.call([sys.executable, "-c", code], cwd=root) == 0
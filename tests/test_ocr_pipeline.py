@@ -0,0 +1,199 @@
+# tests/test_ocr_pipeline.py
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+import ocr_pipeline
+from ocr_pipeline import OCRPipeline, OCRCancelledError, OCRPageError
+
+
+class SlowFirstPool:
+    """مجمّع وهمي: الصفحات الأولى أبطأ فتنتهي بغير ترتيبها."""
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=4)
+
+    def submit(self, image, lang="eng", config="", method="recognize"):
+        width = image.size[0]
+
+        def work():
+            time.sleep(0.05 / width)
+            if width == 99:
+                raise ValueError("bad page")
+            if method == "recognize_confidence":
+                return f"page-{width}", 95.0
+            return f"page-{width}"
+        return self.executor.submit(work)
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    pool = SlowFirstPool()
+    monkeypatch.setattr(ocr_pipeline, "get_tesseract_pool", lambda: pool)
+    yield pool
+    pool.executor.shutdown()
+
+
+def _pages(n):
+    return [Image.new("L", (i, 10)) for i in range(1, n + 1)]
+
+
+def test_parallel_run_keeps_page_order(fake_pool):
+    seen = []
+    pipeline = OCRPipeline(workers=4)
+    results = list(pipeline.run(_pages(6), 6,
+                                progress=lambda i, t: seen.append((i, t))))
+    assert results == [(i, f"page-{i}") for i in range(1, 7)]
+    assert seen == [(i, 6) for i in range(1, 7)]
+
+
+def test_run_cancels_between_pages(fake_pool):
+    pipeline = OCRPipeline(workers=2)
+    gen = pipeline.run(_pages(6), 6, is_cancelled=lambda: True)
+    with pytest.raises(OCRCancelledError):
+        next(gen)
+
+
+def test_page_error_carries_page_number(fake_pool):
+    pages = _pages(2) + [Image.new("L", (99, 10))]
+    with pytest.raises(OCRPageError) as info:
+        list(OCRPipeline(workers=3).run(pages, 3))
+    assert info.value.page == 3
+
+
+def test_cached_pages_skip_the_engine(fake_pool, tmp_path):
+    from ocr_cache import OCRCache
+
+    cache = OCRCache(str(tmp_path))
+    first = list(OCRPipeline(workers=2, cache=cache).run(_pages(3), 3))
+    fake_pool.executor.shutdown()  # أي استدعاء للمحرك سيفشل الآن
+    second = list(OCRPipeline(workers=2, cache=cache).run(_pages(3), 3))
+    assert first == second
+    assert cache.stats()["hits"] == 3
+
+
+class BatchReader:
+    """قارئ EasyOCR وهمي يسجّل أحجام الدفعات."""
+
+    def __init__(self):
+        self.batches = []
+
+    def readtext_batched(self, images, batch_size=1, detail=1, paragraph=False):
+        # EasyOCR يعامل المصفوفة ثلاثية الأبعاد صورةً واحدة؛ الدفعة قائمة
+        assert isinstance(images, list)
+        assert all(a.ndim == 2 and a.shape == images[0].shape for a in images)
+        self.batches.append((len(images),) + images[0].shape)
+        return [[f"easy-{i}"] for i in range(len(images))]
+
+
+def test_easyocr_pages_are_batched(fake_pool):
+    reader = BatchReader()
+    pipeline = OCRPipeline(engine="EasyOCR", reader=reader,
+                           workers=1, easyocr_batch=3)
+    results = list(pipeline.run(_pages(5), 5))
+    assert [idx for idx, _ in results] == [1, 2, 3, 4, 5]
+    assert [text for _, text in results] == [
+        "easy-0", "easy-1", "easy-2", "easy-0", "easy-1"]
+    # صفحات مختلفة العرض تُحشى إلى أبعاد موحّدة
+    assert reader.batches == [(3, 10, 3), (2, 10, 5)]
+
+
+class SlowReader:
+    """قارئ EasyOCR وهمي أبطأ من Tesseract."""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def readtext(self, image, detail=1, paragraph=False, batch_size=1):
+        time.sleep(self.delay)
+        return ["easy"]
+
+
+def test_both_engines_merge_in_fixed_order(fake_pool):
+    pipeline = OCRPipeline(engine="كلاهما", reader=SlowReader(0))
+    assert list(pipeline.run(_pages(2), 2)) == [
+        (1, "page-1\neasy"), (2, "page-2\neasy")]
+
+
+def test_early_stop_skips_the_slower_engine(fake_pool):
+    pipeline = OCRPipeline(engine="كلاهما", reader=SlowReader(2),
+                           early_stop_conf=90)
+    pipeline._readtext_confidence = pipeline._readtext
+    started = time.perf_counter()
+    assert list(pipeline.run(_pages(1), 1)) == [(1, "page-1")]
+    assert time.perf_counter() - started < 1.5
+
+
+def test_early_stop_sends_easyocr_pages_one_at_a_time(fake_pool):
+    class Reader(BatchReader):
+        def readtext(self, image, detail=1, paragraph=False, batch_size=1):
+            return ["easy"]
+
+    reader = Reader()
+    pipeline = OCRPipeline(engine="كلاهما", reader=reader, easyocr_batch=4,
+                           early_stop_conf=90)
+    seen = []
+    pipeline._readtext_confidence = lambda proc: seen.append(proc) or ("easy", 95.0)
+    assert len(list(pipeline.run(_pages(3), 3))) == 3
+    assert len(seen) == 3 and reader.batches == []
+
+
+class BoxReader:
+    """قارئ EasyOCR وهمي يعيد كلمتين على سطر واحد (‎detail=1‎)."""
+
+    def readtext(self, image, detail=1, paragraph=False, batch_size=1):
+        return [([[200, 10], [300, 10], [300, 40], [200, 40]], "مرحبا", 0.9),
+                ([[90, 10], [180, 10], [180, 40], [90, 40]], "بالعالم", 0.7)]
+
+
+@pytest.mark.parametrize("lang, text", [
+    ("ara", "مرحبا بالعالم"), ("eng", "بالعالم مرحبا")])
+def test_readtext_confidence_orders_words_by_script(lang, text):
+    pytest.importorskip("easyocr")
+    pipeline = OCRPipeline(engine="EasyOCR", lang=lang, reader=BoxReader())
+    result, conf = pipeline._readtext_confidence(Image.new("L", (400, 60), 255))
+    assert result == text
+    assert conf == pytest.approx(80.0)
+
+
+def test_token_cancels_while_a_page_is_running(monkeypatch):
+    import threading
+    from concurrent.futures import Future
+    from cancellation import CancelToken
+
+    tokens = []
+
+    class HangingPool:
+        def submit(self, image, lang="eng", config="", method="recognize",
+                   token=None):
+            tokens.append(token)
+            return Future()  # لا تكتمل أبداً
+
+    monkeypatch.setattr(ocr_pipeline, "get_tesseract_pool", HangingPool)
+    token = CancelToken()
+    threading.Timer(0.1, token.cancel).start()
+    started = time.perf_counter()
+    with pytest.raises(OCRCancelledError):
+        list(OCRPipeline(lang="eng").run(
+            [Image.new("L", (10, 10), 255)], token=token))
+    assert time.perf_counter() - started < 0.5
+    assert tokens == [token]
+
+
+def test_pipeline_reports_page_time(recording_pool):
+    pipeline = OCRPipeline(lang="eng")
+    for _ in pipeline.run([Image.new("L", (20, 20), 255)]):
+        assert 0.0 < pipeline.last_page_seconds < 5.0
+
+
+def test_page_time_includes_pulling_the_page_from_its_source(recording_pool):
+    def slow_source():
+        for _ in range(2):
+            time.sleep(0.2)  # رسم صفحة PDF مثلاً
+            yield Image.new("L", (20, 20), 255)
+
+    pipeline = OCRPipeline(lang="eng")
+    for _ in pipeline.run(slow_source()):
+        assert pipeline.last_page_seconds >= 0.2
@@ -0,0 +1,88 @@
+# tests/test_ocr_server.py
+import json
+import time
+import asyncio
+import threading
+import http.client
+
+from ocr_server import OCRServer
+
+
+def fake_ocr(data, options):
+    """محرك وهمي: ينتظر إشارة إن طُلب ذلك ثم يعيد حجم الملف."""
+    if data == b"block":
+        fake_ocr.release.wait(10)
+    if data == b"fail":
+        raise RuntimeError("engine failure")
+    return {"pages": [{"page": 1, "text": f"{options['lang']}:{len(data)}"}],
+            "text": f"{options['lang']}:{len(data)}"}
+
+
+fake_ocr.release = threading.Event()
+
+
+def request(port, method, path, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.request(method, path, body=body)
+    resp = conn.getresponse()
+    data = json.loads(resp.read().decode("utf-8"))
+    conn.close()
+    return resp.status, resp.getheader("Retry-After"), data
+
+
+def run_with_server(scenario, **kwargs):
+    async def main():
+        server = OCRServer(ocr_func=fake_ocr, **kwargs)
+        port = await server.start(port=0)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(None, scenario, port)
+        finally:
+            await server.stop()
+    return asyncio.run(main())
+
+
+def test_sync_ocr_and_job_polling():
+    def scenario(port):
+        status, _, data = request(port, "POST", "/ocr?lang=ara+eng", b"12345")
+        assert status == 200
+        assert data["status"] == "done" and data["text"] == "ara+eng:5"
+
+        status, _, data = request(port, "POST", "/jobs", b"fail")
+        assert status == 202
+        job_id = data["job_id"]
+        for _ in range(100):
+            status, _, data = request(port, "GET", f"/jobs/{job_id}")
+            if data["status"] in ("done", "failed"):
+                break
+            time.sleep(0.02)
+        assert data == {"job_id": job_id, "status": "failed",
+                        "error": "engine failure",
+                        "seconds": data["seconds"]}
+
+        assert request(port, "GET", "/jobs/unknown")[0] == 404
+        assert request(port, "POST", "/ocr?lang=a;rm", b"x")[0] == 400
+        status, _, stats = request(port, "GET", "/stats")
+        assert (stats["completed"], stats["failed"]) == (1, 1)
+
+    run_with_server(scenario, workers=1, queue_size=2)
+
+
+def test_full_queue_answers_429():
+    def scenario(port):
+        fake_ocr.release.clear()
+        try:
+            # عامل واحد مشغول + مهمة في الطابور = امتلاء
+            assert request(port, "POST", "/jobs", b"block")[0] == 202
+            time.sleep(0.1)
+            assert request(port, "POST", "/jobs", b"block")[0] == 202
+            status, retry_after, _ = request(port, "POST", "/jobs", b"x")
+            assert (status, retry_after) == (429, "1")
+            _, _, stats = request(port, "GET", "/stats")
+            assert stats["in_flight"] == 1
+            assert stats["queue_depth"] == 1
+            assert stats["rejected"] == 1
+        finally:
+            fake_ocr.release.set()
+
+    run_with_server(scenario, workers=1, queue_size=1)
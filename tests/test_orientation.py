@@ -0,0 +1,94 @@
+from concurrent.futures import Future
+
+from PIL import Image
+
+from orientation import OrientationDetector, osd_thumbnail
+
+
+def _done(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def test_thumbnail_is_small_and_gray():
+    thumb = osd_thumbnail(Image.new("RGB", (4000, 3000), "white"))
+    assert thumb.mode == "L" and thumb.size == (1200, 900)
+
+
+def test_detection_is_cached_per_page():
+    calls = []
+
+    def submit(thumb):
+        calls.append(thumb.size)
+        return _done((90, 7.5))
+
+    detector = OrientationDetector(submit)
+    page = Image.new("L", (300, 200), 255)
+    page.putpixel((10, 10), 0)
+    rotated = detector.apply(page)
+    assert rotated.size == (200, 300)
+    assert detector.apply(page.copy()).size == (200, 300)
+    assert calls == [(300, 200)] and detector.rotated_pages == 2
+
+
+def test_low_confidence_leaves_page_upright():
+    detector = OrientationDetector(lambda thumb: _done((180, 0.4)))
+    assert detector.detect(Image.new("L", (50, 50), 255)) == 0
+
+
+def test_sparse_page_error_is_not_cached_and_keeps_detection_on(tmp_path):
+    from ocr_cache import OCRCache
+
+    replies = [RuntimeError("Too few characters. Skipping this page? "
+                            "OSD: Error during processing."), (90, 8.0)]
+
+    def submit(thumb):
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return _done(reply)
+
+    detector = OrientationDetector(submit, cache=OCRCache(str(tmp_path)))
+    page = Image.new("L", (50, 50), 255)
+    assert detector.detect(page) == 0
+    assert detector.enabled is True
+    assert detector.cache.stats()["bytes"] == 0
+    assert detector.detect(page) == 90
+
+
+def test_missing_osd_model_disables_detection():
+    calls = []
+
+    def broken(thumb):
+        calls.append(thumb.size)
+        raise RuntimeError("Error opening data file /usr/share/tessdata/"
+                           "osd.traineddata\nFailed loading language 'osd'")
+
+    detector = OrientationDetector(broken)
+    assert detector.detect(Image.new("L", (50, 50), 255)) == 0
+    assert detector.detect(Image.new("L", (60, 60), 255)) == 0
+    assert detector.enabled is False and len(calls) == 1
+
+
+def test_osd_results_stay_out_of_the_ocr_cache(tmp_path):
+    from ocr_cache import OCRCache
+    from orientation import osd_cache
+
+    cache = OCRCache(str(tmp_path / "ocr_cache"))
+    detector = OrientationDetector(lambda thumb: _done((0, 9.0)),
+                                   cache=osd_cache(cache))
+    detector.detect(Image.new("L", (50, 50), 255))
+    assert cache.stats()["bytes"] == 0
+    assert detector.cache.cache_dir == str(tmp_path / "ocr_cache_osd")
+    assert detector.cache.stats()["bytes"] > 0
+
+
+def test_pipeline_rotates_before_recognition(recording_pool):
+    import ocr_pipeline
+
+    recording_pool.replies["osd"] = (270, 9.0)
+    pipeline = ocr_pipeline.OCRPipeline(lang="eng", auto_rotate=True)
+    assert list(pipeline.run([Image.new("L", (400, 100), 255)])) == [(1, "text")]
+    assert recording_pool.sizes() == [(100, 400)]
+    assert pipeline.cache_params()["auto_rotate"] is True
@@ -0,0 +1,144 @@
+import io
+import random
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from page_hash import (LAYOUT_MAX_DIFF, DuplicateIndex, hamming, layout_distance,
+                       layout_signature, phash)
+
+WORDS = ("contract party agreement shall hereby clause section payment "
+         "date amount signed witness").split()
+
+
+def _font():
+    try:
+        return ImageFont.load_default(size=36)
+    except TypeError:
+        pytest.skip("Pillow without scalable default font")
+
+
+def _lines(seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 10)))
+            for _ in range(40)]
+
+
+def _render(lines):
+    """صفحة A4 بدقة 300 DPI بأربعين سطراً."""
+    font = _font()
+    page = Image.new("L", (2480, 3508), 255)
+    draw = ImageDraw.Draw(page)
+    for i, line in enumerate(lines):
+        draw.text((200, 200 + i * 75), line, fill=0, font=font)
+    return page
+
+
+def _rescan(page, shift=(6, 4), quality=60):
+    arr = np.roll(np.asarray(page, np.int16), shift, (0, 1))
+    arr = arr + np.random.default_rng(9).normal(0, 8, arr.shape)
+    buf = io.BytesIO()
+    Image.fromarray(np.clip(arr, 0, 255).astype(np.uint8)).save(buf, "JPEG", quality=quality)
+    return Image.open(buf)
+
+
+def _edited(lines, **changes):
+    lines = list(lines)
+    for i, text in changes.items():
+        lines[int(i[1:])] = text
+    return lines
+
+
+def test_phash_tolerates_rescans_but_separates_pages():
+    a = phash(_render(_lines(0)))
+    assert hamming(a, phash(_rescan(_render(_lines(0))))) <= 12
+    assert hamming(a, phash(_render(_lines(1)))) > 40
+
+
+def test_layout_signature_tolerates_rescans_but_not_line_changes():
+    lines = _lines(0)
+    base = layout_signature(_render(lines))
+    swapped = _edited(lines, l10=lines[11], l11=lines[10])
+    changed = _edited(lines, l17="witness date shall payment party clause")
+    for shift, quality in [((6, 4), 60), ((2, 2), 75), ((-8, 3), 85)]:
+        rescan = _rescan(_render(lines), shift, quality)
+        assert layout_distance(base, layout_signature(rescan)) < LAYOUT_MAX_DIFF
+    low_dpi = _render(lines).resize((827, 1169))
+    assert layout_distance(base, layout_signature(low_dpi)) < LAYOUT_MAX_DIFF
+    assert layout_distance(base, layout_signature(_render(swapped))) > LAYOUT_MAX_DIFF
+    assert layout_distance(base, layout_signature(_render(changed))) > LAYOUT_MAX_DIFF
+
+
+def test_near_index_rejects_pages_that_differ_by_one_line():
+    lines = _lines(0)
+    index = DuplicateIndex(path=None, verify=False)
+    index.add(index.key(_render(lines), "s"), "النص الأصلي")
+    assert index.lookup(index.key(_rescan(_render(lines)), "s")) == "النص الأصلي"
+    swapped = _edited(lines, l10=lines[11], l11=lines[10])
+    changed = _edited(lines, l17="witness date shall payment party clause")
+    assert index.lookup(index.key(_render(swapped), "s")) is None
+    assert index.lookup(index.key(_render(changed), "s")) is None
+
+
+def test_default_index_requires_identical_pages(tmp_path):
+    path = str(tmp_path / "hashes.jsonl")
+    lines = _lines(0)
+    index = DuplicateIndex(path)
+    index.add(index.key(_render(lines), "s"), "نص الترويسة")
+
+    reloaded = DuplicateIndex(path)
+    assert reloaded.verify
+    assert reloaded.lookup(reloaded.key(_render(lines), "s")) == "نص الترويسة"
+    assert reloaded.lookup(reloaded.key(_render(lines), "other")) is None
+    field = _edited(lines, l25=lines[25][:-6] + "123456")
+    assert reloaded.lookup(reloaded.key(_render(field), "s")) is None
+    assert reloaded.lookup(reloaded.key(_rescan(_render(lines)), "s")) is None
+    # الوضع التام لا يحسب البصمة الإدراكية ولا توزيع الحبر
+    key = reloaded.key(_render(lines), "s")
+    assert key.phash is None and key.layout is None
+
+    near = DuplicateIndex(path, verify=False)
+    assert near.lookup(near.key(_render(lines), "s")) == "نص الترويسة"
+    assert near.lookup(near.key(_rescan(_render(lines)), "s")) is None
+    near.add(near.key(_render(lines), "s"), "نص الترويسة")
+    assert near.lookup(near.key(_rescan(_render(lines)), "s")) == "نص الترويسة"
+
+
+def test_compaction_keeps_newest_entries():
+    index = DuplicateIndex(path=None, verify=False, max_entries=4)
+    keys = [index.key(_render(_lines(seed)), "s") for seed in range(5)]
+    for seed, key in enumerate(keys):
+        index.add(key, f"page {seed}")
+    assert index.stats()["entries"] == 2
+    assert index.lookup(keys[4]) == "page 4"
+    assert index.lookup(keys[0]) is None
+
+
+def test_pipeline_reuses_duplicate_pages(recording_pool):
+    import ocr_pipeline
+
+    recording_pool.result = lambda image, lang: f"page {len(recording_pool.calls)}"
+    pipeline = ocr_pipeline.OCRPipeline(
+        lang="eng", duplicates=DuplicateIndex(path=None, verify=False))
+    pages = [_render(_lines(0)), _render(_lines(1)), _rescan(_render(_lines(0)))]
+    assert list(pipeline.run(pages)) == [(1, "page 1"), (2, "page 2"), (3, "page 1")]
+    assert len(recording_pool.calls) == 2 and pipeline.duplicate_pages == 1
+
+
+def test_exact_mode_defers_to_the_ocr_cache(recording_pool, monkeypatch, tmp_path):
+    import ocr_pipeline
+    from ocr_cache import OCRCache
+
+    recording_pool.result = "page"
+
+    def no_key(im, scope):
+        raise AssertionError("exact index consulted next to the OCR cache")
+
+    index = DuplicateIndex(path=None)
+    monkeypatch.setattr(index, "key", no_key)
+    pipeline = ocr_pipeline.OCRPipeline(
+        lang="eng", workers=1, cache=OCRCache(str(tmp_path)), duplicates=index)
+    page = Image.new("L", (60, 40), 255)
+    assert list(pipeline.run([page, page.copy()])) == [(1, "page"), (2, "page")]
+    assert len(recording_pool.calls) == 1 and index.stats()["entries"] == 0
@@ -0,0 +1,137 @@
+# tests/test_page_sources.py
+import pytest
+from PIL import Image
+
+pdf2image = pytest.importorskip("pdf2image")
+
+from page_sources import PDFPageSource  # noqa: E402
+
+
+@pytest.fixture
+def fake_pdf(monkeypatch):
+    """يحاكي pdftoppm: ملف من 7 صفحات ويسجّل نوافذ الرسم المطلوبة."""
+    calls = []
+
+    def convert(path, dpi=200, first_page=None, last_page=None, **kwargs):
+        calls.append((first_page, last_page))
+        return [Image.new("L", (n, 10)) for n in range(first_page, last_page + 1)]
+
+    monkeypatch.setattr(pdf2image, "convert_from_path", convert)
+    monkeypatch.setattr(pdf2image, "pdfinfo_from_path",
+                        lambda path, **kwargs: {"Pages": 7})
+    monkeypatch.setattr(PDFPageSource, "probe_rasters",
+                        lambda self, first, last: {})
+    return calls
+
+
+@pytest.mark.parametrize("lookahead", [0, 2])
+def test_pdf_source_renders_in_windows(fake_pdf, lookahead):
+    source = PDFPageSource("doc.pdf", window=3, lookahead=lookahead)
+    assert len(source) == 7
+    pages = list(source)
+    assert [page.size[0] for page in pages] == list(range(1, 8))
+    assert all(page.info["render_dpi"] == 100 for page in pages)
+    assert fake_pdf == [(1, 3), (4, 6), (7, 7)]
+
+
+def test_pdf_source_propagates_render_errors(monkeypatch, fake_pdf):
+    def broken(*args, **kwargs):
+        raise RuntimeError("pdftoppm failed")
+
+    monkeypatch.setattr(pdf2image, "convert_from_path", broken)
+    with pytest.raises(RuntimeError):
+        list(PDFPageSource("doc.pdf", lookahead=2))
+
+
+def test_text_layer_pages_skip_rasterization(fake_pdf, monkeypatch):
+    from page_sources import TextLayerPage, is_usable_text
+
+    text = "هذا نص مضمن في ملف PDF مُصدَّر من Word"
+    monkeypatch.setattr(
+        PDFPageSource, "probe_text",
+        lambda self, first, last: {n: text if n in (2, 3, 7) else "  \n"
+                                   for n in range(first, last + 1)})
+    source = PDFPageSource("doc.pdf", window=4, lookahead=0)
+    pages = list(source)
+    assert [isinstance(p, TextLayerPage) for p in pages] == [
+        False, True, True, False, False, False, True]
+    assert pages[1].text == text
+    # الصفحات الممسوحة فقط تُرسم، في مقاطع متصلة
+    assert fake_pdf == [(1, 1), (4, 4), (5, 6)]
+    assert source.text_layer_pages == 3
+    assert not is_usable_text("�" * 30 + "abc" * 10)
+
+
+def test_scanned_pages_with_a_stamp_only_text_layer_are_rendered(
+        fake_pdf, monkeypatch):
+    from page_sources import TextLayerPage
+
+    stamp = "ACME-LEGAL-0001234 CONFIDENTIAL"
+    body = "نص الصفحة كاملة كما تعرّف عليه الماسح " * 40
+    texts = {1: stamp, 2: body, 3: stamp, 4: stamp}
+    monkeypatch.setattr(
+        PDFPageSource, "probe_text",
+        lambda self, first, last: {n: texts.get(n, "")
+                                   for n in range(first, last + 1)})
+    # الصفحات 1-3 صورة مسح بحجم ورقة Letter؛ الرابعة مُصدَّرة بلا صور
+    monkeypatch.setattr(
+        PDFPageSource, "probe_rasters",
+        lambda self, first, last: {n: (0.98, 93.5) for n in (1, 2, 3)
+                                   if first <= n <= last})
+    pages = list(PDFPageSource("doc.pdf", window=4, lookahead=0))
+    assert [isinstance(p, TextLayerPage) for p in pages[:4]] == [
+        False, True, False, True]
+    assert fake_pdf == [(1, 1), (3, 3), (5, 7)]
+
+
+def test_probe_rasters_measures_the_largest_image(monkeypatch):
+    outputs = {
+        "pdfinfo": "Pages:          9\n"
+                   "Page    2 size: 612 x 792 pts (letter)\n"
+                   "Page    3 size: 612 x 792 pts (letter)\n",
+        "pdfimages": (
+            "page   num  type   width height color comp bpc  enc interp  "
+            "object ID x-ppi y-ppi size ratio\n" + "-" * 92 + "\n"
+            "   2     0 image    2550  3300  gray    1   8  jpeg   no        "
+            "10  0   300   300  601K  7.1%\n"
+            "   2     1 smask    2550  3300  gray    1   8  image  no        "
+            "11  0   300   300  1K  0.1%\n"
+            "   3     2 image     300   100  rgb     3   8  jpeg   no        "
+            "12  0   150   150  9K  1.0%\n"),
+    }
+    monkeypatch.setattr(PDFPageSource, "_run_tool",
+                        lambda self, args: outputs[args[0]])
+    rasters = PDFPageSource("doc.pdf").probe_rasters(2, 3)
+    assert rasters[2] == (pytest.approx(1.0), pytest.approx(93.5))
+    assert rasters[3][0] == pytest.approx(2 * (2 / 3) / 93.5)
+
+
+def test_text_layer_is_not_used_for_a_page_region(fake_pdf, monkeypatch):
+    def probe(self, first, last):
+        raise AssertionError("text layer covers the whole page, not the ROI")
+
+    monkeypatch.setattr(PDFPageSource, "probe_text", probe)
+    source = PDFPageSource("doc.pdf", window=4, lookahead=0,
+                           roi_rel=(0.1, 0.2, 0.5, 0.3))
+    pages = list(source)
+    assert all(isinstance(p, Image.Image) for p in pages)
+    assert fake_pdf == [(1, 4), (5, 7)]
+    assert source.text_layer_pages == 0
+
+
+def test_tiff_frames_are_decoded_one_at_a_time(tmp_path):
+    from page_sources import TiffFrameSource, open_page_source
+
+    path = str(tmp_path / "fax.tif")
+    frames = [Image.new("L", (20, 20), 40 * i) for i in range(5)]
+    frames[0].save(path, save_all=True, append_images=frames[1:])
+
+    source = open_page_source(path)
+    assert isinstance(source, TiffFrameSource)
+    assert len(source) == 5
+    decoded = [frame.getpixel((0, 0)) for frame in source]
+    assert decoded == [0, 40, 80, 120, 160]
+
+    (tmp_path / "bad.tif").write_bytes(b"not a tiff")
+    with pytest.raises(ValueError):
+        TiffFrameSource(str(tmp_path / "bad.tif"))
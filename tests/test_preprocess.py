@@ -32,4 +32,109 @@ def test_preprocess_image_advanced(test_image, tesseract_available):
     result = preprocess_image_advanced(test_image)
     assert isinstance(result, Image.Image)
     assert result.size == (100, 100)
-    assert result.mode in ('L', 'RGB', '1')
\ No newline at end of file
+    assert result.mode in ('L', 'RGB', '1')
+
+def _legacy_preprocess(image):
+    """المعالجة السابقة عبر PIL ثم OpenCV، للمقارنة."""
+    import cv2
+    import numpy as np
+    from PIL import ImageEnhance, ImageFilter
+
+    image = image.convert("L").filter(ImageFilter.MedianFilter())
+    image = ImageEnhance.Contrast(image).enhance(2)
+    _, thresh = cv2.threshold(np.array(image), 0, 255,
+                              cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return thresh
+
+
+def test_preprocess_accepts_all_sources_and_matches_legacy(tmp_path):
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("cv2")
+    from image_preprocess import preprocess
+
+    rng = np.random.default_rng(1)
+    page = np.full((300, 200), 230, np.uint8)
+    for _ in range(60):
+        x, y = rng.integers(0, 180), rng.integers(0, 290)
+        page[y:y + 8, x:x + 16] = rng.integers(0, 60)
+    page = np.clip(page + rng.normal(0, 10, page.shape), 0, 255).astype(np.uint8)
+    path = tmp_path / "page.png"
+    Image.fromarray(page).save(str(path))
+
+    expected = _legacy_preprocess(Image.fromarray(page))
+    sources = [page, Image.fromarray(page).convert("RGB"), str(path),
+               path.read_bytes()]
+    for source in sources:
+        result = preprocess(source, output="array")
+        assert result.dtype == np.uint8 and result.shape == page.shape
+        assert (result == expected).mean() > 0.999
+    assert preprocess(page).mode == "L"
+    # المصفوفة المُمرَّرة لا تُعدَّل إلا عند الطلب
+    original = page.copy()
+    preprocess(page, output="array")
+    assert (page == original).all()
+    assert preprocess(page, output="array", inplace=True) is page
+
+
+def test_stage_pipeline_presets_and_timing():
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("cv2")
+    from image_preprocess import (
+        PRESETS, PreprocessPipeline, preprocess, register_stage, STAGES)
+
+    page = np.full((120, 160), 220, np.uint8)
+    page[40:60, 20:140] = 30
+    for name in PRESETS:
+        pipeline = PreprocessPipeline.from_preset(name)
+        result = pipeline(page, output="array")
+        assert set(np.unique(result)) <= {0, 255}
+        timings = pipeline.timing_summary()
+        assert list(timings)[0] == "grayscale"
+        assert set(timings) == {"grayscale"} | {s for s, _ in PRESETS[name]}
+
+    balanced = PreprocessPipeline.from_preset("balanced")
+    assert (balanced(page, output="array") == preprocess(page, output="array")).all()
+    # الفرق الوحيد عن ‎preprocess()‎ تصحيح الميل
+    skewed = np.full((400, 400), 220, np.uint8)
+    for y in range(60, 340, 30):
+        skewed[y:y + 10, 60:340] = 30
+    skewed = np.asarray(Image.fromarray(skewed).rotate(5, fillcolor=220))
+    assert not (balanced(skewed, output="array")
+                == preprocess(skewed, output="array")).all()
+    without_deskew = PreprocessPipeline(
+        [s for s in PRESETS["balanced"] if s[0] != "deskew"])
+    assert (without_deskew(skewed, output="array")
+            == preprocess(skewed, output="array")).all()
+
+    @register_stage("invert_for_test")
+    def invert(gray):
+        return 255 - gray
+
+    try:
+        custom = PreprocessPipeline(["invert_for_test", ("binarize", {})])
+        assert custom(page, output="array")[50, 50] == 255
+    finally:
+        del STAGES["invert_for_test"]
+    with pytest.raises(ValueError):
+        PreprocessPipeline(["no_such_stage"])
+
+
+def test_deskew_estimates_angle_on_proxy():
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("cv2")
+    from image_preprocess import deskew, estimate_skew
+
+    page = np.full((1400, 1000), 235, np.uint8)
+    for y in range(80, 1320, 30):
+        page[y:y + 14, 80:920] = 30
+    skewed = np.array(Image.fromarray(page).rotate(
+        5, fillcolor=235, resample=Image.BILINEAR))
+
+    assert estimate_skew(skewed, proxy_side=400) == pytest.approx(-5, abs=0.2)
+    assert estimate_skew(page) == 0.0
+    noise = np.random.default_rng(0).integers(0, 255, (600, 500)).astype(np.uint8)
+    assert estimate_skew(noise) == 0.0
+
+    straightened = deskew(skewed.copy())
+    assert straightened.shape == skewed.shape
+    assert abs(estimate_skew(straightened)) <= 0.2
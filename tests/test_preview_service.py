@@ -0,0 +1,29 @@
+import os
+
+from PIL import Image
+
+from preview_service import PreviewCache, render_preview, rotate_preview
+
+
+def test_large_jpeg_is_draft_decoded_to_preview_size(tmp_path):
+    path = str(tmp_path / "photo.jpg")
+    Image.new("RGB", (6000, 4000), "white").save(path)
+    img = render_preview(path, size=600)
+    assert img.mode == "RGB" and img.size == (600, 400)
+    assert rotate_preview(img, 90).size == (400, 600)
+    assert rotate_preview(img, 360) is img
+
+
+def test_cache_reuses_until_file_changes(tmp_path):
+    path = str(tmp_path / "scan.png")
+    Image.new("L", (1200, 800), 255).save(path)
+    cache = PreviewCache()
+    assert cache.get(path) is None
+    first = cache.render(path)
+    assert cache.get(path) is first and cache.render(path) is first
+
+    Image.new("L", (800, 1200), 255).save(path)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert cache.get(path) is None
+    assert cache.render(path).size == (400, 600)
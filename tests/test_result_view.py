@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+
+from result_view import ResultView  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def test_pages_are_shown_in_order(app):
+    view = ResultView()
+    view.add_page(2, "ثانية")
+    assert view.toPlainText() == ""
+    view.skip_page(3)
+    view.add_page(1, "أولى\n")
+    assert view.toPlainText() == "--- صفحة 1 ---\nأولى\n\n--- صفحة 2 ---\nثانية"
+    view.add_page(4, "رابعة")
+    view.append_note("--- المدة: 1.00 ثانية ---")
+    assert view.toPlainText().endswith("رابعة\n\n--- المدة: 1.00 ثانية ---")
+
+    view.reset()
+    view.add_page(1, "x")
+    assert view.toPlainText() == "--- صفحة 1 ---\nx"
@@ -0,0 +1,25 @@
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ["numpy", "cv2", "pdf2image", "requests", "easyocr", "torch"]
+
+
+def _loaded_after(code):
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    probe = (f"import sys, json\n{code}\n"
+             f"print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))")
+    out = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def test_main_window_import_defers_heavy_modules():
+    assert _loaded_after("import main_window") == []
+
+
+def test_dependency_check_does_not_import_modules():
+    assert _loaded_after(
+        "from utils import check_dependencies; check_dependencies()") == []
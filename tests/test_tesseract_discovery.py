@@ -0,0 +1,60 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+import ocr_logic
+
+pytesseract = pytest.importorskip("pytesseract")
+
+
+@pytest.fixture
+def fake_tesseract(tmp_path, monkeypatch):
+    binary = tmp_path / "tesseract"
+    binary.write_text("#!/bin/sh\n")
+    calls = []
+
+    def version():
+        calls.append("version")
+        return "5.3.0"
+
+    monkeypatch.setattr(ocr_logic, "TESSERACT_INFO_FILE",
+                        str(tmp_path / "tesseract_info.json"))
+    monkeypatch.setattr(ocr_logic, "_tesseract_info", None)
+    monkeypatch.setattr(ocr_logic, "configure_tesseract", lambda: str(binary))
+    monkeypatch.setattr(pytesseract, "get_tesseract_version", version)
+    monkeypatch.setattr(pytesseract, "get_languages",
+                        lambda config="": ["eng", "ara"])
+    monkeypatch.delenv("TESSERACT_CMD", raising=False)
+    return binary, calls
+
+
+def test_discovery_is_cached_until_binary_changes(fake_tesseract, monkeypatch):
+    binary, calls = fake_tesseract
+
+    info = ocr_logic.tesseract_info()
+    assert info["version"] == "5.3.0"
+    assert info["languages"] == ["ara", "eng"]
+    assert calls == ["version"]
+
+    # جلسة جديدة: تُقرأ المعلومات من الملف دون أي فحص
+    monkeypatch.setattr(ocr_logic, "_tesseract_info", None)
+    assert ocr_logic.tesseract_info()["path"] == str(binary)
+    assert calls == ["version"]
+
+    # تحديث الملف التنفيذي يبطل المحفوظ
+    st = os.stat(binary)
+    os.utime(binary, (st.st_atime, st.st_mtime + 10))
+    monkeypatch.setattr(ocr_logic, "_tesseract_info", None)
+    ocr_logic.tesseract_info()
+    assert calls == ["version", "version"]
+
+
+def test_import_does_not_probe_tesseract():
+    code = "import sys, ocr_logic; print('pytesseract' in sys.modules)"
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        check=True).stdout
+    assert out.strip() == "False"
@@ -0,0 +1,145 @@
+# tests/test_tesseract_pool.py
+import os
+import sys
+import time
+import subprocess
+from concurrent.futures import CancelledError
+
+import pytest
+from PIL import Image
+
+from cancellation import CancelToken
+from tesseract_pool import TesseractPool, parse_tesseract_config
+
+
+class UnpicklableError(Exception):
+    """يُرسل من العامل لكن فك تسلسله في العملية الأم يفشل."""
+
+    def __init__(self, message, code):
+        super().__init__(message)
+        self.code = code
+
+
+class EchoEngine:
+    """محرك وهمي يعيد معرّف العملية ليثبت أن العامل مقيم."""
+
+    def recognize(self, image, lang, config):
+        if lang == "boom":
+            raise ValueError("engine failure")
+        if lang == "garbled":
+            raise UnpicklableError("engine failure", 7)
+        if lang.startswith("sleep:"):
+            time.sleep(float(lang[6:]))
+        if lang.startswith("slow:"):
+            # صفحة بطيئة تشغّل عملية فرعية كما يفعل pytesseract
+            child = subprocess.Popen(
+                [sys.executable, "-c", "import time; time.sleep(60)"])
+            with open(lang[5:], "w") as f:
+                f.write(str(child.pid))
+            child.wait()
+        return f"{os.getpid()}|{lang}|{image.size[0]}"
+
+    def osd(self, image, lang, config):
+        return 0, 9.0
+
+
+@pytest.fixture
+def pool():
+    p = TesseractPool(size=2, engine_factory=EchoEngine)
+    yield p
+    p.shutdown()
+
+
+def test_parse_tesseract_config():
+    assert parse_tesseract_config("--oem 1 --psm 6") == (6, 1, ())
+    assert parse_tesseract_config("") == (3, 3, ())
+    assert parse_tesseract_config("-c preserve_interword_spaces=1") == (
+        3, 3, (("preserve_interword_spaces", "1"),))
+
+
+def test_pool_reuses_resident_workers(pool):
+    futures = [pool.submit(Image.new("L", (10 + i, 10)), "ara")
+               for i in range(8)]
+    results = [f.result(timeout=60) for f in futures]
+    assert [r.split("|")[2] for r in results] == [str(10 + i) for i in range(8)]
+    pids = {r.split("|")[0] for r in results}
+    assert 1 <= len(pids) <= 2
+    assert str(os.getpid()) not in pids
+
+
+def test_pool_propagates_engine_errors(pool):
+    with pytest.raises(ValueError):
+        pool.image_to_string(Image.new("L", (5, 5)), lang="boom", timeout=60)
+    # العامل يبقى صالحاً بعد الخطأ
+    assert pool.image_to_string(Image.new("L", (5, 5)), lang="eng",
+                                timeout=60).endswith("|eng|5")
+
+
+def test_osd_jobs_overtake_queued_pages():
+    pool = TesseractPool(size=1, engine_factory=EchoEngine)
+    try:
+        pool.image_to_string(Image.new("L", (5, 5)), timeout=60)  # تشغيل العامل
+        finished = []
+        busy = pool.submit(Image.new("L", (5, 5)), lang="sleep:0.5")
+        while not busy.running():
+            time.sleep(0.01)
+        pages = [pool.submit(Image.new("L", (5, 5)), lang="sleep:0.2")
+                 for _ in range(3)]
+        osd = pool.submit(Image.new("L", (5, 5)), method="osd")
+        for name, f in [("busy", busy), ("osd", osd)] + [
+                (f"page{i}", f) for i, f in enumerate(pages)]:
+            f.add_done_callback(lambda _, name=name: finished.append(name))
+        assert osd.result(timeout=60) == (0, 9.0)
+        for f in pages:
+            f.result(timeout=60)
+        assert finished[:2] == ["busy", "osd"]
+    finally:
+        pool.shutdown()
+
+
+def test_undecodable_reply_fails_only_its_own_job():
+    pool = TesseractPool(size=1, engine_factory=EchoEngine)
+    try:
+        with pytest.raises(TypeError):
+            pool.image_to_string(Image.new("L", (5, 5)), lang="garbled",
+                                 timeout=60)
+        # خيط الإرسال الوحيد ما زال يخدم المهام
+        assert pool.image_to_string(Image.new("L", (6, 5)), lang="eng",
+                                    timeout=60).endswith("|eng|6")
+    finally:
+        pool.shutdown()
+
+
+def _alive(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split(")")[-1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="needs /proc")
+def test_cancel_kills_running_job_and_its_children(pool, tmp_path):
+    marker = str(tmp_path / "child.pid")
+    token = CancelToken()
+    future = pool.submit(Image.new("L", (5, 5)), f"slow:{marker}", token=token)
+    deadline = time.time() + 60
+    while not os.path.exists(marker) or not open(marker).read():
+        assert time.time() < deadline
+        time.sleep(0.05)
+    child = int(open(marker).read())
+
+    started = time.perf_counter()
+    token.cancel()
+    with pytest.raises(CancelledError):
+        future.result(timeout=5)
+    assert time.perf_counter() - started < 0.5
+    deadline = time.time() + 5
+    while _alive(child) and time.time() < deadline:
+        time.sleep(0.05)
+    assert not _alive(child)
+
+    # المجمّع يبقى صالحاً، والمهام المنتظرة برمز ملغى لا تُشغَّل
+    assert pool.image_to_string(Image.new("L", (7, 7)), timeout=60).endswith("|eng|7")
+    with pytest.raises(CancelledError):
+        pool.submit(Image.new("L", (5, 5)), token=token).result(timeout=60)
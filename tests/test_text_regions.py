@@ -0,0 +1,64 @@
+# tests/test_text_regions.py
+import numpy as np
+import pytest
+from PIL import Image
+
+pytest.importorskip("cv2")
+
+from text_regions import detect_text_regions, reading_order, region_coverage  # noqa: E402
+
+
+def _page():
+    """صفحة بعمودين نصيين وصورة وسطر سفلي، مع هوامش واسعة."""
+    rng = np.random.default_rng(0)
+    page = np.full((1400, 1000), 240, np.uint8)
+
+    def block(x0, y0, x1, y1):
+        for y in range(y0, y1, 24):
+            x = x0
+            while x < x1 - 20:
+                w = int(rng.integers(12, 60))
+                page[y:y + 12, x:min(x + w, x1)] = 30
+                x += w + int(rng.integers(6, 12))
+
+    block(80, 120, 460, 600)      # العمود الأيسر
+    block(540, 120, 920, 400)     # العمود الأيمن
+    page[700:1050, 120:560] = rng.integers(60, 200, (350, 440))  # صورة
+    block(80, 1150, 920, 1300)    # سطر سفلي عريض
+    return Image.fromarray(page)
+
+
+def test_detects_blocks_skips_photo_and_orders_rtl():
+    boxes = detect_text_regions(_page())
+    assert len(boxes) == 3
+    assert region_coverage(boxes, (1000, 1400)) < 0.5
+
+    right, left, bottom = reading_order(boxes, rtl=True)
+    assert right[0] > 500 and left[2] < 500 and bottom[1] > 1100
+    assert reading_order(boxes, rtl=False)[0] == left
+
+
+def test_pipeline_sends_only_regions(monkeypatch):
+    import ocr_pipeline
+
+    sent = []
+
+    class RecordingPool:
+        def submit(self, image, lang="eng", config="", method="recognize"):
+            from concurrent.futures import Future
+
+            sent.append(image.size)
+            future = Future()
+            future.set_result(f"w{image.size[0]}")
+            return future
+
+    monkeypatch.setattr(ocr_pipeline, "get_tesseract_pool", RecordingPool)
+    pipeline = ocr_pipeline.OCRPipeline(lang="ara", text_regions=True)
+    [(_, text)] = list(pipeline.run([_page()]))
+
+    assert len(sent) == 3
+    # ترتيب القراءة العربي: العمود الأيمن ثم الأيسر ثم السطر السفلي
+    assert text.split("\n") == [f"w{w}" for w, _ in sent]
+    stats = pipeline.region_stats
+    assert stats["split_pages"] == 1
+    assert stats["ocr_pixels"] < stats["page_pixels"] / 2
@@ -0,0 +1,113 @@
+# tests/test_tiling.py
+from concurrent.futures import Future
+
+from PIL import Image
+
+from tesseract_pool import parse_tsv
+from tiling import choose_tiles, merge_tiles, needs_tiling
+
+
+def test_tile_cores_partition_the_page():
+    size = (9000, 6100)
+    tiles = choose_tiles(size)
+    assert len(tiles) == 4 * 3
+    assert sum((c[2] - c[0]) * (c[3] - c[1]) for c, _ in tiles) == 9000 * 6100
+    for core, box in tiles:
+        assert box[0] <= core[0] and box[1] <= core[1]
+        assert box[2] >= core[2] and box[3] >= core[3]
+    assert needs_tiling(size) and not needs_tiling((2480, 3508))
+    # لوحة A0 مرسومة بدقة 100 DPI تُقطَّع، وصفحة A4 بالدقة نفسها لا
+    assert not needs_tiling((3311, 4681))
+    assert needs_tiling((3311, 4681), dpi=100)
+    assert not needs_tiling((827, 1169), dpi=100)
+
+
+def _recognize(tiles, truth):
+    """محاكاة Tesseract على كل بلاطة: الكلمة الكاملة داخلها تُقرأ، والمقطوعة
+    عند حافة البلاطة تُقرأ جزءاً مشوهاً."""
+    results = []
+    for _, (bx0, by0, bx1, by1) in tiles:
+        words = []
+        for x, y, w, h, text in truth:
+            ix0, iy0 = max(x, bx0), max(y, by0)
+            ix1, iy1 = min(x + w, bx1), min(y + h, by1)
+            if ix0 >= ix1 or iy0 >= iy1:
+                continue
+            whole = (ix0, iy0, ix1, iy1) == (x, y, x + w, y + h)
+            words.append((ix0 - bx0, iy0 - by0, ix1 - ix0, iy1 - iy0, 90.0,
+                          text if whole else text[:2] + "~", (1, 1, 1)))
+        results.append(words)
+    return results
+
+
+def test_merge_drops_seam_duplicates_and_fragments():
+    tiles = choose_tiles((6000, 5200), overlap=150)
+    seam_x = tiles[0][0][2]
+    truth = [
+        (seam_x - 200, 400, 120, 40, "left"),
+        (seam_x - 60, 400, 140, 40, "seam"),   # على حد عمودي
+        (seam_x + 100, 400, 100, 40, "right"),
+        (200, 400, 120, 40, "far"),            # بعيدة أفقياً: سطر مستقل
+        (1000, tiles[0][0][3] - 20, 90, 40, "gamma"),  # على حد أفقي
+    ]
+    text, conf = merge_tiles(tiles, _recognize(tiles, truth))
+    assert text.split("\n") == ["far", "left seam right", "gamma"]
+    assert conf == 90.0
+
+    arabic = [(3000, 900, 100, 40, "مرحبا"), (3150, 900, 100, 40, "بكم")]
+    text, _ = merge_tiles(tiles, _recognize(tiles, arabic), rtl=True)
+    assert text == "بكم مرحبا"
+
+
+def test_parse_tsv_reads_word_rows():
+    tsv = ("level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\t"
+           "left\ttop\twidth\theight\tconf\ttext\n"
+           "4\t1\t1\t1\t1\t0\t10\t10\t200\t30\t-1\t\n"
+           "5\t1\t1\t1\t1\t1\t10\t12\t80\t28\t91.5\tHello\n"
+           "5\t1\t1\t1\t1\t2\t100\t12\t60\t28\t-1\t \n")
+    assert parse_tsv(tsv) == [(10, 12, 80, 28, 91.5, "Hello", (1, 1, 1))]
+
+
+def test_pipeline_tiles_large_pages(monkeypatch):
+    import ocr_pipeline
+
+    calls = []
+
+    class WordsPool:
+        def submit(self, image, lang="eng", config="", method="recognize"):
+            calls.append((image.size, method))
+            future = Future()
+            future.set_result([] if method == "words" else "whole")
+            return future
+
+    monkeypatch.setattr(ocr_pipeline, "get_tesseract_pool", WordsPool)
+    page = Image.new("L", (7000, 5000), 255)
+    pipeline = ocr_pipeline.OCRPipeline(lang="eng")
+    assert list(pipeline.run([page])) == [(1, "")]
+    assert len(calls) == 3 * 2 and {m for _, m in calls} == {"words"}
+    assert pipeline.tiled_pages == 1
+
+    calls.clear()
+    untiled = ocr_pipeline.OCRPipeline(lang="eng", tiling=False)
+    assert list(untiled.run([page])) == [(1, "whole")]
+    assert calls == [((7000, 5000), "recognize")]
+
+
+def test_pipeline_tiles_low_dpi_pdf_renders(monkeypatch):
+    import ocr_pipeline
+
+    calls = []
+
+    class WordsPool:
+        def submit(self, image, lang="eng", config="", method="recognize"):
+            calls.append(method)
+            future = Future()
+            future.set_result([] if method == "words" else "whole")
+            return future
+
+    monkeypatch.setattr(ocr_pipeline, "get_tesseract_pool", WordsPool)
+    page = Image.new("L", (3311, 4681), 255)  # A0 بدقة 100 DPI
+    page.info["render_dpi"] = 100
+    pipeline = ocr_pipeline.OCRPipeline(lang="eng", enhance=True)
+    assert list(pipeline.run([page])) == [(1, "")]
+    assert pipeline.tiled_pages == 1 and set(calls) == {"words"}
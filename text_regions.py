@@ -0,0 +1,131 @@
+# text_regions.py
+"""
+كشف مناطق النص قبل OCR.
+
+بدلاً من إرسال الصفحة كاملة (هوامش، صور، فراغات) إلى Tesseract كقطعة
+واحدة، نكشف كتل النص على نسخة مصغرة بعمليات مورفولوجية سريعة:
+تدرّج مورفولوجي ← عتبة Otsu ← إغلاق أفقي يصل الحروف في أسطر ←
+إغلاق رأسي يصل الأسطر في كتل. تُرسل الكتل وحدها إلى المحرك بالتوازي،
+ثم يُعاد تجميع نصوصها بترتيب القراءة (من اليمين لليسار للعربية).
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+# إن غطّت الكتل معظم الصفحة فلا فائدة من التقطيع
+FULL_PAGE_COVERAGE = 0.85
+
+
+def is_rtl(lang):
+    """اتجاه القراءة من لغة Tesseract: العربية تعني من اليمين لليسار."""
+    return "ara" in (lang or "").split("+")
+
+
+def _merge_overlapping(boxes):
+    """دمج الصناديق المتقاطعة حتى لا يبقى تقاطع."""
+    boxes = [list(b) for b in boxes]
+    merged = True
+    while merged:
+        merged = False
+        out = []
+        for b in boxes:
+            for m in out:
+                if b[0] < m[2] and m[0] < b[2] and b[1] < m[3] and m[1] < b[3]:
+                    m[0], m[1] = min(m[0], b[0]), min(m[1], b[1])
+                    m[2], m[3] = max(m[2], b[2]), max(m[3], b[3])
+                    merged = True
+                    break
+            else:
+                out.append(b)
+        boxes = out
+    return [tuple(b) for b in boxes]
+
+
+def _looks_like_text(gray, mask):
+    """
+    استبعاد الصور: الصفحات النصية ثنائية النمط تقريباً (حبر وورق)،
+    أما الصور فتغلب عليها الدرجات المتوسطة أو الحواف الكثيفة.
+    """
+    import numpy as np
+
+    if gray.size == 0:
+        return False
+    midtones = np.count_nonzero((gray > 70) & (gray < 180)) / gray.size
+    edges = np.count_nonzero(mask) / mask.size
+    return midtones < 0.5 and 0.03 < edges < 0.8
+
+
+def detect_text_regions(image, proxy_side=1200, pad=6, min_height=6):
+    """
+    صناديق كتل النص (x0, y0, x1, y1) بإحداثيات الصورة الكاملة.
+    ‎image‎: PIL أو مصفوفة أو مسار؛ الكشف يتم على نسخة أطول ضلع فيها
+    ‎proxy_side‎، و‎pad‎ (بكسل على النسخة المصغرة) هامش حول كل كتلة.
+    """
+    import cv2
+    from image_preprocess import load_gray
+
+    gray = load_gray(image)
+    h, w = gray.shape
+    scale = min(1.0, proxy_side / max(h, w))
+    small = gray if scale == 1.0 else cv2.resize(
+        gray, (max(1, int(w * scale)), max(1, int(h * scale))),
+        interpolation=cv2.INTER_AREA)
+    sh, sw = small.shape
+
+    ellipse = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+    grad = cv2.morphologyEx(small, cv2.MORPH_GRADIENT, ellipse)
+    _, mask = cv2.threshold(grad, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    # حروف الكلمة والكلمات المتجاورة ← أسطر، ثم الأسطر المتتالية ← كتل
+    line_gap = max(3, sw // 60)
+    blocks = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, cv2.getStructuringElement(
+        cv2.MORPH_RECT, (line_gap, 1)))
+    blocks = cv2.morphologyEx(blocks, cv2.MORPH_CLOSE, cv2.getStructuringElement(
+        cv2.MORPH_RECT, (1, max(3, sh // 80))))
+
+    contours, _ = cv2.findContours(
+        blocks, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    min_area = sw * sh * 0.0002
+    boxes = []
+    for contour in contours:
+        x, y, bw, bh = cv2.boundingRect(contour)
+        if bh < min_height or bw < min_height or bw * bh < min_area:
+            continue
+        if not _looks_like_text(small[y:y + bh, x:x + bw],
+                                mask[y:y + bh, x:x + bw]):
+            continue
+        boxes.append((max(0, x - pad), max(0, y - pad),
+                      min(sw, x + bw + pad), min(sh, y + bh + pad)))
+
+    return [(int(x0 / scale), int(y0 / scale),
+             min(w, int(round(x1 / scale))), min(h, int(round(y1 / scale))))
+            for x0, y0, x1, y1 in _merge_overlapping(boxes)]
+
+
+def reading_order(boxes, rtl=False):
+    """
+    ترتيب الكتل للقراءة: صفوف من أعلى لأسفل (الكتل المتداخلة رأسياً
+    في الصف نفسه، كالأعمدة)، وداخل الصف من اليمين لليسار إن كان ‎rtl‎.
+    """
+    rows = []
+    for box in sorted(boxes, key=lambda b: (b[1], b[0])):
+        if rows:
+            top, bottom, members = rows[-1]
+            overlap = min(bottom, box[3]) - max(top, box[1])
+            if overlap > 0.5 * min(bottom - top, box[3] - box[1]):
+                members.append(box)
+                rows[-1] = (top, max(bottom, box[3]), members)
+                continue
+        rows.append((box[1], box[3], [box]))
+    ordered = []
+    for _, _, members in rows:
+        if rtl:
+            ordered.extend(sorted(members, key=lambda b: -b[2]))
+        else:
+            ordered.extend(sorted(members, key=lambda b: b[0]))
+    return ordered
+
+
+def region_coverage(boxes, size):
+    """نسبة مساحة الصفحة التي تغطيها الصناديق (غير متقاطعة بعد الدمج)."""
+    w, h = size
+    return sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in boxes) / float(w * h)
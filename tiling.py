@@ -0,0 +1,123 @@
+# tiling.py
+"""
+تقطيع الصفحات الضخمة (مخططات هندسية، لوحات A0) إلى بلاطات متداخلة.
+
+كل بلاطة لها "قلب" لا يتقاطع مع قلوب غيرها (القلوب تغطي الصفحة تماماً)،
+وتمتد حوله بمقدار ‎overlap‎ حتى تظهر الكلمات الواقعة على الحدود كاملة
+في بلاطة واحدة على الأقل. تُعالَج البلاطات بالتوازي على عمال Tesseract،
+ثم تُبقى كل كلمة في البلاطة التي يقع مركزها في قلبها فقط، فلا تتكرر
+الكلمات عند الحدود، ويُعاد بناء الأسطر من إحداثيات الصفحة.
+"""
+import math
+import statistics
+
+# الصفحات الأكبر من هذا تُقطَّع (A2 بدقة 300 DPI تقريباً)
+TILE_MIN_PIXELS = 24_000_000
+# الدقة التي يُقاس بها ‎TILE_MIN_PIXELS‎
+TILE_REFERENCE_DPI = 300
+# أطول ضلع مستهدف لقلب البلاطة
+TILE_TARGET_SIDE = 2500
+
+
+def needs_tiling(size, min_pixels=TILE_MIN_PIXELS, dpi=None):
+    """
+    ‎dpi‎: دقة رسم الصفحة إن عُرفت (صفحات PDF)؛ يُصغَّر الحد بمربع نسبتها
+    إلى ‎TILE_REFERENCE_DPI‎ فيبقى على المساحة الورقية نفسها، وإلا لما
+    بلغت لوحة A0 مرسومة بدقة 100 DPI (15.5 ميغابكسل) الحد أبداً.
+    """
+    w, h = size
+    if dpi:
+        min_pixels = min_pixels * (dpi / TILE_REFERENCE_DPI) ** 2
+    return w * h > min_pixels
+
+
+def choose_tiles(size, target=TILE_TARGET_SIDE, overlap=None):
+    """
+    شبكة بلاطات متساوية مختارة من أبعاد الصفحة:
+    [(core, box)] حيث core و box صناديق (x0, y0, x1, y1).
+    التداخل الافتراضي 6% من قلب البلاطة بين 100 و300 بكسل، فالكلمات
+    الأضيق من ضعفه لا تُقطع في البلاطة المالكة لها.
+    """
+    w, h = size
+    nx, ny = max(1, math.ceil(w / target)), max(1, math.ceil(h / target))
+    xs = [round(i * w / nx) for i in range(nx + 1)]
+    ys = [round(j * h / ny) for j in range(ny + 1)]
+    if overlap is None:
+        overlap = min(300, max(100, int(0.06 * min(w / nx, h / ny))))
+    tiles = []
+    for j in range(ny):
+        for i in range(nx):
+            core = (xs[i], ys[j], xs[i + 1], ys[j + 1])
+            box = (max(0, core[0] - overlap), max(0, core[1] - overlap),
+                   min(w, core[2] + overlap), min(h, core[3] + overlap))
+            tiles.append((core, box))
+    return tiles
+
+
+def _is_arabic(text):
+    return any("\u0600" <= ch <= "\u06ff" or "\u0750" <= ch <= "\u077f"
+               for ch in text)
+
+
+def owned_words(tiles, results):
+    """
+    كلمات كل البلاطات بإحداثيات الصفحة، بعد إسقاط نسخ التداخل:
+    تبقى الكلمة في البلاطة التي يقع مركزها في قلبها فقط.
+    ‎results‎: كلمات كل بلاطة (بإحداثيات البلاطة) بنفس ترتيب ‎tiles‎.
+    """
+    kept = []
+    for (core, box), words in zip(tiles, results):
+        ox, oy = box[0], box[1]
+        for left, top, width, height, conf, text, _ in words:
+            x, y = left + ox, top + oy
+            cx, cy = x + width / 2, y + height / 2
+            if core[0] <= cx < core[2] and core[1] <= cy < core[3]:
+                kept.append((x, y, width, height, conf, text))
+    return kept
+
+
+def words_to_lines(words, rtl=False):
+    """
+    إعادة بناء الأسطر من كلمات بإحداثيات الصفحة: تجميع رأسي حسب المركز،
+    ثم فصل المقاطع المتباعدة أفقياً (نصوص متفرقة في المخطط) إلى أسطر
+    مستقلة. اتجاه كل سطر من محتواه: العربي من اليمين لليسار، ومع
+    ‎rtl‎ تُقرأ مقاطع الصف الواحد من اليمين أيضاً.
+    """
+    if not words:
+        return []
+    unit = statistics.median(h for _, _, _, h, _, _ in words)
+    rows = []
+    for word in sorted(words, key=lambda w: w[1] + w[3] / 2):
+        cy = word[1] + word[3] / 2
+        if rows and abs(cy - rows[-1][0]) <= 0.6 * unit:
+            row = rows[-1][1]
+            row.append(word)
+            rows[-1] = (sum(w[1] + w[3] / 2 for w in row) / len(row), row)
+        else:
+            rows.append((cy, [word]))
+
+    segments = []
+    for _, row in rows:
+        row.sort(key=lambda w: w[0])
+        row_segments = [[row[0]]]
+        for word in row[1:]:
+            prev = row_segments[-1][-1]
+            if word[0] - (prev[0] + prev[2]) > 3 * unit:
+                row_segments.append([])
+            row_segments[-1].append(word)
+        segments.extend(reversed(row_segments) if rtl else row_segments)
+
+    lines = []
+    for segment in segments:
+        texts = [w[5] for w in segment]
+        if _is_arabic(" ".join(texts)):
+            texts.reverse()
+        lines.append(" ".join(texts))
+    return lines
+
+
+def merge_tiles(tiles, results, rtl=False):
+    """(النص المدمج، متوسط ثقة الكلمات المُبقاة)."""
+    words = owned_words(tiles, results)
+    conf = (sum(w[4] for w in words) / len(words)) if words else 0.0
+    return "\n".join(words_to_lines(words, rtl=rtl)), conf
@@ -4,13 +4,15 @@ import logging
 import zipfile
 from typing import Optional
 
-import requests
-import gnupg
 from packaging import version
 from PyQt5.QtCore import QThread, pyqtSignal
 from PyQt5.QtWidgets import QMessageBox, QWidget
 
 
+class UpdateCancelled(Exception):
+    """طلب المستخدم إيقاف التحديث (‎requestInterruption‎)."""
+
+
 class UpdateChecker(QThread):
     """
     يتحقَّق من ملف ‎version.json‎ على GitHub لمعرفة ما إذا كان هناك إصدار أحدث.
@@ -28,6 +30,8 @@ class UpdateChecker(QThread):
     # -------------------------------- QThread --------------------------------
     def run(self) -> None:
         try:
+            import requests  # مؤجَّل: يكلّف ~0.1 ث عند الاستيراد
+
             url = (
                 "https://raw.githubusercontent.com/"
                 "Hejazimohamed/ocr-update_final/main/version.json"
@@ -74,6 +78,7 @@ class UpdateApplier(QThread):
     def run(self) -> None:
         try:
             self._download_update()
+            self._check_interrupted()
             if not self._verify_signature():
                 self._show_message(
                     "فشل التحقق من التحديث!",
@@ -90,8 +95,13 @@ class UpdateApplier(QThread):
                 "✅ تم التحقق من سلامة التحديث، ويبدأ الآن فك الضغط والاستبدال.",
                 QMessageBox.Information,
             )
+            # آخر نقطة يُسمح فيها بالإلغاء؛ لا نوقف الاستبدال في منتصفه
+            self._check_interrupted()
             self._extract_and_backup()
             self.update_finished.emit(True, "تم التحديث بنجاح! أعد تشغيل البرنامج.")
+        except UpdateCancelled:
+            logging.info("أُلغي التحديث بطلب المستخدم.")
+            self.update_finished.emit(False, "أُلغي التحديث.")
         except Exception as exc:  # noqa: BLE001
             logging.error("فشل التحديث: %s", exc)
             self.update_finished.emit(False, f"فشل التحديث: {exc}")
@@ -101,16 +111,21 @@ class UpdateApplier(QThread):
     # ----------------------------- خطوات التحديث ----------------------------- #
     def _download_update(self) -> None:
         """تنزيل ‏ZIP‏ والتوقيع الرقمي مع بثّ تقدم التنزيل."""
+        import requests
+
         response = requests.get(self.update_url, stream=True, timeout=10)
         total = int(response.headers.get("content-length", 0))
 
-        with open(self.temp_zip, "wb") as outfile:
+        with response, open(self.temp_zip, "wb") as outfile:
             downloaded = 0
             for chunk in response.iter_content(chunk_size=4096):
+                # يُفحص مع كل جزء، فيتوقف التنزيل فور الإلغاء
+                self._check_interrupted()
                 outfile.write(chunk)
                 downloaded += len(chunk)
                 if total:
                     self.progress.emit(int(downloaded / total * 100))
+        self._check_interrupted()
 
         # تنزيل ملف ‎.sig‎
         sig_resp = requests.get(self.update_url + ".sig", timeout=10)
@@ -127,6 +142,8 @@ class UpdateApplier(QThread):
             )
             return False
 
+        import gnupg
+
         gpg = gnupg.GPG()
         with open(self.public_key_path, "r", encoding="utf-8") as key_file:
             gpg.import_keys(key_file.read())
@@ -153,6 +170,10 @@ class UpdateApplier(QThread):
                 zipped.extract(member, self.app_path)
 
     # ------------------------------ أدوات مساعدة ----------------------------- #
+    def _check_interrupted(self) -> None:
+        if self.isInterruptionRequested():
+            raise UpdateCancelled()
+
     def _show_message(
         self,
         title: str,
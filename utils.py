@@ -1,4 +1,4 @@
-import importlib
+import importlib.util
 
 
 def check_dependencies():
@@ -14,9 +14,12 @@ def check_dependencies():
     }
     missing = []
     for pkg, module in required_modules.items():
+        # find_spec يتحقق من الوجود دون تنفيذ الوحدة (easyocr يجرّ torch)
         try:
-            importlib.import_module(module)
-        except ImportError:
+            found = importlib.util.find_spec(module) is not None
+        except (ImportError, ValueError):
+            found = False
+        if not found:
             missing.append(pkg)
     # تحقق خاص من poppler-utils لنظام PDF
     try: